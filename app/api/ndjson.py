@@ -0,0 +1,48 @@
+"""Newline-delimited JSON streaming responses."""
+
+from collections.abc import AsyncIterator
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+
+from app.schemas.streaming import StreamError
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def _ndjson_lines(items: AsyncIterator[BaseModel]) -> AsyncIterator[str]:
+    try:
+        async for item in items:
+            yield item.model_dump_json() + "\n"
+    except Exception as exc:
+        # The status line has already been sent, so report the failure in-band.
+        print(f"Stream failed: {exc!r}")
+        yield StreamError(error=str(exc)).model_dump_json() + "\n"
+
+
+def ndjson_response(items: AsyncIterator[BaseModel]) -> StreamingResponse:
+    """Stream ``items`` as one JSON document per line, flushed as each is produced."""
+    return StreamingResponse(_ndjson_lines(items), media_type=NDJSON_MEDIA_TYPE)
+
+
+async def iter_ndjson_models[M: BaseModel](body: bytes, model: type[M]) -> AsyncIterator[M | ValidationError]:
+    """Parse an NDJSON body into models line by line, skipping blank lines.
+
+    Lines are validated lazily as the iterator is consumed. Lines that are not
+    valid JSON or do not match ``model`` are yielded as their ValidationError,
+    so one bad line does not reject the whole upload.
+
+    The body is read up front rather than streamed: a StreamingResponse listens
+    for client disconnects on the same ASGI receive channel, so the request body
+    cannot be consumed while the response is being sent.
+    """
+    for line in body.splitlines():
+        if line.strip():
+            yield _validate_line(line, model)
+
+
+def _validate_line[M: BaseModel](line: bytes, model: type[M]) -> M | ValidationError:
+    try:
+        return model.model_validate_json(line)
+    except ValidationError as exc:
+        return exc
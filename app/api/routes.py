@@ -1,17 +1,49 @@
-from fastapi import APIRouter, Depends, status
+from collections.abc import AsyncIterator
+from typing import Protocol, Self
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.ndjson import NDJSON_MEDIA_TYPE, iter_ndjson_models, ndjson_response
 from app.db.session import get_db
-from app.schemas.answer_question import AnswerQuestionRequest, AnswerQuestionResponse
+from app.schemas.answer_question import AnswerCacheStats, AnswerQuestionRequest, AnswerQuestionResponse
 from app.schemas.document import (
     DocumentCreate,
     DocumentResponse,
+    DocumentSummaryResponse,
+    DocumentUpdate,
+    IndexStatusResponse,
 )
+from app.schemas.embedding import EmbeddingBatcherStats
 from app.schemas.extract_structured import ExtractStructuredRequest, ExtractStructuredResponse
-from app.schemas.fhir_conversion import FHIRConversionRequest, FHIRConversionResponse
-from app.schemas.summarization import SummarizeRequest, SummarizeResponse
+from app.schemas.fhir_conversion import (
+    FHIRConversionRequest,
+    FHIRConversionResponse,
+    NotesToFHIRRequest,
+    NoteToFHIRItem,
+    NoteToFHIRResult,
+)
+from app.schemas.streaming import TextDelta
+from app.schemas.summarization import (
+    BatchSummarizeItem,
+    BatchSummarizeRequest,
+    BatchSummarizeResult,
+    SummarizeRequest,
+    SummarizeResponse,
+)
+from app.schemas.terminology import TermCodeMemoStats
+from app.services.answer_question_cache_service import (
+    AnswerQuestionCacheService,
+    get_answer_question_cache_service,
+)
 from app.services.answer_question_service import AnswerQuestionService, get_answer_question_service
-from app.services.document_service import create_document, get_all_documents
+from app.services.document_index_service import DocumentIndexService, get_document_index_service
+from app.services.document_service import create_document, delete_document, get_all_documents, update_document
+from app.services.document_summary_service import DocumentSummaryService, get_document_summary_service
+from app.services.embedding_batcher import EmbeddingBatcher, get_embedding_batcher
 from app.services.extract_structured_service import (
     ExtractStructuredService,
     get_extract_structured_service,
@@ -20,7 +52,10 @@ from app.services.fhir_conversion_service import (
     FHIRConversionService,
     get_fhir_conversion_service,
 )
+from app.services.mcp_server_pool import MCPServerPoolUnavailableError
+from app.services.note_to_fhir_service import NoteToFHIRService, get_note_to_fhir_service
 from app.services.summarization_service import SummarizationService, get_summarization_service
+from app.services.term_code_memo import TermCodeMemo, get_term_code_memo
 
 router = APIRouter()
 
@@ -39,12 +74,96 @@ async def get_documents(db: AsyncSession = Depends(get_db)) -> list[int]:
 @router.post("/documents", response_model=DocumentResponse, status_code=status.HTTP_201_CREATED)
 async def post_document(
     payload: DocumentCreate,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
+    index_service: DocumentIndexService = Depends(get_document_index_service),
+    summary_service: DocumentSummaryService = Depends(get_document_summary_service),
 ) -> DocumentResponse:
     doc = await create_document(db, title=payload.title, content=payload.content)
+    background_tasks.add_task(index_service.index_document, doc.id, index_service.mark_pending())
+    background_tasks.add_task(summary_service.summarize_document, doc.id)
+    return DocumentResponse.model_validate(doc)
+
+
+@router.put("/documents/{document_id}", response_model=DocumentResponse)
+async def put_document(
+    document_id: int,
+    payload: DocumentUpdate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    index_service: DocumentIndexService = Depends(get_document_index_service),
+    summary_service: DocumentSummaryService = Depends(get_document_summary_service),
+) -> DocumentResponse:
+    doc = await update_document(db, document_id, title=payload.title, content=payload.content)
+    if doc is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    background_tasks.add_task(index_service.index_document, doc.id, index_service.mark_pending())
+    background_tasks.add_task(summary_service.summarize_document, doc.id)
     return DocumentResponse.model_validate(doc)
 
 
+@router.get("/documents/{document_id}/summary", response_model=DocumentSummaryResponse)
+async def get_document_summary(
+    document_id: int,
+    db: AsyncSession = Depends(get_db),
+    summary_service: DocumentSummaryService = Depends(get_document_summary_service),
+) -> DocumentSummaryResponse:
+    """Return the summary of a stored document.
+
+    Summaries are precomputed when documents are written, so this is normally a
+    database lookup; a summary that is not ready yet is generated on demand.
+
+    Raises:
+        HTTPException 404: If the document does not exist
+    """
+    summary = await summary_service.get_summary(db, document_id)
+    if summary is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    return DocumentSummaryResponse(document_id=document_id, summary=summary)
+
+
+@router.delete("/documents/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_document(
+    document_id: int,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    index_service: DocumentIndexService = Depends(get_document_index_service),
+) -> None:
+    if not await delete_document(db, document_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    background_tasks.add_task(index_service.remove_document, document_id, index_service.mark_pending())
+
+
+@router.get("/index_status", response_model=IndexStatusResponse)
+async def index_status(
+    index_service: DocumentIndexService = Depends(get_document_index_service),
+) -> IndexStatusResponse:
+    """Report how far the live document index lags behind document writes."""
+    return index_service.status()
+
+
+@router.get("/embedding_stats", response_model=EmbeddingBatcherStats)
+async def embedding_stats(
+    batcher: EmbeddingBatcher = Depends(get_embedding_batcher),
+) -> EmbeddingBatcherStats:
+    """Report queue depth and batching counters of the query embedding client."""
+    return batcher.stats()
+
+
+@router.get("/answer_cache_stats", response_model=AnswerCacheStats)
+async def answer_cache_stats(
+    cache_service: AnswerQuestionCacheService = Depends(get_answer_question_cache_service),
+) -> AnswerCacheStats:
+    """Report size, eviction policy and hit/miss/eviction counters of the answer cache."""
+    return cache_service.stats()
+
+
+@router.get("/term_code_stats", response_model=TermCodeMemoStats)
+async def term_code_stats(memo: TermCodeMemo = Depends(get_term_code_memo)) -> TermCodeMemoStats:
+    """Report size and hit/miss counters of the memo of terms resolved to ICD-10/RxNorm codes."""
+    return memo.stats()
+
+
 @router.post("/summarize_note", response_model=SummarizeResponse)
 async def summarize_note(
     payload: SummarizeRequest,
@@ -79,6 +198,148 @@ async def summarize_note(
     return SummarizeResponse(summary=summary)
 
 
+@router.post(
+    "/summarize_note/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def summarize_note_stream(
+    payload: SummarizeRequest,
+    service: SummarizationService = Depends(get_summarization_service),
+) -> StreamingResponse:
+    """Stream a summary of a medical note as it is generated.
+
+    The response is newline-delimited JSON: one ``{"delta": "..."}`` object per
+    piece of text, and a final ``{"error": "..."}`` line if generation fails
+    after streaming has started.
+    """
+
+    async def deltas() -> AsyncIterator[TextDelta]:
+        async for delta in service.stream_summary(payload.content):
+            yield TextDelta(delta=delta)
+
+    return ndjson_response(deltas())
+
+
+@router.post(
+    "/summarize_notes",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": BatchSummarizeRequest.model_json_schema()},
+                NDJSON_MEDIA_TYPE: {"schema": BatchSummarizeItem.model_json_schema()},
+            },
+        }
+    },
+)
+async def summarize_notes(
+    request: Request,
+    service: SummarizationService = Depends(get_summarization_service),
+) -> StreamingResponse:
+    """Summarize many medical notes in one request.
+
+    The body is either a JSON ``{"notes": [{"id": ..., "content": ...}, ...]}``
+    object or, with ``Content-Type: application/x-ndjson``, one
+    ``{"id": ..., "content": ...}`` object per line. Notes are summarized
+    concurrently up to a server-side limit. Results stream back as NDJSON in
+    completion order, one ``{"index", "id", "summary"}`` line per note, with
+    ``"error"`` set instead of ``"summary"`` for notes that failed.
+
+    Raises:
+        HTTPException 422: If a JSON body does not match the request schema
+    """
+    notes = await _read_notes(request, BatchSummarizeRequest, BatchSummarizeItem)
+
+    async def results() -> AsyncIterator[BatchSummarizeResult]:
+        async for outcome in service.summarize_many(notes):
+            note_id = outcome.item.id if isinstance(outcome.item, BatchSummarizeItem) else None
+            if outcome.error is not None:
+                yield BatchSummarizeResult(index=outcome.index, id=note_id, error=str(outcome.error))
+            else:
+                yield BatchSummarizeResult(index=outcome.index, id=note_id, summary=outcome.result)
+
+    return ndjson_response(results())
+
+
+class _NotesBatch[M](Protocol):
+    """A JSON batch request body, validated as a whole, whose notes are of type ``M``."""
+
+    @property
+    def notes(self) -> list[M]: ...
+
+    @classmethod
+    def model_validate_json(cls, json_data: str | bytes, /) -> Self: ...
+
+
+async def _read_notes[M: BaseModel](
+    request: Request, batch_model: type[_NotesBatch[M]], item_model: type[M]
+) -> AsyncIterator[M | Exception]:
+    """Read the notes of a batch request: a JSON ``{"notes": [...]}`` body, or NDJSON with one note per line.
+
+    Raises:
+        RequestValidationError: If a JSON body does not match ``batch_model``
+    """
+    if request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+        return iter_ndjson_models(await request.body(), item_model)
+    try:
+        batch = batch_model.model_validate_json(await request.body())
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors()) from exc
+    return _iterate(batch.notes)
+
+
+async def _iterate[T](items: list[T]) -> AsyncIterator[T]:
+    for item in items:
+        yield item
+
+
+@router.post(
+    "/notes/to_fhir",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": NotesToFHIRRequest.model_json_schema()},
+                NDJSON_MEDIA_TYPE: {"schema": NoteToFHIRItem.model_json_schema()},
+            },
+        }
+    },
+)
+async def notes_to_fhir(
+    request: Request,
+    service: NoteToFHIRService = Depends(get_note_to_fhir_service),
+) -> StreamingResponse:
+    """Extract structured data from many notes and convert each to a FHIR Bundle in one request.
+
+    The body is either a JSON ``{"notes": [{"id": ..., "data": ...}, ...]}``
+    object or, with ``Content-Type: application/x-ndjson``, one
+    ``{"id": ..., "data": ...}`` object per line; ``"refresh": true`` on a note
+    bypasses the extraction cache. Notes are processed concurrently up to a
+    server-side limit. Results stream back as NDJSON in completion order, one
+    ``{"index", "id", "fhir_bundle"}`` line per note, with ``"error"`` set
+    instead of ``"fhir_bundle"`` for notes that failed.
+
+    Raises:
+        HTTPException 422: If a JSON body does not match the request schema
+    """
+    notes = await _read_notes(request, NotesToFHIRRequest, NoteToFHIRItem)
+
+    async def results() -> AsyncIterator[NoteToFHIRResult]:
+        async for outcome in service.convert_many(notes):
+            note_id = outcome.item.id if isinstance(outcome.item, NoteToFHIRItem) else None
+            if outcome.error is not None:
+                yield NoteToFHIRResult(index=outcome.index, id=note_id, error=str(outcome.error))
+            else:
+                yield NoteToFHIRResult(index=outcome.index, id=note_id, fhir_bundle=outcome.result)
+
+    return ndjson_response(results())
+
+
 @router.post("/answer_question", response_model=AnswerQuestionResponse)
 async def answer_question(
     payload: AnswerQuestionRequest,
@@ -89,12 +350,32 @@ async def answer_question(
     return AnswerQuestionResponse(answer=answer)
 
 
+@router.post(
+    "/answer_question/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def answer_question_stream(
+    payload: AnswerQuestionRequest,
+    service: AnswerQuestionService = Depends(get_answer_question_service),
+    db: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """Stream an answer as it is generated, as newline-delimited ``{"delta": "..."}`` objects.
+
+    Cached answers arrive as a single line with ``"cached": true``.
+    """
+    return ndjson_response(service.stream_answer(payload.question, db=db))
+
+
 @router.post("/extract_structured", response_model=ExtractStructuredResponse)
 async def extract_structured(
     payload: ExtractStructuredRequest,
     service: ExtractStructuredService = Depends(get_extract_structured_service),
 ) -> ExtractStructuredResponse:
-    structured_data = await service.extract_structured(payload.data)
+    try:
+        structured_data = await service.extract_structured(payload.data, refresh=payload.refresh)
+    except MCPServerPoolUnavailableError as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)) from exc
     return ExtractStructuredResponse(structured_data=structured_data)
 
 
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -12,5 +14,56 @@ class Settings(BaseSettings):
     openai_api_key: str
     pydantic_ai_gateway_api_key: str
 
+    embedding_backend: Literal["openai", "sentence-transformers"] = "openai"
+    embedding_model: str = "text-embedding-3-small"
+    sentence_transformer_model: str = "all-MiniLM-L6-v2"
+    sentence_transformer_batch_size: int = 32
+    sentence_transformer_max_workers: int = 2
+    chunk_max_words: int = 200
+    chunk_overlap_words: int = 40
+    retrieval_top_k: int = 4
+    passage_cache_size: int = 2048
+    hybrid_retrieval_enabled: bool = True
+    retrieval_candidate_k: int = 20
+    retrieval_rrf_k: int = 60
+    vector_index_kind: Literal["auto", "flat", "ivf_flat", "ivf_pq", "hnsw"] = "auto"
+    vector_index_nlist: int | None = None
+    vector_index_pq_m: int | None = None
+    vector_index_hnsw_m: int = 32
+    vector_index_hnsw_max_tombstone_ratio: float = 0.2
+    vector_index_nprobe: int = 16
+    vector_index_ef_search: int = 64
+    vector_index_training_sample_size: int = 100_000
+    index_snapshot_dir: str = "data/snapshots"
+    index_snapshot_every_n_writes: int = 100
+    query_embedding_memo_size: int = 1024
+    answer_cache_max_entries: int = 10_000
+    answer_cache_eviction_policy: Literal["lru", "lfu"] = "lru"
+    answer_cache_ttl_seconds: float | None = None
+    answer_coalesce_similarity: float | None = None
+    summarize_batch_concurrency: int = 8
+    summarize_long_note_words: int = 3000
+    summarize_chunk_words: int = 1000
+    summarize_chunk_overlap_words: int = 50
+    summarize_chunk_concurrency: int = 16
+    summarize_max_reduce_passes: int = 3
+    summary_precompute_concurrency: int = 2
+    note_to_fhir_concurrency: int = 4
+    fhir_validation_mode: Literal["strict", "sample", "off"] = "strict"
+    fhir_validation_sample_rate: float = 0.01
+    terminology_search_limit: int = 5
+    term_code_memo_ttl_seconds: float | None = 30 * 24 * 3600
+    term_code_memo_max_entries: int = 50_000
+    # healthcare-mcp tools whose results are memoized; other tool calls always run.
+    term_code_memo_tools: list[str] = ["lookup_icd_code"]
+    mcp_pool_size: int = 2
+    mcp_pool_lease_timeout_seconds: float = 30.0
+    mcp_pool_health_check_interval_seconds: float = 30.0
+    mcp_pool_health_check_timeout_seconds: float = 5.0
+    mcp_pool_restart_backoff_seconds: float = 1.0
+    embedding_batch_max_size: int = 64
+    embedding_batch_window_ms: float = 5.0
+    embedding_batch_max_concurrency: int = 4
+
 
 settings = Settings()  # type: ignore[call-arg]
@@ -8,7 +8,8 @@ class SingletonMeta(type):
     """
 
     _instances = {}
-    _lock = threading.Lock()  # Lock for thread safety during first instantiation
+    # Reentrant, so a singleton can construct other singletons in its __init__.
+    _lock = threading.RLock()  # Lock for thread safety during first instantiation
 
     def __call__(cls, *args, **kwargs) -> Any:  # type: ignore[reportUnknownParameterType]
         """
@@ -0,0 +1,37 @@
+"""Additive schema upgrades for databases created by older versions of the app.
+
+Tables are created with ``Base.metadata.create_all``, which never alters an
+existing table. ``add_missing_columns`` fills that gap for the one kind of
+change made so far: new nullable columns (and their indexes) on existing tables.
+"""
+
+from typing import Any
+
+from sqlalchemy import Connection, inspect
+from sqlalchemy.schema import CreateIndex
+
+from app.models.document import Base
+
+
+def add_missing_columns(connection: Connection, **kw: Any) -> None:
+    """Add mapped columns and indexes that are missing from existing tables.
+
+    Intended for ``AsyncConnection.run_sync`` right after ``create_all``.
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            assert column.nullable, f"cannot add NOT NULL column {table.name}.{column.name}"
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
+            print(f"Added column {table.name}.{column.name}")
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))
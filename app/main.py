@@ -1,3 +1,4 @@
+import asyncio
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
@@ -5,9 +6,12 @@ from dotenv import load_dotenv
 from fastapi import FastAPI
 
 from app.api.routes import router
+from app.db.migrations import add_missing_columns
 from app.db.session import async_engine
 from app.fixtures import load_fixtures
 from app.models.document import Base
+from app.services.document_summary_service import get_document_summary_service
+from app.services.mcp_server_pool import get_healthcare_mcp_pool
 
 load_dotenv()
 
@@ -16,8 +20,15 @@ load_dotenv()
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     async with async_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
     await load_fixtures()
+    mcp_pool = get_healthcare_mcp_pool()
+    await mcp_pool.start()
+    # Summarize seeded and any other unsummarized documents without delaying startup.
+    precompute_summaries = asyncio.create_task(get_document_summary_service().precompute_missing())
     yield
+    precompute_summaries.cancel()
+    await mcp_pool.close()
 
 
 app = FastAPI(title="Deerfield Assessment API Backend", lifespan=lifespan)
@@ -0,0 +1,61 @@
+from typing import Any
+
+from sqlalchemy import Connection, ForeignKey, Integer, MetaData, String, event, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.document import Base
+
+
+class DocumentChunk(Base):
+    __tablename__ = "document_chunks"
+    # Never reuse ids: index snapshots treat an id as identifying one immutable chunk.
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    document_id: Mapped[int] = mapped_column(ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    chunk_index: Mapped[int] = mapped_column(Integer, nullable=False)
+    content: Mapped[str] = mapped_column(String, nullable=False)
+
+
+# Full-text index over chunks for BM25 retrieval. It is an FTS5 virtual table, which
+# SQLAlchemy cannot declare, so it is created next to the mapped tables and kept in
+# sync with document_chunks (and document titles) by triggers.
+DOCUMENT_CHUNKS_FTS_TABLE = "document_chunks_fts"
+
+_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {DOCUMENT_CHUNKS_FTS_TABLE} "
+    "USING fts5(title, content, tokenize = 'porter unicode61')",
+    f"""CREATE TRIGGER IF NOT EXISTS document_chunks_fts_insert AFTER INSERT ON document_chunks BEGIN
+        INSERT INTO {DOCUMENT_CHUNKS_FTS_TABLE}(rowid, title, content)
+        VALUES (new.id, (SELECT title FROM documents WHERE id = new.document_id), new.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS document_chunks_fts_delete AFTER DELETE ON document_chunks BEGIN
+        DELETE FROM {DOCUMENT_CHUNKS_FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS documents_fts_title AFTER UPDATE OF title ON documents BEGIN
+        UPDATE {DOCUMENT_CHUNKS_FTS_TABLE} SET title = new.title
+        WHERE rowid IN (SELECT id FROM document_chunks WHERE document_id = new.id);
+    END""",
+)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_fts(target: MetaData, connection: Connection, **kw: Any) -> None:
+    """Create the chunk FTS table and its triggers, rebuilding it if it is out of sync."""
+    for statement in _FTS_DDL:
+        connection.execute(text(statement))
+    fts_count = connection.execute(text(f"SELECT count(*) FROM {DOCUMENT_CHUNKS_FTS_TABLE}")).scalar_one()
+    chunk_count = connection.execute(text("SELECT count(*) FROM document_chunks")).scalar_one()
+    if fts_count != chunk_count:
+        connection.execute(text(f"DELETE FROM {DOCUMENT_CHUNKS_FTS_TABLE}"))
+        connection.execute(
+            text(
+                f"INSERT INTO {DOCUMENT_CHUNKS_FTS_TABLE}(rowid, title, content) "
+                "SELECT c.id, d.title, c.content FROM document_chunks c JOIN documents d ON d.id = c.document_id"
+            )
+        )
+
+
+@event.listens_for(Base.metadata, "before_drop")
+def _drop_fts(target: MetaData, connection: Connection, **kw: Any) -> None:
+    connection.execute(text(f"DROP TABLE IF EXISTS {DOCUMENT_CHUNKS_FTS_TABLE}"))
@@ -0,0 +1,17 @@
+from sqlalchemy import Float, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.document import Base
+
+
+class DocumentSummary(Base):
+    """Precomputed summary of a document's content, shared by documents with identical content.
+
+    ``content_hash`` hashes the content together with the version of the summarizer that wrote it.
+    """
+
+    __tablename__ = "document_summaries"
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    summary: Mapped[str] = mapped_column(String, nullable=False)
+    created_at: Mapped[float] = mapped_column(Float, nullable=False)
@@ -0,0 +1,15 @@
+from sqlalchemy import Float, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.document import Base
+
+
+class ExtractionResult(Base):
+    """Cached structured data extracted from a note, keyed by the note, prompt and model."""
+
+    __tablename__ = "extraction_results"
+
+    cache_key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    # JSON-encoded StructuredData.
+    structured_data: Mapped[str] = mapped_column(String, nullable=False)
+    created_at: Mapped[float] = mapped_column(Float, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import String
+from sqlalchemy import Float, Integer, LargeBinary, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.models.document import Base
@@ -10,3 +10,13 @@ class QuestionAnswer(Base):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     question: Mapped[str] = mapped_column(String, nullable=False)
     answer: Mapped[str] = mapped_column(String, nullable=False)
+    # Hash of the normalized question, for exact-match cache lookups. Null on rows
+    # written before it existed until the cache backfills them at startup.
+    question_hash: Mapped[str | None] = mapped_column(String(64), index=True)
+    # float32 question embedding, so the semantic cache can be rebuilt without embedding calls.
+    question_vector: Mapped[bytes | None] = mapped_column(LargeBinary)
+    embedding_model: Mapped[str | None] = mapped_column(String)
+    # Cache bookkeeping (unix timestamps). Null on rows written before it existed until backfilled.
+    created_at: Mapped[float | None] = mapped_column(Float)
+    hit_count: Mapped[int | None] = mapped_column(Integer)
+    last_hit_at: Mapped[float | None] = mapped_column(Float)
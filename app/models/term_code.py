@@ -0,0 +1,19 @@
+from sqlalchemy import Float, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.document import Base
+
+
+class TermCode(Base):
+    """Memoized result of resolving a normalized term to terminology codes."""
+
+    __tablename__ = "term_codes"
+
+    # What the term was resolved with, e.g. "lookup:condition" or "tool:<MCP tool name>".
+    namespace: Mapped[str] = mapped_column(String, primary_key=True)
+    term: Mapped[str] = mapped_column(String, primary_key=True)
+    # JSON-encoded tool result.
+    result: Mapped[str] = mapped_column(String, nullable=False)
+    created_at: Mapped[float] = mapped_column(Float, nullable=False)
+    hit_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_hit_at: Mapped[float | None] = mapped_column(Float)
@@ -0,0 +1,52 @@
+from typing import Any
+
+from sqlalchemy import Connection, MetaData, String, UniqueConstraint, event, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.document import Base
+
+
+class TerminologyConcept(Base):
+    """A code from a clinical code system (ICD-10-CM, ICD-10-PCS or RxNorm) and its description."""
+
+    __tablename__ = "terminology_concepts"
+    __table_args__ = (UniqueConstraint("system", "code"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    system: Mapped[str] = mapped_column(String, nullable=False)
+    code: Mapped[str] = mapped_column(String, nullable=False)
+    display: Mapped[str] = mapped_column(String, nullable=False)
+
+
+# Full-text index over concept descriptions. It is an external-content FTS5 table
+# reading from terminology_concepts, so descriptions are not stored twice; the
+# system column is indexed too so searches can be restricted to one code system.
+TERMINOLOGY_FTS_TABLE = "terminology_concepts_fts"
+
+_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TERMINOLOGY_FTS_TABLE} USING fts5("
+    "system, display, content = 'terminology_concepts', content_rowid = 'id', tokenize = 'porter unicode61')",
+    f"""CREATE TRIGGER IF NOT EXISTS terminology_concepts_fts_insert AFTER INSERT ON terminology_concepts BEGIN
+        INSERT INTO {TERMINOLOGY_FTS_TABLE}(rowid, system, display) VALUES (new.id, new.system, new.display);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS terminology_concepts_fts_delete AFTER DELETE ON terminology_concepts BEGIN
+        INSERT INTO {TERMINOLOGY_FTS_TABLE}({TERMINOLOGY_FTS_TABLE}, rowid, system, display)
+        VALUES ('delete', old.id, old.system, old.display);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS terminology_concepts_fts_update AFTER UPDATE ON terminology_concepts BEGIN
+        INSERT INTO {TERMINOLOGY_FTS_TABLE}({TERMINOLOGY_FTS_TABLE}, rowid, system, display)
+        VALUES ('delete', old.id, old.system, old.display);
+        INSERT INTO {TERMINOLOGY_FTS_TABLE}(rowid, system, display) VALUES (new.id, new.system, new.display);
+    END""",
+)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_fts(target: MetaData, connection: Connection, **kw: Any) -> None:
+    for statement in _FTS_DDL:
+        connection.execute(text(statement))
+
+
+@event.listens_for(Base.metadata, "before_drop")
+def _drop_fts(target: MetaData, connection: Connection, **kw: Any) -> None:
+    connection.execute(text(f"DROP TABLE IF EXISTS {TERMINOLOGY_FTS_TABLE}"))
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseModel, Field
 
 
@@ -7,3 +9,16 @@ class AnswerQuestionRequest(BaseModel):
 
 class AnswerQuestionResponse(BaseModel):
     answer: str
+
+
+class AnswerCacheStats(BaseModel):
+    entries: int
+    max_entries: int
+    eviction_policy: Literal["lru", "lfu"]
+    ttl_seconds: float | None
+    exact_hits: int
+    semantic_hits: int
+    misses: int
+    hit_rate: float
+    evictions: int
+    expirations: int
@@ -12,3 +12,21 @@ class DocumentResponse(BaseModel):
     id: int
     title: str
     content: str
+
+
+class DocumentUpdate(BaseModel):
+    title: str = Field(min_length=1)
+    content: str = Field(min_length=1)
+
+
+class IndexStatusResponse(BaseModel):
+    built: bool
+    indexed_count: int
+    pending_count: int
+    lag_seconds: float
+    last_indexed_at: float | None
+
+
+class DocumentSummaryResponse(BaseModel):
+    document_id: int
+    summary: str
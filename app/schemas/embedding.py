@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+
+
+class EmbeddingBatcherStats(BaseModel):
+    queue_depth: int
+    in_flight_batches: int
+    max_concurrency: int
+    total_requests: int
+    total_batches: int
+    mean_batch_size: float
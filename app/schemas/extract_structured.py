@@ -3,6 +3,9 @@ from pydantic import BaseModel, Field
 
 class ExtractStructuredRequest(BaseModel):
     data: str = Field(description="The medical note to extract structured data from")
+    refresh: bool = Field(
+        default=False, description="Bypass the result cache and re-extract, replacing any cached result"
+    )
 
 
 class Condition(BaseModel):
@@ -2,7 +2,7 @@ from typing import Any
 
 from pydantic import BaseModel, Field
 
-from app.schemas.extract_structured import StructuredData
+from app.schemas.extract_structured import ExtractStructuredRequest, StructuredData
 
 
 class FHIRConversionRequest(BaseModel):
@@ -11,3 +11,39 @@ class FHIRConversionRequest(BaseModel):
 
 class FHIRConversionResponse(BaseModel):
     fhir_bundle: dict[str, Any] = Field(description="The FHIR Bundle containing all resources")
+
+
+class NoteToFHIRItem(ExtractStructuredRequest):
+    """One note of a note-to-FHIR pipeline request.
+
+    Attributes:
+        id: Optional caller-chosen identifier echoed back in the result
+    """
+
+    id: str | None = Field(default=None, description="Caller-chosen identifier echoed back in the result")
+
+
+class NotesToFHIRRequest(BaseModel):
+    """Request schema for the note-to-FHIR pipeline.
+
+    Attributes:
+        notes: The notes to convert
+    """
+
+    notes: list[NoteToFHIRItem] = Field(min_length=1, description="Notes to convert to FHIR")
+
+
+class NoteToFHIRResult(BaseModel):
+    """One line of the streamed note-to-FHIR response.
+
+    Attributes:
+        index: Position of the note in the request
+        id: Identifier given with the note, if any
+        fhir_bundle: The FHIR Bundle, unless the note failed
+        error: Why the note failed, if it did
+    """
+
+    index: int
+    id: str | None = None
+    fhir_bundle: dict[str, Any] | None = None
+    error: str | None = None
@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+
+
+class TextDelta(BaseModel):
+    """One line of a streamed text response."""
+
+    delta: str = Field(description="Next piece of generated text")
+    cached: bool = Field(default=False, description="Whether the text was served whole from a cache")
+
+
+class StreamError(BaseModel):
+    """Final line of a stream that failed after the response had started."""
+
+    error: str
@@ -23,3 +23,39 @@ class SummarizeResponse(BaseModel):
     """
 
     summary: str = Field(description="Generated summary of the medical note")
+
+
+class BatchSummarizeItem(SummarizeRequest):
+    """One note of a batch summarization request.
+
+    Attributes:
+        id: Optional caller-chosen identifier echoed back in the result
+    """
+
+    id: str | None = Field(default=None, description="Caller-chosen identifier echoed back in the result")
+
+
+class BatchSummarizeRequest(BaseModel):
+    """Request schema for batch summarization.
+
+    Attributes:
+        notes: The notes to summarize
+    """
+
+    notes: list[BatchSummarizeItem] = Field(min_length=1, description="Notes to summarize")
+
+
+class BatchSummarizeResult(BaseModel):
+    """One line of the streamed batch summarization response.
+
+    Attributes:
+        index: Position of the note in the request
+        id: Identifier given with the note, if any
+        summary: The generated summary, unless the note failed
+        error: Why the note failed, if it did
+    """
+
+    index: int
+    id: str | None = None
+    summary: str | None = None
+    error: str | None = None
@@ -0,0 +1,30 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+CodeSystem = Literal["icd10cm", "icd10pcs", "rxnorm"]
+
+
+class TerminologyMatch(BaseModel):
+    system: CodeSystem = Field(description="The code system: icd10cm, icd10pcs or rxnorm")
+    code: str = Field(description="The code, e.g. E78.5 or RxCUI 36567")
+    display: str = Field(description="The description of the code")
+
+
+class CodeLookup(BaseModel):
+    term: str = Field(description="The condition, diagnosis, treatment or medication name as written in the note")
+    kind: Literal["condition", "diagnosis", "treatment", "medication"] = Field(description="What the term names")
+
+
+class CodeLookupResult(BaseModel):
+    term: str = Field(description="The term that was looked up")
+    matches: list[TerminologyMatch] = Field(description="Candidate codes, best match first")
+
+
+class TermCodeMemoStats(BaseModel):
+    entries: int
+    ttl_seconds: float | None
+    hits: int
+    misses: int
+    hit_rate: float
+    expirations: int
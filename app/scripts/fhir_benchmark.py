@@ -0,0 +1,59 @@
+"""Conversion time of FHIR bundles per validation mode.
+
+``strict`` validates every bundle with ``fhir.resources``, the cost of building
+the bundle as a ``fhir.resources`` object graph; ``off`` is the template output
+alone, and ``sample`` adds validation of ``fhir_validation_sample_rate`` of bundles.
+
+Usage:
+    uv run python -m app.scripts.fhir_benchmark
+    uv run python -m app.scripts.fhir_benchmark --items 2000 --repeat 5
+"""
+
+import argparse
+import itertools
+import time
+
+from app.core.config import settings
+from app.schemas.extract_structured import Condition, Diagnosis, Medication, StructuredData, Treatment
+from app.services.fhir_conversion_service import FHIRConversionService, FHIRValidationMode
+
+
+def synthetic_structured_data(n_items: int) -> StructuredData:
+    """A patient with ``n_items`` each of conditions, diagnoses, treatments and medications."""
+    return StructuredData(
+        name="Benchmark Patient",
+        age=60,
+        conditions=[Condition(name=f"Condition {i}", icd_code=f"E78.{i}") for i in range(n_items)],
+        diagnoses=[Diagnosis(name=f"Diagnosis {i}", icd_code=f"I10.{i}") for i in range(n_items)],
+        treatments=[Treatment(name=f"Treatment {i}", icd_code=f"0DT{i}") for i in range(n_items)],
+        medications=[Medication(name=f"Medication {i}", rx_norm_code=str(36567 + i)) for i in range(n_items)],
+    )
+
+
+def time_conversion(structured_data: StructuredData, mode: FHIRValidationMode, repeat: int) -> float:
+    """Return the mean seconds per conversion, with ids numbered instead of random."""
+    counter = itertools.count()
+    service = FHIRConversionService(validation_mode=mode, id_factory=lambda: f"id-{next(counter)}")
+    start = time.perf_counter()
+    for _ in range(repeat):
+        service.convert_to_fhir(structured_data)
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=500, help="number of each kind of item in the payload")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    structured_data = synthetic_structured_data(args.items)
+    print(f"{4 * args.items + 1} resources per bundle, sample rate {settings.fhir_validation_sample_rate}")
+    print(f"{'mode':<10}{'ms':>10}{'speedup':>10}")
+    strict_seconds = time_conversion(structured_data, "strict", args.repeat)
+    for mode in ("strict", "sample", "off"):
+        seconds = strict_seconds if mode == "strict" else time_conversion(structured_data, mode, args.repeat)
+        print(f"{mode:<10}{seconds * 1000:>10.2f}{strict_seconds / seconds:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Recall-versus-latency report for the document index kinds.
+
+Every approximate configuration is measured against the exact ``flat`` index
+on the same vectors, so ``vector_index_*`` settings can be chosen with evidence.
+
+Usage:
+    uv run python -m app.scripts.index_report
+    uv run python -m app.scripts.index_report --synthetic 200000 --dimension 384
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import select
+
+from app.db.session import SessionLocal
+from app.models.embedding import Embedding
+from app.services.embedders import get_embedder
+from app.services.vector_index import IndexKind, VectorIndex, create_vector_index, default_nlist
+
+
+@dataclass(frozen=True)
+class IndexConfig:
+    kind: IndexKind
+    nprobe: int | None = None
+    ef_search: int | None = None
+
+    @property
+    def label(self) -> str:
+        if self.nprobe is not None:
+            return f"{self.kind} nprobe={self.nprobe}"
+        if self.ef_search is not None:
+            return f"{self.kind} efSearch={self.ef_search}"
+        return self.kind
+
+
+@dataclass(frozen=True)
+class IndexReportRow:
+    label: str
+    build_seconds: float
+    mean_query_ms: float
+    recall_at_k: float
+
+
+DEFAULT_CONFIGS = [
+    *(IndexConfig("ivf_flat", nprobe=nprobe) for nprobe in (1, 4, 16, 64)),
+    *(IndexConfig("ivf_pq", nprobe=nprobe) for nprobe in (4, 16, 64)),
+    *(IndexConfig("hnsw", ef_search=ef_search) for ef_search in (16, 64, 256)),
+]
+
+
+def load_stored_vectors() -> np.ndarray:
+    """Load every vector persisted for the configured embedder."""
+    model_name = get_embedder().model_name
+    with SessionLocal() as db:
+        blobs = db.execute(select(Embedding.vector).where(Embedding.model == model_name)).scalars().all()
+    return np.vstack([np.frombuffer(blob, dtype=np.float32) for blob in blobs])
+
+
+def synthetic_vectors(n_vectors: int, dimension: int, n_clusters: int = 100, seed: int = 0) -> np.ndarray:
+    """Unit-normalized vectors drawn around random centers, loosely mimicking text embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dimension)).astype(np.float32)
+    vectors = centers[rng.integers(n_clusters, size=n_vectors)]
+    vectors += 0.5 * rng.standard_normal((n_vectors, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _build(vectors: np.ndarray, config: IndexConfig) -> tuple[VectorIndex, float]:
+    start = time.perf_counter()
+    index = create_vector_index(vectors.shape[1], kind=config.kind, training_vectors=vectors)
+    index.add(vectors, np.arange(len(vectors), dtype=np.int64))
+    return index, time.perf_counter() - start
+
+
+def _query(index: VectorIndex, queries: np.ndarray, k: int) -> tuple[np.ndarray, float]:
+    results: list[np.ndarray] = []
+    start = time.perf_counter()
+    for query in queries:
+        _, ids = index.search(query.reshape(1, -1), k=k)
+        results.append(ids[0])
+    return np.vstack(results), (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def build_report(
+    vectors: np.ndarray, n_queries: int = 200, k: int = 10, configs: list[IndexConfig] = DEFAULT_CONFIGS
+) -> list[IndexReportRow]:
+    """Measure build time, per-query latency and recall@k of each config against the flat index.
+
+    Queries are corpus vectors with a little noise added, issued one at a time
+    as they are in the answer_question path.
+    """
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+
+    exact_index, exact_build = _build(vectors, IndexConfig("flat"))
+    exact_ids, exact_ms = _query(exact_index, queries, k)
+    rows = [IndexReportRow("flat (exact)", exact_build, exact_ms, 1.0)]
+
+    built: dict[IndexKind, tuple[VectorIndex, float]] = {}
+    for config in configs:
+        if config.kind not in built:
+            built[config.kind] = _build(vectors, config)
+        index, build_seconds = built[config.kind]
+        if index.kind != config.kind:
+            continue  # Too few vectors to train this kind.
+        index.set_search_params(nprobe=config.nprobe, ef_search=config.ef_search)
+        ids, query_ms = _query(index, queries, k)
+        hits = sum(len(set(row) & set(exact_row)) for row, exact_row in zip(ids, exact_ids, strict=True))
+        rows.append(IndexReportRow(config.label, build_seconds, query_ms, hits / exact_ids.size))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, help="benchmark N synthetic vectors instead of stored ones")
+    parser.add_argument("--dimension", type=int, default=1536, help="dimension of synthetic vectors")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.synthetic, args.dimension) if args.synthetic else load_stored_vectors()
+    print(f"{len(vectors)} vectors, dimension {vectors.shape[1]}, nlist {default_nlist(len(vectors))}, k {args.k}")
+    print(f"{'index':<28}{'build s':>10}{'query ms':>10}{'recall@k':>10}")
+    for row in build_report(vectors, n_queries=args.queries, k=args.k):
+        print(f"{row.label:<28}{row.build_seconds:>10.2f}{row.mean_query_ms:>10.3f}{row.recall_at_k:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
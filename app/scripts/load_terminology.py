@@ -0,0 +1,51 @@
+"""Load ICD-10-CM, ICD-10-PCS and RxNorm code files into the local terminology index.
+
+Each code system given replaces any previously loaded version of it. Restart
+the API afterwards so extraction picks the local index up.
+
+Files:
+    --icd10cm   icd10cm_codes_YYYY.txt from the CMS ICD-10-CM release
+    --icd10pcs  icd10pcs_codes_YYYY.txt from the CMS ICD-10-PCS release
+    --rxnorm    RXNCONSO.RRF from the NLM RxNorm full release
+
+Usage:
+    uv run python -m app.scripts.load_terminology --icd10cm icd10cm_codes_2025.txt --rxnorm rrf/RXNCONSO.RRF
+"""
+
+import argparse
+import time
+from collections.abc import Callable, Iterable, Iterator
+
+from app.db.session import SessionLocal, sync_engine
+from app.models.document import Base
+from app.schemas.terminology import CodeSystem
+from app.services.terminology_service import load_concepts, parse_icd10_codes, parse_rxnconso
+
+PARSERS: dict[CodeSystem, Callable[[Iterable[str]], Iterator[tuple[str, str]]]] = {
+    "icd10cm": parse_icd10_codes,
+    "icd10pcs": parse_icd10_codes,
+    "rxnorm": parse_rxnconso,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for system in PARSERS:
+        parser.add_argument(f"--{system}", metavar="PATH", help=f"{system} code file")
+    args = parser.parse_args()
+    files: dict[CodeSystem, str] = {system: path for system in PARSERS if (path := getattr(args, system))}
+    if not files:
+        parser.error("give at least one code file")
+
+    Base.metadata.create_all(sync_engine)
+    with SessionLocal() as db:
+        for system, path in files.items():
+            start = time.perf_counter()
+            with open(path, encoding="utf-8", errors="replace") as lines:
+                count = load_concepts(db, system, PARSERS[system](lines))
+            db.commit()
+            print(f"Loaded {count} {system} concepts from {path} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,67 +1,424 @@
-import faiss
+"""Two-tier, capacity-bounded cache of answered questions.
+
+The first tier is an exact-match map keyed by ``question_hash`` of the
+normalized question, answered without an embedding call. Misses fall through
+to the semantic tier, a FAISS index of question embeddings that matches
+paraphrases above a similarity threshold. Answers for both tiers are kept in
+an in-process entry store keyed by FAISS id, so a hit touches neither the
+database nor a thread pool; new answers are written through to ``question_answers``.
+
+The cache holds at most ``answer_cache_max_entries`` answers. Beyond that the
+least recently used (``lru``) or least frequently used (``lfu``) entries are
+evicted, and with ``answer_cache_ttl_seconds`` set, entries expire that long
+after they were written. Evicted entries are removed from the FAISS index and
+their ``question_answers`` rows are deleted, so memory and startup cost stay flat.
+"""
+
+import asyncio
+import hashlib
+import heapq
+import re
+import time
+from dataclasses import dataclass
+from typing import Literal
+
 import numpy as np
-from openai import OpenAI
+from sqlalchemy import Row, delete, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.singleton import SingletonMeta
 from app.db.session import sync_engine
 from app.models.question_answer import QuestionAnswer
+from app.schemas.answer_question import AnswerCacheStats
+from app.services.embedders import get_embedder
+from app.services.index_snapshot import IndexSnapshot, IndexSnapshotManifest
+from app.services.query_embedding_service import QueryEmbedding
+from app.services.vector_index import create_vector_index
+
+EvictionPolicy = Literal["lru", "lfu"]
+
+# Keep IN (...) lookups well below SQLite's bound-parameter limit.
+_LOOKUP_BATCH_SIZE = 500
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Case-fold, strip punctuation and collapse whitespace, so trivially different phrasings match."""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub("", question.casefold())).strip()
+
+
+def question_hash(question: str) -> str:
+    """Return the hex SHA-256 digest of the normalized question."""
+    return hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
 
 
-class AnswerQuestionCacheService:
+@dataclass(slots=True)
+class CacheEntry:
+    """In-memory state of one cached answer; written through to its ``question_answers`` row."""
+
+    question_hash: str
+    answer: str
+    created_at: float
+    hit_count: int = 0
+    last_hit_at: float | None = None
+
+    @property
+    def last_used_at(self) -> float:
+        return self.last_hit_at if self.last_hit_at is not None else self.created_at
+
+
+def select_evictions(entries: dict[int, CacheEntry], count: int, policy: EvictionPolicy) -> list[int]:
+    """Pick the ids of the ``count`` entries to evict under ``policy``.
+
+    ``lru`` evicts the entries used least recently; ``lfu`` evicts the entries
+    with the fewest hits, least recently used first among ties.
+    """
+    if count <= 0:
+        return []
+    if policy == "lfu":
+        return heapq.nsmallest(
+            count, entries, key=lambda qa_id: (entries[qa_id].hit_count, entries[qa_id].last_used_at)
+        )
+    return heapq.nsmallest(count, entries, key=lambda qa_id: entries[qa_id].last_used_at)
+
+
+class AnswerQuestionCacheService(metaclass=SingletonMeta):
     def __init__(self):
-        dim = 1536
-        base_index = faiss.IndexFlatIP(dim)
-        self._index = faiss.IndexIDMap(base_index)
-        self._client = OpenAI(api_key=settings.openai_api_key)
+        self._embedder = get_embedder()
+        self._max_entries = settings.answer_cache_max_entries
+        self._policy: EvictionPolicy = settings.answer_cache_eviction_policy
+        self._ttl_seconds = settings.answer_cache_ttl_seconds
+        self._entries: dict[int, CacheEntry] = {}
+        # Exact-match tier: normalized question hash -> id of the newest entry for it.
+        self._ids_by_hash: dict[str, int] = {}
+        # Entries whose hit statistics changed since they were last written to the database.
+        self._dirty_ids: set[int] = set()
+        # Ids evicted while no database session was at hand; their rows are deleted on the next write.
+        self._pending_deletes: set[int] = set()
+        self._exact_hits = 0
+        self._semantic_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._snapshot = IndexSnapshot("question_answers")
+        self._index = create_vector_index(self._embedder.dimension)
+        self._max_id = 0
+        self._writes_since_snapshot = 0
 
         # Load existing cached questions from database
         self._load_cached_questions()
 
     def _load_cached_questions(self) -> None:
-        """Load all cached questions from database and populate FAISS index."""
+        """Populate the cache from the database and the FAISS index from its snapshot.
+
+        Rows missing from the snapshot are embedded and added, and expired or
+        over-capacity entries are pruned before the cache starts serving.
+        """
         with Session(sync_engine) as session:
-            cached_qa_pairs = session.query(QuestionAnswer).all()
+            self._backfill_rows(session)
+            self._load_entries(session)
+            live_ids = set(self._entries)
+            snapshot = self._snapshot.load(self._embedder.model_name, self._embedder.dimension)
+            stale_ids: list[int] = []
+            replay_ids = sorted(live_ids)
+            if snapshot is not None:
+                self._index, manifest = snapshot
+                stale_ids = sorted(set(self._index.ids().tolist()) - live_ids)
+                self._index.remove(np.array(stale_ids, dtype=np.int64))
+                # Rows newer than the snapshot, including any that reused the id of an evicted row.
+                saved_at = manifest.saved_at or 0.0
+                replay_ids = [
+                    qa_id
+                    for qa_id in replay_ids
+                    if qa_id > manifest.max_id or self._entries[qa_id].created_at > saved_at
+                ]
+            self._max_id = max(live_ids, default=0)
 
-            if not cached_qa_pairs:
+            if not live_ids:
                 print("No cached questions found in database")
                 return
 
-            questions = [qa.question for qa in cached_qa_pairs]
-            embeddings_response = self._client.embeddings.create(model="text-embedding-3-small", input=questions)
-            vectors = np.array([emb.embedding for emb in embeddings_response.data], dtype="float32")
-            ids = np.array([qa.id for qa in cached_qa_pairs], dtype=np.int64)
+            if replay_ids:
+                ids = np.array(replay_ids, dtype=np.int64)
+                self._index.remove(ids)
+                self._index.add(self._load_question_vectors(session, replay_ids), ids)
+
+            evicted = self._evict_expired(time.time()) + self._evict_over_capacity(incoming=0)
+            if evicted:
+                session.execute(delete(QuestionAnswer).where(QuestionAnswer.id.in_(evicted)))
+                session.commit()
+                self._pending_deletes.clear()
+
+            if snapshot is None or replay_ids or stale_ids or evicted:
+                self._snapshot.save(*self._snapshot_payload())
+
+    def _load_question_vectors(self, session: Session, qa_ids: list[int]) -> np.ndarray:
+        """Return the stored question vectors of ``qa_ids`` (ascending), in the same order.
 
-            self._index.add_with_ids(vectors, ids)  # type: ignore
+        Vectors are read from ``question_vector`` blobs with a single ``frombuffer``.
+        Rows without a vector from the current embedder (written before the column
+        existed, or by another model) are embedded once and their vectors persisted.
+        """
+        rows: list[Row[tuple[int, str, bytes | None, str | None]]] = []
+        for start in range(0, len(qa_ids), _LOOKUP_BATCH_SIZE):
+            rows.extend(
+                session.execute(
+                    select(
+                        QuestionAnswer.id,
+                        QuestionAnswer.question,
+                        QuestionAnswer.question_vector,
+                        QuestionAnswer.embedding_model,
+                    )
+                    .where(QuestionAnswer.id.in_(qa_ids[start : start + _LOOKUP_BATCH_SIZE]))
+                    .order_by(QuestionAnswer.id)
+                ).all()
+            )
+        dimension = self._embedder.dimension
+        row_bytes = dimension * np.dtype(np.float32).itemsize
+        stored = [
+            row.embedding_model == self._embedder.model_name and len(row.question_vector or b"") == row_bytes
+            for row in rows
+        ]
+        if all(stored):
+            blob = b"".join(row.question_vector for row in rows)
+            return np.frombuffer(blob, dtype=np.float32).reshape(len(rows), dimension)
 
-    def get_answer(self, question: str) -> str | None:
-        question_embedding = self._client.embeddings.create(model="text-embedding-3-small", input=question)
-        query_vector = np.array([question_embedding.data[0].embedding], dtype="float32")
-        similarities, ids = self._index.search(query_vector, k=1)  # type: ignore
+        vectors = np.empty((len(rows), dimension), dtype=np.float32)
+        fresh = [i for i, is_stored in enumerate(stored) if is_stored]
+        stale = [i for i, is_stored in enumerate(stored) if not is_stored]
+        if fresh:
+            blob = b"".join(rows[i].question_vector for i in fresh)
+            vectors[fresh] = np.frombuffer(blob, dtype=np.float32).reshape(len(fresh), dimension)
+        print(f"Embedding {len(stale)} cached question(s) without a stored vector")
+        vectors[stale] = self._embedder.embed([rows[i].question for i in stale])
+        session.execute(
+            update(QuestionAnswer),
+            [
+                {
+                    "id": rows[i].id,
+                    "question_vector": vectors[i].tobytes(),
+                    "embedding_model": self._embedder.model_name,
+                }
+                for i in stale
+            ],
+        )
+        session.commit()
+        return vectors
+
+    def _backfill_rows(self, session: Session) -> None:
+        """Fill columns that are null on rows written before they existed."""
+        unhashed = session.execute(
+            select(QuestionAnswer.id, QuestionAnswer.question).where(QuestionAnswer.question_hash.is_(None))
+        ).all()
+        if unhashed:
+            session.execute(
+                update(QuestionAnswer),
+                [{"id": qa_id, "question_hash": question_hash(question)} for qa_id, question in unhashed],
+            )
+        # The TTL of pre-existing rows starts counting now.
+        session.execute(
+            update(QuestionAnswer)
+            .where(QuestionAnswer.created_at.is_(None))
+            .values(created_at=time.time(), hit_count=0)
+        )
+        session.commit()
+
+    def _load_entries(self, session: Session) -> None:
+        rows = session.execute(
+            select(
+                QuestionAnswer.id,
+                QuestionAnswer.question_hash,
+                QuestionAnswer.answer,
+                QuestionAnswer.created_at,
+                QuestionAnswer.hit_count,
+                QuestionAnswer.last_hit_at,
+            ).order_by(QuestionAnswer.id)
+        )
+        for qa_id, qa_hash, answer, created_at, hit_count, last_hit_at in rows:
+            self._entries[qa_id] = CacheEntry(qa_hash, answer, created_at, hit_count or 0, last_hit_at)
+            # Ascending ids, so the newest answer wins for repeated questions.
+            self._ids_by_hash[qa_hash] = qa_id
+
+    async def get_answer(self, query: QueryEmbedding, db: AsyncSession | None = None) -> str | None:
+        """Return a cached answer for the question, trying the exact-match tier before the semantic one.
+
+        Hits are served from the in-process entry store without touching the
+        database. ``db`` is only used as a fallback, when the FAISS index returns
+        an id whose entry is not in memory.
+        """
+        qa_id = self._ids_by_hash.get(question_hash(query.text))
+        if qa_id is not None and (entry := self._record_hit(qa_id)) is not None:
+            self._exact_hits += 1
+            return entry.answer
+
+        similarities, ids = self._index.search(await query.get_vector(), k=1)
         if ids[0][0] == -1:
+            self._misses += 1
             return None
 
         threshold = 0.9
         similarity_score = similarities[0][0]
         if similarity_score < threshold:
+            self._misses += 1
             return None
 
         question_id = int(ids[0][0])  # type: ignore
-        with Session(sync_engine) as session:
-            question_answer = session.get(QuestionAnswer, question_id)
-            if question_answer:
-                print(f"Cache hit! Question: {question_answer.question}")
-                return question_answer.answer
+        if question_id not in self._entries and db is not None:
+            await self._load_entry(question_id, db)
+        entry = self._record_hit(question_id)
+        if entry is None:
+            self._misses += 1
+            return None
+        print(f"Cache hit! Question id: {question_id}")
+        self._semantic_hits += 1
+        return entry.answer
+
+    async def _load_entry(self, qa_id: int, db: AsyncSession) -> None:
+        """Load a single entry into memory from its row, if it still exists and is not pending deletion."""
+        if qa_id in self._pending_deletes:
+            return
+        question_answer = await db.get(QuestionAnswer, qa_id)
+        if question_answer is None or question_answer.question_hash is None or question_answer.created_at is None:
+            return
+        self._entries[qa_id] = CacheEntry(
+            question_answer.question_hash,
+            question_answer.answer,
+            question_answer.created_at,
+            question_answer.hit_count or 0,
+            question_answer.last_hit_at,
+        )
 
-        return None
+    async def set_answer(self, query: QueryEmbedding, answer: str, db: AsyncSession) -> None:
+        """Store a new answer, evicting expired and over-capacity entries in the same transaction.
 
-    async def set_answer(self, question: str, answer: str, db: AsyncSession) -> None:
-        question_embedding = self._client.embeddings.create(model="text-embedding-3-small", input=question)
-        query_vector = np.array([question_embedding.data[0].embedding], dtype="float32")
-        question_answer = QuestionAnswer(question=question, answer=answer)
+        Hit statistics gathered since the last write are persisted alongside it.
+        """
+        query_vector = await query.get_vector()
+        now = time.time()
+        qa_hash = question_hash(query.text)
+        question_answer = QuestionAnswer(
+            question=query.text,
+            answer=answer,
+            question_hash=qa_hash,
+            question_vector=query_vector.astype(np.float32).tobytes(),
+            embedding_model=self._embedder.model_name,
+            created_at=now,
+            hit_count=0,
+        )
         db.add(question_answer)
+
+        self._evict_expired(now)
+        self._evict_over_capacity(incoming=1)
+        # Other requests can evict or hit entries while this one awaits the database; only
+        # the ids written here are cleared afterwards, the rest wait for the next write.
+        pending_deletes = set(self._pending_deletes)
+        dirty_ids = set(self._dirty_ids)
+        if pending_deletes:
+            await db.execute(delete(QuestionAnswer).where(QuestionAnswer.id.in_(pending_deletes)))
+        written_hits = {qa_id: self._entries[qa_id].hit_count for qa_id in dirty_ids if qa_id in self._entries}
+        if written_hits:
+            await db.execute(
+                update(QuestionAnswer),
+                [
+                    {"id": qa_id, "hit_count": hit_count, "last_hit_at": self._entries[qa_id].last_hit_at}
+                    for qa_id, hit_count in written_hits.items()
+                ],
+            )
         await db.commit()
+        self._pending_deletes -= pending_deletes
+        self._dirty_ids -= {
+            qa_id
+            for qa_id in dirty_ids
+            if qa_id not in self._entries or self._entries[qa_id].hit_count == written_hits.get(qa_id)
+        }
+
         await db.refresh(question_answer)
         question_answer_id = question_answer.id
-        self._index.add_with_ids(query_vector, np.array([question_answer_id], dtype=np.int64))  # type: ignore
+        self._entries[question_answer_id] = CacheEntry(qa_hash, answer, now)
+        self._ids_by_hash[qa_hash] = question_answer_id
+        self._index.add(query_vector, np.array([question_answer_id], dtype=np.int64))
+        self._max_id = max(self._max_id, question_answer_id)
+
+        self._writes_since_snapshot += 1
+        if self._writes_since_snapshot >= settings.index_snapshot_every_n_writes:
+            await asyncio.to_thread(self._snapshot.save, *self._snapshot_payload())
+
+    def stats(self) -> AnswerCacheStats:
+        """Report cache size, policy and hit/miss/eviction counters."""
+        lookups = self._exact_hits + self._semantic_hits + self._misses
+        return AnswerCacheStats(
+            entries=len(self._entries),
+            max_entries=self._max_entries,
+            eviction_policy=self._policy,
+            ttl_seconds=self._ttl_seconds,
+            exact_hits=self._exact_hits,
+            semantic_hits=self._semantic_hits,
+            misses=self._misses,
+            hit_rate=(self._exact_hits + self._semantic_hits) / lookups if lookups else 0.0,
+            evictions=self._evictions,
+            expirations=self._expirations,
+        )
+
+    def _record_hit(self, qa_id: int) -> CacheEntry | None:
+        """Count a hit on an entry; return None if it is gone or has just expired."""
+        entry = self._entries.get(qa_id)
+        if entry is None:
+            return None
+        now = time.time()
+        if self._is_expired(entry, now):
+            self._expirations += 1
+            self._evict([qa_id])
+            return None
+        entry.hit_count += 1
+        entry.last_hit_at = now
+        self._dirty_ids.add(qa_id)
+        return entry
+
+    def _is_expired(self, entry: CacheEntry, now: float) -> bool:
+        return self._ttl_seconds is not None and now - entry.created_at > self._ttl_seconds
+
+    def _evict_expired(self, now: float) -> list[int]:
+        if self._ttl_seconds is None:
+            return []
+        expired = [qa_id for qa_id, entry in self._entries.items() if self._is_expired(entry, now)]
+        self._expirations += len(expired)
+        self._evict(expired)
+        return expired
+
+    def _evict_over_capacity(self, incoming: int) -> list[int]:
+        """Evict entries so that ``incoming`` new ones fit within ``max_entries``."""
+        victims = select_evictions(self._entries, len(self._entries) + incoming - self._max_entries, self._policy)
+        self._evictions += len(victims)
+        self._evict(victims)
+        return victims
+
+    def _evict(self, qa_ids: list[int]) -> None:
+        """Drop entries from memory and the FAISS index; their rows are deleted on the next write."""
+        if not qa_ids:
+            return
+        for qa_id in qa_ids:
+            entry = self._entries.pop(qa_id)
+            if self._ids_by_hash.get(entry.question_hash) == qa_id:
+                del self._ids_by_hash[entry.question_hash]
+            self._dirty_ids.discard(qa_id)
+        self._index.remove(np.array(qa_ids, dtype=np.int64))
+        self._pending_deletes.update(qa_ids)
+
+    def _snapshot_payload(self) -> tuple[np.ndarray, IndexSnapshotManifest]:
+        self._writes_since_snapshot = 0
+        manifest = IndexSnapshotManifest(
+            max_id=self._max_id,
+            embedding_model=self._embedder.model_name,
+            dimension=self._embedder.dimension,
+            kind=self._index.kind,
+            saved_at=time.time(),
+        )
+        return self._index.serialize(), manifest
+
+
+def get_answer_question_cache_service() -> AnswerQuestionCacheService:
+    return AnswerQuestionCacheService()
@@ -1,79 +1,182 @@
-from typing import cast
+from collections.abc import AsyncIterator
 
-import faiss
-import numpy as np
-from openai import OpenAI
 from pydantic_ai import Agent
 from pydantic_ai.models.fallback import FallbackModel
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.core.singleton import SingletonMeta
-from app.db.session import get_db_sync
-from app.models.document import Document
-from app.services.answer_question_cache_service import AnswerQuestionCacheService
-from app.services.document_service import get_document
+from app.schemas.streaming import TextDelta
+from app.services.answer_question_cache_service import get_answer_question_cache_service, question_hash
+from app.services.document_index_service import get_document_index_service
+from app.services.document_service import get_chunks_by_ids, get_documents_by_ids, search_chunks_bm25
+from app.services.embedding_batcher import get_embedding_batcher
+from app.services.passage_cache import RetrievedPassage, get_passage_cache
+from app.services.query_embedding_service import QueryEmbedding, QueryEmbeddingService
+from app.services.single_flight import Flight, LeaderCancelledError, SingleFlight
 
 
 class AnswerQuestionService(metaclass=SingletonMeta):
     SYSTEM_PROMPT = """You answer questions"""
 
     def __init__(self):
-        self._client = OpenAI(api_key=settings.openai_api_key)
-        self._index = self._create_index()
-        self._cache_service = AnswerQuestionCacheService()
+        self._query_embeddings = QueryEmbeddingService(get_embedding_batcher())
+        self._document_index = get_document_index_service()
+        self._document_index.build()
+        self._passage_cache = get_passage_cache()
+        self._cache_service = get_answer_question_cache_service()
+        self._flights = SingleFlight[str](similarity_threshold=settings.answer_coalesce_similarity)
         self._agent = Agent(
             FallbackModel("gateway/openai:gpt-5.1", "gateway/gemini:gemini-3.0-flash"),
             instructions=self.SYSTEM_PROMPT,
         )
 
     async def answer_question(self, question: str, db: AsyncSession) -> str:
-        cached_answer = self._cache_service.get_answer(question=question)
-        if cached_answer is not None:
-            return cached_answer
+        """Answer a question, coalescing concurrent requests for the same normalized question.
+
+        Concurrent callers share one cache lookup, one agent run and one cache
+        insert. With ``answer_coalesce_similarity`` set, a cache miss also joins an
+        earlier in-flight question whose embedding is at least that similar.
+        """
+        return await self._flights.run(
+            question_hash(question), lambda flight: self._answer_question(question, db=db, flight=flight)
+        )
 
-        documents = await self._retrieve_documents(question=question, db=db)
-        user_prompt = self._get_user_prompt(question=question, documents=documents)
+    async def _answer_question(self, question: str, db: AsyncSession, flight: Flight[str]) -> str:
+        query = self._query_embeddings.for_question(question)
+        existing = await self._existing_answer(query=query, db=db, flight=flight)
+        if existing is not None:
+            return existing.delta
+
+        user_prompt = await self._build_user_prompt(question=question, query=query, db=db)
         result = await self._agent.run(user_prompt=user_prompt)
 
-        await self._cache_service.set_answer(question=question, answer=result.output, db=db)
+        await self._cache_service.set_answer(query=query, answer=result.output, db=db)
         return result.output
 
-    def _get_user_prompt(self, question: str, documents: list[Document]) -> str:
+    async def stream_answer(self, question: str, db: AsyncSession) -> AsyncIterator[TextDelta]:
+        """Answer a question, yielding the answer as text deltas while the model generates it.
+
+        A streamed answer is a flight like any other: cache hits, and questions
+        already being answered by another request, are yielded as a single
+        delta, and requests for the same question arriving while this one
+        streams receive the finished answer. On a miss the full answer is
+        written to the cache once the stream completes; an abandoned stream is
+        not cached, and a waiting request takes over.
+        """
+        key = question_hash(question)
+        finished = await self._flights.join(key)
+        if finished is not None:
+            yield TextDelta(delta=finished.future.result())
+            return
+
+        with self._flights.lead(key) as flight:
+            query = self._query_embeddings.for_question(question)
+            existing = await self._existing_answer(query=query, db=db, flight=flight)
+            if existing is not None:
+                flight.future.set_result(existing.delta)
+                yield existing
+                return
+
+            user_prompt = await self._build_user_prompt(question=question, query=query, db=db)
+            parts: list[str] = []
+            async with self._agent.run_stream(user_prompt=user_prompt) as result:
+                async for delta in result.stream_text(delta=True, debounce_by=None):
+                    parts.append(delta)
+                    yield TextDelta(delta=delta)
+
+            answer = "".join(parts)
+            flight.future.set_result(answer)
+            await self._cache_service.set_answer(query=query, answer=answer, db=db)
+
+    async def _existing_answer(self, query: QueryEmbedding, db: AsyncSession, flight: Flight[str]) -> TextDelta | None:
+        """Return the cached answer, or that of a similar question already in flight, if any.
+
+        With ``answer_coalesce_similarity`` set, a cache miss joins an earlier
+        in-flight question whose embedding is at least that similar.
+        """
+        cached_answer = await self._cache_service.get_answer(query=query, db=db)
+        if cached_answer is not None:
+            return TextDelta(delta=cached_answer, cached=True)
+
+        if settings.answer_coalesce_similarity is not None:
+            leader = self._flights.join_similar(flight, await query.get_vector())
+            if leader is not None:
+                try:
+                    return TextDelta(delta=await self._flights.follow(leader))
+                except LeaderCancelledError:
+                    pass
+        return None
+
+    async def _build_user_prompt(self, question: str, query: QueryEmbedding, db: AsyncSession) -> str:
+        passages = await self._retrieve_passages(query=query, db=db)
+        return self._get_user_prompt(question=question, passages=passages)
+
+    def _get_user_prompt(self, question: str, passages: list[RetrievedPassage]) -> str:
         return f"""
         Please answer the following question:
         {question}
-        Here are the documents that may be relevant:
-        {"\n\n".join([f"{d.title}\n\n{d.content}" for d in documents])}
+        Here are passages from documents that may be relevant:
+        {"\n\n".join([f"{p.title}\n\n{p.content}" for p in passages])}
         In the answer, please provide citations with the document title you may have used to answer the question.
         Place all citations at the end of the answer.
         """
 
-    async def _retrieve_documents(self, question: str, db: AsyncSession) -> list[Document]:
-        question_embedding = self._client.embeddings.create(model="text-embedding-3-small", input=question)
-        query_vector = np.array([question_embedding.data[0].embedding], dtype="float32")
-        retrieve_documents: tuple[np.ndarray, np.ndarray] = self._index.search(query_vector, k=2)  # type: ignore[reportUnknownMemberType]
-        retrieved_document_ids: np.ndarray = cast(np.ndarray, retrieve_documents[1][0])
-        document_ids_raw: list[int] = cast(list[int], retrieved_document_ids.tolist())  # type: ignore[reportUnknownMemberType]
-        documents = [await get_document(db, document_id) for document_id in document_ids_raw]
-        return [doc for doc in documents if doc is not None]
-
-    def _create_index(self) -> faiss.Index:
-        db = next(get_db_sync())
-
-        documents = db.execute(select(Document)).scalars().all()
-        texts = [f"{d.title}\n\n{d.content}" for d in documents]
-        ids = np.array([d.id for d in documents], dtype=np.int64)
-
-        resp = self._client.embeddings.create(model="text-embedding-3-small", input=texts)
-        vectors = np.array([item.embedding for item in resp.data], dtype="float32")
-        dim = vectors.shape[1]
-
-        base_index = faiss.IndexFlatIP(dim)
-        index = faiss.IndexIDMap(base_index)
-        index.add_with_ids(vectors, ids)  # type: ignore[arg-type]
-        return index
+    async def _retrieve_passages(self, query: QueryEmbedding, db: AsyncSession) -> list[RetrievedPassage]:
+        """Retrieve the top passages for a question by fusing BM25 and vector rankings."""
+        lexical = (
+            await search_chunks_bm25(db, query.text, k=settings.retrieval_candidate_k)
+            if settings.hybrid_retrieval_enabled
+            else []
+        )
+        vector_k = settings.retrieval_candidate_k if lexical else settings.retrieval_top_k
+        vector_ids = self._document_index.search(await query.get_vector(), k=vector_k)
+        fused = reciprocal_rank_fusion([vector_ids, [chunk_id for chunk_id, _ in lexical]])
+        return await self._load_passages(fused[: settings.retrieval_top_k], db)
+
+    async def _load_passages(self, chunk_ids: list[int], db: AsyncSession) -> list[RetrievedPassage]:
+        """Resolve chunk ids to passages with at most two queries, whatever ``retrieval_top_k`` is.
+
+        Cached passages skip the database entirely; the rest are loaded with one
+        chunk query and one document query and then cached.
+        """
+        passages = self._passage_cache.get_many(chunk_ids)
+        missing_ids = [chunk_id for chunk_id in chunk_ids if chunk_id not in passages]
+        if missing_ids:
+            chunks = await get_chunks_by_ids(db, missing_ids)
+            documents = await get_documents_by_ids(db, list(dict.fromkeys(chunk.document_id for chunk in chunks)))
+            titles = {document.id: document.title for document in documents}
+            loaded = {
+                chunk.id: RetrievedPassage(
+                    document_id=chunk.document_id, title=titles[chunk.document_id], content=chunk.content
+                )
+                for chunk in chunks
+                if chunk.document_id in titles
+            }
+            self._passage_cache.put_many(loaded)
+            passages.update(loaded)
+        return [passages[chunk_id] for chunk_id in chunk_ids if chunk_id in passages]
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], k: int = settings.retrieval_rrf_k) -> list[int]:
+    """Merge rankings of ids by Reciprocal Rank Fusion.
+
+    Each id scores ``sum(1 / (k + rank))`` over the rankings it appears in, so
+    ids ranked well by several retrievers rise to the top without having to
+    calibrate BM25 scores against cosine similarities.
+
+    Args:
+        rankings: Id lists, best first
+        k: Damping constant; larger values flatten the contribution of top ranks
+
+    Returns:
+        Every id from ``rankings``, best first
+    """
+    scores: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda item: scores[item], reverse=True)
 
 
 def get_answer_question_service() -> AnswerQuestionService:
@@ -0,0 +1,80 @@
+"""Splitting of long clinical notes into retrievable passages.
+
+Notes are split on section headings (e.g. ``Assessment:``) and blank-line
+paragraphs; paragraphs are packed into chunks of up to ``max_words`` words,
+and any paragraph longer than that is cut into overlapping word windows.
+"""
+
+import re
+
+from app.core.config import settings
+from app.models.document_chunk import DocumentChunk
+
+# A line on its own that names a section, e.g. "Assessment:" or "HISTORY OF PRESENT ILLNESS:".
+_SECTION_HEADING = re.compile(r"^\s*[A-Z][A-Za-z0-9 /&(),-]{0,60}:\s*$")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def split_sections(text: str) -> list[str]:
+    """Split text into sections, starting a new section at every heading line."""
+    sections: list[list[str]] = [[]]
+    for line in text.splitlines():
+        if _SECTION_HEADING.match(line) and any(part.strip() for part in sections[-1]):
+            sections.append([])
+        sections[-1].append(line)
+    return [joined for lines in sections if (joined := "\n".join(lines).strip())]
+
+
+def split_windows(words: list[str], max_words: int, overlap_words: int) -> list[str]:
+    """Cut a word list into windows of ``max_words`` that overlap by ``overlap_words``."""
+    step = max(max_words - overlap_words, 1)
+    windows: list[str] = []
+    for start in range(0, len(words), step):
+        windows.append(" ".join(words[start : start + max_words]))
+        if start + max_words >= len(words):
+            break
+    return windows
+
+
+def chunk_text(
+    text: str,
+    max_words: int = settings.chunk_max_words,
+    overlap_words: int = settings.chunk_overlap_words,
+) -> list[str]:
+    """Split a note into passages of at most ``max_words`` words.
+
+    Args:
+        text: Note content
+        max_words: Maximum number of words per chunk
+        overlap_words: Words shared between consecutive windows of an oversized paragraph
+
+    Returns:
+        Chunks in document order
+    """
+    chunks: list[str] = []
+    for section in split_sections(text):
+        current: list[str] = []
+        current_words = 0
+        for paragraph in _PARAGRAPH_BREAK.split(section):
+            words = paragraph.split()
+            if not words:
+                continue
+            if current and current_words + len(words) > max_words:
+                chunks.append("\n\n".join(current))
+                current, current_words = [], 0
+            if len(words) > max_words:
+                chunks.extend(split_windows(words, max_words, overlap_words))
+                continue
+            current.append(paragraph.strip())
+            current_words += len(words)
+        if current:
+            chunks.append("\n\n".join(current))
+    return chunks
+
+
+def build_chunks(document_id: int, content: str) -> list[DocumentChunk]:
+    """Return unsaved chunk rows for a document's content."""
+    return [
+        DocumentChunk(document_id=document_id, chunk_index=i, content=chunk)
+        for i, chunk in enumerate(chunk_text(content))
+    ]
@@ -0,0 +1,69 @@
+"""Bounded-concurrency fan-out that yields results as they complete."""
+
+import asyncio
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ItemOutcome[A, T]:
+    """Result of processing one input item; exactly one of ``result`` and ``error`` is set."""
+
+    index: int
+    item: A | Exception
+    result: T | None = None
+    error: Exception | None = None
+
+
+async def map_bounded[A, T](
+    items: AsyncIterable[A | Exception],
+    fn: Callable[[A], Awaitable[T]],
+    semaphore: asyncio.Semaphore,
+) -> AsyncIterator[ItemOutcome[A, T]]:
+    """Apply ``fn`` to every item with at most ``semaphore``'s worth of calls in flight.
+
+    Items are read lazily, one slot at a time, so a large upload is never held
+    in memory at once. Sharing one semaphore between calls bounds concurrency
+    across all of them. Outcomes are yielded in completion order; an item that
+    is itself an exception (e.g. a line that failed to parse) or whose call
+    raises becomes an error outcome instead of failing the whole batch. Closing
+    the iterator early cancels the calls still in flight.
+    """
+    queue: asyncio.Queue[ItemOutcome[A, T] | None] = asyncio.Queue()
+    tasks: set[asyncio.Task[None]] = set()
+
+    async def run_one(index: int, item: A) -> None:
+        try:
+            outcome = ItemOutcome[A, T](index, item, result=await fn(item))
+        except Exception as exc:
+            outcome = ItemOutcome[A, T](index, item, error=exc)
+        queue.put_nowait(outcome)
+
+    async def produce() -> None:
+        try:
+            index = 0
+            async for item in items:
+                if isinstance(item, Exception):
+                    queue.put_nowait(ItemOutcome[A, T](index, item, error=item))
+                else:
+                    await semaphore.acquire()
+                    task = asyncio.create_task(run_one(index, item))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    # A callback rather than a finally block, so a task cancelled before it starts still releases.
+                    task.add_done_callback(lambda _: semaphore.release())
+                index += 1
+            if tasks:
+                await asyncio.wait(set(tasks))
+        finally:
+            queue.put_nowait(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (outcome := await queue.get()) is not None:
+            yield outcome
+        await producer
+    finally:
+        producer.cancel()
+        for task in list(tasks):
+            task.cancel()
@@ -0,0 +1,251 @@
+"""Live chunk-level FAISS index over the documents table.
+
+Each document is split into passages (see ``chunking_service``) and every
+passage is indexed under its ``document_chunks`` id. On startup the index is
+memory-mapped from its last snapshot and only chunks written since are
+replayed; it is then kept current by background ingest tasks scheduled from
+the document write endpoints, so new, updated and deleted documents become
+visible to retrieval without a restart.
+"""
+
+import itertools
+import threading
+import time
+from typing import Any
+
+import numpy as np
+from sqlalchemy import Row, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.singleton import SingletonMeta
+from app.db.session import SessionLocal
+from app.models.document import Document
+from app.models.document_chunk import DocumentChunk
+from app.schemas.document import IndexStatusResponse
+from app.services.chunking_service import build_chunks
+from app.services.embedders import get_embedder
+from app.services.embedding_store_service import EmbeddingStoreService
+from app.services.index_snapshot import IndexSnapshot, IndexSnapshotManifest
+from app.services.vector_index import VectorIndex, create_vector_index
+
+# Keep IN (...) lookups well below SQLite's bound-parameter limit.
+_LOOKUP_BATCH_SIZE = 500
+
+
+def document_text(title: str, content: str) -> str:
+    """Return the text that is embedded for a document or one of its chunks."""
+    return f"{title}\n\n{content}"
+
+
+class DocumentIndexService(metaclass=SingletonMeta):
+    def __init__(self):
+        self._embedder = get_embedder()
+        self._embedding_store = EmbeddingStoreService(self._embedder)
+        self._snapshot = IndexSnapshot("documents")
+        self._index: VectorIndex | None = None
+        # Document id -> ids of its chunks currently in the index.
+        self._chunk_ids: dict[int, list[int]] = {}
+        self._max_chunk_id = 0
+        self._writes_since_snapshot = 0
+        # Guards the index; FAISS does not allow concurrent search and add/remove.
+        self._lock = threading.Lock()
+        # Write id -> time its ingest was scheduled; one entry per document write, so
+        # a second write to a document is still pending after the first one is applied.
+        self._pending: dict[int, float] = {}
+        # Guards ``_pending``, which request handlers and threadpool ingests update concurrently.
+        self._pending_lock = threading.Lock()
+        self._write_ids = itertools.count(1)
+        self._last_indexed_at: float | None = None
+
+    @property
+    def is_built(self) -> bool:
+        return self._index is not None
+
+    def build(self) -> None:
+        """Load the index from its snapshot, or build it from every stored chunk.
+
+        Chunks deleted since the snapshot are removed and chunks missing from it
+        (normally those newer than its manifest's ``max_id``) are embedded,
+        reusing persisted embeddings, and added.
+        """
+        with self._lock:
+            if self._index is not None:
+                return
+            with SessionLocal() as db:
+                self._backfill_chunks(db)
+                live_chunks = db.execute(select(DocumentChunk.id, DocumentChunk.document_id)).all()
+                live_ids = {chunk_id for chunk_id, _ in live_chunks}
+                snapshot = self._snapshot.load(self._embedder.model_name, self._embedder.dimension)
+                if snapshot is None:
+                    rows = self._chunk_rows(db)
+                    stale_ids: list[int] = []
+                else:
+                    snapshot_ids = set(snapshot[0].ids().tolist()) - snapshot[0].tombstones
+                    rows = self._chunk_rows_by_ids(db, sorted(live_ids - snapshot_ids))
+                    stale_ids = sorted(snapshot_ids - live_ids)
+                vectors = self._embedding_store.get_embeddings(
+                    db, [document_text(title, content) for _, _, content, title in rows]
+                )
+
+            if snapshot is None:
+                index = create_vector_index(
+                    self._embedder.dimension,
+                    kind=settings.vector_index_kind,
+                    training_vectors=vectors,
+                    nlist=settings.vector_index_nlist,
+                    pq_m=settings.vector_index_pq_m,
+                )
+            else:
+                index = snapshot[0]
+                index.remove(np.array(stale_ids, dtype=np.int64))
+            index.add(vectors, np.array([chunk_id for chunk_id, *_ in rows], dtype=np.int64))
+
+            for chunk_id, document_id in live_chunks:
+                self._chunk_ids.setdefault(document_id, []).append(chunk_id)
+            self._max_chunk_id = max(live_ids, default=0)
+            self._index = index
+            self._last_indexed_at = time.time()
+            source = "snapshot" if snapshot is not None else "database"
+            print(f"Loaded {index.kind} document index from {source}: {index.ntotal} chunk(s), {len(rows)} replayed")
+
+            if snapshot is None or rows or stale_ids:
+                self._snapshot.save(*self._snapshot_payload())
+
+    def search(self, query_vector: np.ndarray, k: int) -> list[int]:
+        """Return the ids of up to ``k`` chunks nearest to ``query_vector``, nearest first."""
+        with self._lock:
+            if self._index is None:
+                return []
+            _, ids = self._index.search(query_vector, k=k)
+        # FAISS pads results with -1 when the index holds fewer than k vectors.
+        return [int(chunk_id) for chunk_id in ids[0] if chunk_id != -1]
+
+    def mark_pending(self) -> int:
+        """Record that an ingest has been scheduled for a document write.
+
+        Returns:
+            The write id to pass to ``index_document`` or ``remove_document``
+        """
+        with self._pending_lock:
+            write_id = next(self._write_ids)
+            self._pending[write_id] = time.time()
+        return write_id
+
+    def index_document(self, document_id: int, write_id: int | None = None) -> None:
+        """Embed a created or updated document's chunks and swap them into the live index.
+
+        Intended to run as a background task. If the index has not been built yet
+        the document is skipped, since the eventual build reads it from the database.
+        Ingests of quick successive writes may finish out of order, so the chunks are
+        only swapped in if they are still the document's current chunks.
+        """
+        try:
+            with self._lock:
+                index = self._index
+            if index is None:
+                return
+            with SessionLocal() as db:
+                rows = self._chunk_rows(db, DocumentChunk.document_id == document_id)
+                vectors = self._embedding_store.get_embeddings(
+                    db, [document_text(title, content) for _, _, content, title in rows]
+                )
+            new_ids = [chunk_id for chunk_id, *_ in rows]
+            with self._lock:
+                with SessionLocal() as db:
+                    # Compared by content too, since SQLite may reuse the ids of deleted chunks.
+                    if self._chunk_rows(db, DocumentChunk.document_id == document_id) != rows:
+                        # Written again or deleted since: the ingest of that later write applies it.
+                        return
+                old_ids = self._chunk_ids.pop(document_id, [])
+                index.remove(np.array(old_ids, dtype=np.int64))
+                index.add(vectors, np.array(new_ids, dtype=np.int64))
+                self._chunk_ids[document_id] = new_ids
+                self._max_chunk_id = max([self._max_chunk_id, *new_ids])
+                payload = self._record_write()
+            if payload is not None:
+                self._snapshot.save(*payload)
+        finally:
+            self._finish_pending(write_id)
+
+    def remove_document(self, document_id: int, write_id: int | None = None) -> None:
+        """Drop a deleted document's chunks from the live index."""
+        try:
+            with self._lock:
+                if self._index is None:
+                    return
+                old_ids = self._chunk_ids.pop(document_id, [])
+                self._index.remove(np.array(old_ids, dtype=np.int64))
+                payload = self._record_write()
+            if payload is not None:
+                self._snapshot.save(*payload)
+        finally:
+            self._finish_pending(write_id)
+
+    def _finish_pending(self, write_id: int | None) -> None:
+        with self._pending_lock:
+            self._pending.pop(write_id, None)
+
+    def status(self) -> IndexStatusResponse:
+        """Report how far the live index lags behind document writes."""
+        now = time.time()
+        with self._pending_lock:
+            pending = list(self._pending.values())
+        oldest_pending = min(pending, default=None)
+        return IndexStatusResponse(
+            built=self.is_built,
+            indexed_count=self._index.ntotal if self._index is not None else 0,
+            pending_count=len(pending),
+            lag_seconds=now - oldest_pending if oldest_pending is not None else 0.0,
+            last_indexed_at=self._last_indexed_at,
+        )
+
+    def _chunk_rows(self, db: Session, *criteria: Any) -> list[Row[tuple[int, int, str, str]]]:
+        """Return (chunk id, document id, chunk content, document title) rows."""
+        query = select(DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.content, Document.title).join(
+            Document, Document.id == DocumentChunk.document_id
+        )
+        return list(db.execute(query.where(*criteria).order_by(DocumentChunk.id)).all())
+
+    def _chunk_rows_by_ids(self, db: Session, chunk_ids: list[int]) -> list[Row[tuple[int, int, str, str]]]:
+        rows: list[Row[tuple[int, int, str, str]]] = []
+        for start in range(0, len(chunk_ids), _LOOKUP_BATCH_SIZE):
+            rows.extend(self._chunk_rows(db, DocumentChunk.id.in_(chunk_ids[start : start + _LOOKUP_BATCH_SIZE])))
+        return rows
+
+    def _record_write(self) -> tuple[np.ndarray, IndexSnapshotManifest] | None:
+        """Count an index write; return a snapshot payload when one is due. Call with the lock held."""
+        self._last_indexed_at = time.time()
+        self._writes_since_snapshot += 1
+        if self._writes_since_snapshot < settings.index_snapshot_every_n_writes:
+            return None
+        return self._snapshot_payload()
+
+    def _snapshot_payload(self) -> tuple[np.ndarray, IndexSnapshotManifest]:
+        """Serialize the index and describe it. Call with the lock held."""
+        assert self._index is not None
+        self._writes_since_snapshot = 0
+        manifest = IndexSnapshotManifest(
+            max_id=self._max_chunk_id,
+            embedding_model=self._embedder.model_name,
+            dimension=self._embedder.dimension,
+            kind=self._index.kind,
+            tombstones=sorted(self._index.tombstones),
+        )
+        return self._index.serialize(), manifest
+
+    def _backfill_chunks(self, db: Session) -> None:
+        """Chunk documents stored before chunking was introduced."""
+        unchunked = (
+            db.execute(select(Document).where(~Document.id.in_(select(DocumentChunk.document_id).distinct())))
+            .scalars()
+            .all()
+        )
+        for document in unchunked:
+            db.add_all(build_chunks(document.id, document.content))
+        if unchunked:
+            db.commit()
+
+
+def get_document_index_service() -> DocumentIndexService:
+    return DocumentIndexService()
@@ -4,14 +4,70 @@ This module provides business logic for document operations,
 wrapping the database layer for document management.
 """
 
-from sqlalchemy import select
+import re
+
+from sqlalchemy import delete, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.document import Document
+from app.models.document_chunk import DOCUMENT_CHUNKS_FTS_TABLE, DocumentChunk
+from app.services.chunking_service import build_chunks
+from app.services.passage_cache import get_passage_cache
+
+_FTS_TERM = re.compile(r"\w+")
+# Question words that match nearly every chunk and only add noise to BM25 rankings.
+_FTS_STOPWORDS = frozenset(
+    [
+        "a",
+        "an",
+        "and",
+        "are",
+        "as",
+        "at",
+        "be",
+        "by",
+        "can",
+        "do",
+        "does",
+        "for",
+        "from",
+        "has",
+        "have",
+        "how",
+        "i",
+        "in",
+        "is",
+        "it",
+        "its",
+        "me",
+        "my",
+        "of",
+        "on",
+        "or",
+        "should",
+        "that",
+        "the",
+        "their",
+        "there",
+        "this",
+        "to",
+        "was",
+        "what",
+        "when",
+        "where",
+        "which",
+        "who",
+        "why",
+        "will",
+        "with",
+        "you",
+        "your",
+    ]
+)
 
 
 async def create_document(db: AsyncSession, title: str, content: str) -> Document:
-    """Create a new document in the database.
+    """Create a new document in the database, along with its retrieval chunks.
 
     Args:
         db: Database session
@@ -23,6 +79,8 @@ async def create_document(db: AsyncSession, title: str, content: str) -> Documen
     """
     new_doc = Document(title=title, content=content)
     db.add(new_doc)
+    await db.flush()
+    db.add_all(build_chunks(new_doc.id, content))
     await db.commit()
     await db.refresh(new_doc)
     return new_doc
@@ -34,6 +92,23 @@ async def get_document(db: AsyncSession, document_id: int) -> Document | None:
     return result.scalar_one_or_none()
 
 
+async def get_documents_by_ids(db: AsyncSession, document_ids: list[int]) -> list[Document]:
+    """Retrieve documents in a single query, in the order of ``document_ids``.
+
+    Args:
+        db: Database session
+        document_ids: IDs of the documents to fetch; unknown IDs are skipped
+
+    Returns:
+        List of Document instances
+    """
+    if not document_ids:
+        return []
+    result = await db.execute(select(Document).where(Document.id.in_(document_ids)))
+    documents_by_id = {doc.id: doc for doc in result.scalars().all()}
+    return [documents_by_id[document_id] for document_id in document_ids if document_id in documents_by_id]
+
+
 async def get_all_documents(db: AsyncSession) -> list[Document]:
     """Retrieve all documents from the database.
 
@@ -45,3 +120,106 @@ async def get_all_documents(db: AsyncSession) -> list[Document]:
     """
     result = await db.execute(select(Document))
     return list(result.scalars().all())
+
+
+async def update_document(db: AsyncSession, document_id: int, title: str, content: str) -> Document | None:
+    """Replace the title and content of an existing document and re-chunk it.
+
+    Args:
+        db: Database session
+        document_id: ID of the document to update
+        title: New document title
+        content: New document content
+
+    Returns:
+        The updated Document instance, or None if it does not exist
+    """
+    doc = await get_document(db, document_id)
+    if doc is None:
+        return None
+    doc.title = title
+    doc.content = content
+    await db.execute(delete(DocumentChunk).where(DocumentChunk.document_id == document_id))
+    db.add_all(build_chunks(document_id, content))
+    await db.commit()
+    get_passage_cache().invalidate_document(document_id)
+    await db.refresh(doc)
+    return doc
+
+
+async def delete_document(db: AsyncSession, document_id: int) -> bool:
+    """Delete a document and its chunks from the database.
+
+    Args:
+        db: Database session
+        document_id: ID of the document to delete
+
+    Returns:
+        True if the document existed and was deleted, False otherwise
+    """
+    doc = await get_document(db, document_id)
+    if doc is None:
+        return False
+    await db.execute(delete(DocumentChunk).where(DocumentChunk.document_id == document_id))
+    await db.delete(doc)
+    await db.commit()
+    get_passage_cache().invalidate_document(document_id)
+    return True
+
+
+async def get_chunks_by_ids(db: AsyncSession, chunk_ids: list[int]) -> list[DocumentChunk]:
+    """Retrieve document chunks in a single query, in the order of ``chunk_ids``.
+
+    Args:
+        db: Database session
+        chunk_ids: IDs of the chunks to fetch; unknown IDs are skipped
+
+    Returns:
+        List of DocumentChunk instances
+    """
+    if not chunk_ids:
+        return []
+    result = await db.execute(select(DocumentChunk).where(DocumentChunk.id.in_(chunk_ids)))
+    chunks_by_id = {chunk.id: chunk for chunk in result.scalars().all()}
+    return [chunks_by_id[chunk_id] for chunk_id in chunk_ids if chunk_id in chunks_by_id]
+
+
+def fts_match_expression(query: str) -> str | None:
+    """Build an FTS5 MATCH expression that ORs the quoted terms of ``query``.
+
+    Quoting every term keeps FTS5 operators and punctuation in user input
+    (e.g. ``NOT``, ``-``, ``"``) from being parsed as query syntax.
+
+    Returns:
+        The expression, or None if ``query`` has no searchable terms
+    """
+    terms = dict.fromkeys(
+        term
+        for term in (match.lower() for match in _FTS_TERM.findall(query))
+        if term not in _FTS_STOPWORDS and (len(term) > 1 or term.isdigit())
+    )
+    return " OR ".join(f'"{term}"' for term in terms) or None
+
+
+async def search_chunks_bm25(db: AsyncSession, query: str, k: int) -> list[tuple[int, float]]:
+    """Rank document chunks against ``query`` with SQLite FTS5's BM25.
+
+    Args:
+        db: Database session
+        query: Free-text query
+        k: Maximum number of chunks to return
+
+    Returns:
+        (chunk id, score) pairs, best first; higher scores are better matches
+    """
+    match = fts_match_expression(query)
+    if match is None:
+        return []
+    result = await db.execute(
+        text(
+            f"SELECT rowid, -bm25({DOCUMENT_CHUNKS_FTS_TABLE}) FROM {DOCUMENT_CHUNKS_FTS_TABLE} "
+            f"WHERE {DOCUMENT_CHUNKS_FTS_TABLE} MATCH :match ORDER BY bm25({DOCUMENT_CHUNKS_FTS_TABLE}) LIMIT :k"
+        ),
+        {"match": match, "k": k},
+    )
+    return [(int(chunk_id), float(score)) for chunk_id, score in result.all()]
@@ -0,0 +1,127 @@
+"""Summaries of stored documents, precomputed at ingest time.
+
+Summaries are stored in ``document_summaries`` keyed by a hash of the
+document content and the summarizer's prompt and models, so reading a stored
+document's summary is a database lookup, unchanged content is never
+summarized twice, and a prompt or model change invalidates earlier summaries.
+They are generated in the background when documents are created or updated
+and for every unsummarized document (including seeded fixtures) at startup,
+at most ``summary_precompute_concurrency`` at a time so they do not compete
+with user requests for the LLM. Startup precomputation runs that many workers
+rather than one task per document.
+"""
+
+import asyncio
+import time
+from functools import cache
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.singleton import SingletonMeta
+from app.db.session import AsyncSessionLocal
+from app.models.document import Document
+from app.models.document_summary import DocumentSummary
+from app.services.embedding_store_service import content_hash
+from app.services.summarization_service import SummarizationService, get_summarization_service
+
+# Keep IN (...) lookups well below SQLite's bound-parameter limit.
+_LOOKUP_BATCH_SIZE = 500
+
+
+def summary_key(content: str, summarizer_version: str) -> str:
+    """Return the key of the summary of ``content`` made by a given summarizer version."""
+    return content_hash(f"{summarizer_version}\0{content}")
+
+
+class DocumentSummaryService(metaclass=SingletonMeta):
+    def __init__(self, summarization_service: SummarizationService | None = None):
+        self._summarization_service = summarization_service or get_summarization_service()
+
+    async def get_summary(self, db: AsyncSession, document_id: int) -> str | None:
+        """Return a document's summary, generating and storing it if it has not been precomputed yet.
+
+        Args:
+            db: Database session
+            document_id: ID of the document
+
+        Returns:
+            The summary, or None if the document does not exist
+        """
+        document = await db.get(Document, document_id)
+        if document is None:
+            return None
+        return await self._get_or_create(db, document.content)
+
+    async def summarize_document(self, document_id: int) -> None:
+        """Precompute a document's summary. Intended to run as a background task."""
+        try:
+            async with get_summary_precompute_semaphore(), AsyncSessionLocal() as db:
+                document = await db.get(Document, document_id)
+                if document is not None:
+                    await self._get_or_create(db, document.content)
+        except Exception as exc:
+            print(f"Failed to summarize document {document_id}: {exc!r}")
+
+    async def precompute_missing(self) -> None:
+        """Summarize every stored document without a summary, a few at a time.
+
+        A fixed pool of ``summary_precompute_concurrency`` workers takes document
+        ids one by one, so the work in flight does not grow with the corpus.
+        """
+        missing = await self._missing_document_ids()
+        if not missing:
+            return
+        print(f"Precomputing summaries for {len(missing)} document(s)")
+        document_ids = iter(missing)
+
+        async def worker() -> None:
+            for document_id in document_ids:
+                await self.summarize_document(document_id)
+
+        await asyncio.gather(*(worker() for _ in range(min(settings.summary_precompute_concurrency, len(missing)))))
+
+    async def _missing_document_ids(self) -> list[int]:
+        version = self._summarization_service.version
+        async with AsyncSessionLocal() as db:
+            documents = (await db.execute(select(Document.id, Document.content))).all()
+            keys = list({summary_key(content, version) for _, content in documents})
+            existing: set[str] = set()
+            for start in range(0, len(keys), _LOOKUP_BATCH_SIZE):
+                batch = keys[start : start + _LOOKUP_BATCH_SIZE]
+                existing.update(
+                    (
+                        await db.execute(
+                            select(DocumentSummary.content_hash).where(DocumentSummary.content_hash.in_(batch))
+                        )
+                    )
+                    .scalars()
+                    .all()
+                )
+        return [document_id for document_id, content in documents if summary_key(content, version) not in existing]
+
+    async def _get_or_create(self, db: AsyncSession, content: str) -> str:
+        key = summary_key(content, self._summarization_service.version)
+        stored = await db.get(DocumentSummary, key)
+        if stored is not None:
+            return stored.summary
+        summary = await self._summarization_service.summarize(content)
+        # Another task may have summarized the same content meanwhile; either summary will do.
+        await db.execute(
+            insert(DocumentSummary)
+            .values(content_hash=key, summary=summary, created_at=time.time())
+            .on_conflict_do_nothing(index_elements=["content_hash"])
+        )
+        await db.commit()
+        return summary
+
+
+@cache
+def get_summary_precompute_semaphore() -> asyncio.Semaphore:
+    return asyncio.Semaphore(settings.summary_precompute_concurrency)
+
+
+def get_document_summary_service() -> DocumentSummaryService:
+    return DocumentSummaryService()
@@ -0,0 +1,123 @@
+"""Embedding backends.
+
+Every vector index in the service embeds text through an ``Embedder``. The
+backend is chosen with the ``embedding_backend`` setting: the OpenAI
+embeddings API, or a sentence-transformers model run in-process, which needs
+no network access at all.
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from typing import Any
+
+import numpy as np
+from openai import AsyncOpenAI, OpenAI
+
+from app.core.config import settings
+
+
+class Embedder(ABC):
+    """Turns texts into float32 vectors of a fixed dimension."""
+
+    model_name: str
+
+    @property
+    @abstractmethod
+    def dimension(self) -> int:
+        """Length of the vectors produced by this embedder."""
+
+    @abstractmethod
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Embed texts synchronously; used for bulk work off the event loop.
+
+        Returns:
+            Array of shape (len(texts), dimension)
+        """
+
+    @abstractmethod
+    async def aembed(self, texts: list[str]) -> np.ndarray:
+        """Embed texts without blocking the event loop.
+
+        Returns:
+            Array of shape (len(texts), dimension)
+        """
+
+
+class OpenAIEmbedder(Embedder):
+    DIMENSIONS = {
+        "text-embedding-3-small": 1536,
+        "text-embedding-3-large": 3072,
+        "text-embedding-ada-002": 1536,
+    }
+    # Upper bound on inputs per embeddings.create call.
+    MAX_BATCH_SIZE = 2048
+
+    def __init__(self, model_name: str = settings.embedding_model, api_key: str = settings.openai_api_key):
+        if model_name not in self.DIMENSIONS:
+            raise ValueError(f"Unknown OpenAI embedding model: {model_name}")
+        self.model_name = model_name
+        self._client = OpenAI(api_key=api_key)
+        self._async_client = AsyncOpenAI(api_key=api_key)
+
+    @property
+    def dimension(self) -> int:
+        return self.DIMENSIONS[self.model_name]
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        batches = [np.empty((0, self.dimension), dtype=np.float32)]
+        for start in range(0, len(texts), self.MAX_BATCH_SIZE):
+            batch = texts[start : start + self.MAX_BATCH_SIZE]
+            resp = self._client.embeddings.create(model=self.model_name, input=batch)
+            batches.append(np.array([item.embedding for item in resp.data], dtype="float32"))
+        return np.vstack(batches)
+
+    async def aembed(self, texts: list[str]) -> np.ndarray:
+        resp = await self._async_client.embeddings.create(model=self.model_name, input=texts)
+        return np.array([item.embedding for item in resp.data], dtype="float32")
+
+
+class SentenceTransformerEmbedder(Embedder):
+    def __init__(
+        self,
+        model_name: str = settings.sentence_transformer_model,
+        batch_size: int = settings.sentence_transformer_batch_size,
+        max_workers: int = settings.sentence_transformer_max_workers,
+    ):
+        # Imported lazily: torch is only loaded when the local backend is selected.
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self._model: Any = SentenceTransformer(model_name)
+        self._batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="embedder")
+
+    @property
+    def dimension(self) -> int:
+        return int(self._model.get_sentence_embedding_dimension())
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        # Normalized so inner-product search is cosine similarity, as with OpenAI vectors.
+        vectors = self._model.encode(
+            texts,
+            batch_size=self._batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+    async def aembed(self, texts: list[str]) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.embed, texts)
+
+
+@cache
+def get_embedder() -> Embedder:
+    """Return the process-wide embedder selected by ``settings.embedding_backend``."""
+    if settings.embedding_backend == "sentence-transformers":
+        return SentenceTransformerEmbedder()
+    return OpenAIEmbedder()
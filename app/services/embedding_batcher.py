@@ -0,0 +1,120 @@
+"""Non-blocking, micro-batching embedding client.
+
+Concurrent ``embed`` calls are queued for a short window and coalesced into a
+single ``Embedder.aembed`` call (up to ``max_batch_size`` inputs), using
+the embedder's async path so the event loop is never blocked on the round
+trip. At most ``max_concurrency`` batches are in flight at once.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from functools import cache
+
+import numpy as np
+
+from app.core.config import settings
+from app.schemas.embedding import EmbeddingBatcherStats
+from app.services.embedders import get_embedder
+
+EmbedBatchFn = Callable[[list[str]], Awaitable[np.ndarray]]
+
+
+class EmbeddingBatcher:
+    def __init__(
+        self,
+        embed_batch: EmbedBatchFn,
+        max_batch_size: int = settings.embedding_batch_max_size,
+        window_ms: float = settings.embedding_batch_window_ms,
+        max_concurrency: int = settings.embedding_batch_max_concurrency,
+    ):
+        self._embed_batch = embed_batch
+        self._max_batch_size = max_batch_size
+        self._window_seconds = window_ms / 1000
+        self._max_concurrency = max_concurrency
+
+        # Loop-bound state, created on first use from the running event loop.
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._pending: list[tuple[str, asyncio.Future[np.ndarray]]] = []
+        self._tasks: set[asyncio.Task[None]] = set()
+
+        self._in_flight_batches = 0
+        self._total_requests = 0
+        self._total_batches = 0
+        self._total_batched_inputs = 0
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed one text, sharing an API call with any concurrent callers.
+
+        Returns:
+            The embedding as a 1-D float32 array
+        """
+        loop = self._bind_loop()
+        future: asyncio.Future[np.ndarray] = loop.create_future()
+        self._pending.append((text, future))
+        self._total_requests += 1
+
+        if len(self._pending) >= self._max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._window_seconds, self._flush)
+        return await future
+
+    def stats(self) -> EmbeddingBatcherStats:
+        """Return queue depth and batching counters."""
+        return EmbeddingBatcherStats(
+            queue_depth=len(self._pending),
+            in_flight_batches=self._in_flight_batches,
+            max_concurrency=self._max_concurrency,
+            total_requests=self._total_requests,
+            total_batches=self._total_batches,
+            mean_batch_size=self._total_batched_inputs / self._total_batches if self._total_batches else 0.0,
+        )
+
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+            self._flush_handle = None
+            self._pending = []
+        return loop
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        while self._pending:
+            batch = self._pending[: self._max_batch_size]
+            self._pending = self._pending[self._max_batch_size :]
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: list[tuple[str, asyncio.Future[np.ndarray]]]) -> None:
+        assert self._semaphore is not None
+        async with self._semaphore:
+            self._in_flight_batches += 1
+            self._total_batches += 1
+            self._total_batched_inputs += len(batch)
+            try:
+                vectors = await self._embed_batch([text for text, _ in batch])
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                return
+            finally:
+                self._in_flight_batches -= 1
+
+        for (_, future), vector in zip(batch, vectors, strict=True):
+            if not future.done():
+                future.set_result(vector)
+
+
+@cache
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """Return the process-wide batcher in front of the configured embedder."""
+    return EmbeddingBatcher(get_embedder().aembed)
@@ -0,0 +1,74 @@
+"""Content-addressed embedding store.
+
+Vectors are persisted in the ``embeddings`` table keyed by a hash of the
+embedded text and the embedding model, so unchanged documents are never
+embedded twice.
+"""
+
+import hashlib
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.models.embedding import Embedding
+from app.services.embedders import Embedder
+
+# Keep IN (...) lookups well below SQLite's bound-parameter limit.
+_LOOKUP_BATCH_SIZE = 500
+
+
+def content_hash(text: str) -> str:
+    """Return the hex SHA-256 digest used to address the embedding of ``text``."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStoreService:
+    def __init__(self, embedder: Embedder):
+        self._embedder = embedder
+        self._model = embedder.model_name
+
+    def get_embeddings(self, db: Session, texts: list[str]) -> np.ndarray:
+        """Return one float32 vector per text, embedding only texts not already stored.
+
+        Args:
+            db: Synchronous database session
+            texts: Texts to embed
+
+        Returns:
+            Array of shape (len(texts), dim) in the same order as ``texts``
+        """
+        hashes = [content_hash(text) for text in texts]
+        vectors = self._load_vectors(db, set(hashes))
+
+        missing = {h: text for h, text in zip(hashes, texts, strict=True) if h not in vectors}
+        if missing:
+            new_vectors = self._embedder.embed(list(missing.values()))
+            rows: list[dict[str, object]] = []
+            for h, vector in zip(missing, new_vectors, strict=True):
+                vectors[h] = vector
+                rows.append({"content_hash": h, "model": self._model, "vector": vector.tobytes()})
+            # A concurrent ingest of the same text may have stored it first; its vector is the same.
+            # Rows are executemany parameters, so no single statement holds them all.
+            db.execute(insert(Embedding).on_conflict_do_nothing(), rows)
+            db.commit()
+            print(f"Embedded {len(missing)} new text(s), reused {len(set(hashes)) - len(missing)} stored")
+
+        if not hashes:
+            return np.empty((0, self._embedder.dimension), dtype=np.float32)
+        return np.vstack([vectors[h] for h in hashes])
+
+    def _load_vectors(self, db: Session, hashes: set[str]) -> dict[str, np.ndarray]:
+        vectors: dict[str, np.ndarray] = {}
+        pending = list(hashes)
+        for start in range(0, len(pending), _LOOKUP_BATCH_SIZE):
+            batch = pending[start : start + _LOOKUP_BATCH_SIZE]
+            rows = db.execute(
+                select(Embedding.content_hash, Embedding.vector).where(
+                    Embedding.model == self._model, Embedding.content_hash.in_(batch)
+                )
+            ).all()
+            for h, blob in rows:
+                vectors[h] = np.frombuffer(blob, dtype=np.float32)
+        return vectors
@@ -1,30 +1,143 @@
-from pydantic_ai import Agent
-from pydantic_ai.mcp import MCPServerStdio
+from contextlib import AsyncExitStack
+from typing import Any
+
+from pydantic_ai import Agent, RunContext
 from pydantic_ai.models.fallback import FallbackModel
+from pydantic_ai.toolsets import AbstractToolset, FunctionToolset
 
+from app.core.singleton import SingletonMeta
+from app.db.session import AsyncSessionLocal
 from app.schemas.extract_structured import (
     StructuredData,
 )
+from app.schemas.terminology import CodeLookup, CodeLookupResult, CodeSystem, TerminologyMatch
+from app.services.extraction_cache import extraction_cache_key, get_cached_extraction, store_extraction
+from app.services.mcp_server_pool import MCPServerPool, get_healthcare_mcp_pool
+from app.services.term_code_memo import MemoizedToolset, get_term_code_memo
+from app.services.terminology_service import SYSTEMS_BY_KIND, TerminologyService, get_terminology_service
+
+
+def lookup_namespace(kind: str) -> str:
+    """Return the term code memo namespace of ``lookup_codes`` results for one kind of item."""
+    return f"lookup:{kind}"
+
+
+LOOKUP_NAMESPACES = [lookup_namespace(kind) for kind in SYSTEMS_BY_KIND]
+
+
+async def lookup_codes(ctx: RunContext[TerminologyService], lookups: list[CodeLookup]) -> list[CodeLookupResult]:
+    """Look up ICD-10 codes for conditions, diagnoses and treatments, and RxNorm codes for medications.
+
+    Pass every term from the note in a single call.
+
+    Args:
+        lookups: The terms to look up, each with what kind of item it names
+    """
+    memo = get_term_code_memo()
+    async with AsyncSessionLocal() as db:
+        cached = [await memo.get(db, lookup_namespace(lookup.kind), lookup.term) for lookup in lookups]
+        misses = [lookup for lookup, found in zip(lookups, cached, strict=True) if found is None]
+        resolved = iter(await ctx.deps.lookup(db, misses))
+        results: list[CodeLookupResult] = []
+        memoized: list[tuple[str, str, Any]] = []
+        for lookup, found in zip(lookups, cached, strict=True):
+            if found is None:
+                matches = next(resolved)
+                if matches:
+                    memoized.append((lookup_namespace(lookup.kind), lookup.term, [m.model_dump() for m in matches]))
+            else:
+                matches = [TerminologyMatch.model_validate(match) for match in found]
+            results.append(CodeLookupResult(term=lookup.term, matches=matches))
+        if memoized:
+            await memo.put_many(db, memoized)
+    return results
 
 
-class ExtractStructuredService:
+class ExtractStructuredService(metaclass=SingletonMeta):
+    MODEL = "gateway/openai:gpt-5.1"
     SYSTEM_PROMPT = """
     You extract structured data from a medical note.
+    """
+    MCP_INSTRUCTIONS = """
+    For every {kinds} in the note:
     Use the healthcare-mcp server to get ICD 10-codes.
     Use the web search to search the internet to get RxNorm codes.
     """
+    TERMINOLOGY_INSTRUCTIONS = """
+    Use the lookup_codes tool once, with every {kinds} in the note,
+    to get ICD-10 and RxNorm codes. Pick the best matching code for each item.
+    """
 
-    def __init__(self):
+    def __init__(self, mcp_pool: MCPServerPool | None = None, terminology_service: TerminologyService | None = None):
+        self._mcp_pool = mcp_pool or get_healthcare_mcp_pool()
+        self._terminology_service = terminology_service or get_terminology_service()
+        self._term_code_memo = get_term_code_memo()
+        self._terminology_toolset = FunctionToolset([lookup_codes])
         self._agent = Agent(
-            FallbackModel("gateway/openai:gpt-5.1"),
+            FallbackModel(self.MODEL),
             instructions=self.SYSTEM_PROMPT,
             output_type=StructuredData,
-            toolsets=[MCPServerStdio("npx", args=["healthcare-mcp"])],
+            deps_type=TerminologyService,
         )
 
-    async def extract_structured(self, data: str) -> StructuredData:
-        result = await self._agent.run(user_prompt=data)
-        return result.output
+    async def extract_structured(self, data: str, refresh: bool = False) -> StructuredData:
+        """Extract structured data from a note, serving repeats of a note from the extraction cache.
+
+        Args:
+            data: The medical note
+            refresh: Ignore any cached result and replace it with a fresh extraction
+        """
+        async with AsyncSessionLocal() as db:
+            local_kinds, mcp_kinds = self._split_kinds(await self._terminology_service.loaded_systems(db))
+            instructions = self._code_instructions(local_kinds, mcp_kinds)
+            cache_key = extraction_cache_key(data, self.SYSTEM_PROMPT + "".join(instructions), self.MODEL)
+            if not refresh and (cached := await get_cached_extraction(db, cache_key)) is not None:
+                return cached
+            known_codes = await self._term_code_memo.find_in_text(db, data, LOOKUP_NAMESPACES)
+        instructions.extend(self._known_codes_instructions(known_codes))
+        # Codes of kinds whose code systems are loaded come from the local terminology index.
+        toolsets: list[AbstractToolset[Any]] = [self._terminology_toolset] if local_kinds else []
+        async with AsyncExitStack() as stack:
+            if mcp_kinds:
+                # The rest come from a warm healthcare-mcp process from the pool instead of one spawned per request.
+                mcp_server = await stack.enter_async_context(self._mcp_pool.lease())
+                toolsets.append(MemoizedToolset(mcp_server, self._term_code_memo))
+            result = await self._agent.run(
+                user_prompt=data, instructions=instructions, toolsets=toolsets, deps=self._terminology_service
+            )
+        async with AsyncSessionLocal() as db:
+            structured_data = await self._terminology_service.resolve_structured_data(db, result.output)
+            await self._term_code_memo.flush(db)
+            await store_extraction(db, cache_key, structured_data)
+        return structured_data
+
+    @staticmethod
+    def _split_kinds(loaded: set[CodeSystem]) -> tuple[list[str], list[str]]:
+        """Split item kinds into those with a loaded code system and those that need the MCP server."""
+        local_kinds = [kind for kind, systems in SYSTEMS_BY_KIND.items() if loaded.intersection(systems)]
+        return local_kinds, [kind for kind in SYSTEMS_BY_KIND if kind not in local_kinds]
+
+    def _code_instructions(self, local_kinds: list[str], mcp_kinds: list[str]) -> list[str]:
+        instructions: list[str] = []
+        if local_kinds:
+            instructions.append(self.TERMINOLOGY_INSTRUCTIONS.format(kinds=", ".join(local_kinds)))
+        if mcp_kinds:
+            instructions.append(self.MCP_INSTRUCTIONS.format(kinds=", ".join(mcp_kinds)))
+        return instructions
+
+    def _known_codes_instructions(self, known_codes: dict[tuple[str, str], Any]) -> list[str]:
+        """Give the agent the memoized codes of terms in the note, so it need not look them up."""
+        lines = [
+            f"- {term} ({namespace.removeprefix('lookup:')}): {matches[0]['code']} {matches[0]['display']}"
+            for (namespace, term), matches in known_codes.items()
+            if matches
+        ]
+        if not lines:
+            return []
+        return [
+            "These codes are already known for terms in the note; use them without looking them up:\n"
+            + "\n".join(lines)
+        ]
 
 
 def get_extract_structured_service() -> ExtractStructuredService:
@@ -0,0 +1,54 @@
+"""Persistent cache of ``/extract_structured`` results.
+
+Extraction runs an agent with tool calls, which takes seconds, while ETL
+retries and reprocessing jobs submit the same notes again and again. Results
+are stored in ``extraction_results`` under a hash of the normalized note, the
+prompt and the model, so a repeat is a single row lookup and any change to
+the prompt, output schema or model invalidates earlier results.
+"""
+
+import hashlib
+import json
+import time
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.extraction_result import ExtractionResult
+from app.schemas.extract_structured import StructuredData
+
+
+def normalize_note(note: str) -> str:
+    """Collapse whitespace, so notes differing only in spacing or line endings share a cache entry."""
+    return " ".join(note.split())
+
+
+def extraction_cache_key(note: str, prompt: str, model: str) -> str:
+    """Return the hex SHA-256 digest identifying an extraction of ``note`` with ``prompt`` and ``model``."""
+    output_schema = json.dumps(StructuredData.model_json_schema(), sort_keys=True)
+    parts = (normalize_note(note), prompt, output_schema, model)
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+async def get_cached_extraction(db: AsyncSession, cache_key: str) -> StructuredData | None:
+    structured_data = (
+        await db.execute(select(ExtractionResult.structured_data).where(ExtractionResult.cache_key == cache_key))
+    ).scalar_one_or_none()
+    if structured_data is None:
+        return None
+    return StructuredData.model_validate_json(structured_data)
+
+
+async def store_extraction(db: AsyncSession, cache_key: str, structured_data: StructuredData) -> None:
+    """Store or replace the cached result for ``cache_key``."""
+    statement = insert(ExtractionResult).values(
+        cache_key=cache_key, structured_data=structured_data.model_dump_json(), created_at=time.time()
+    )
+    await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=["cache_key"],
+            set_={"structured_data": statement.excluded.structured_data, "created_at": statement.excluded.created_at},
+        )
+    )
+    await db.commit()
@@ -1,234 +1,153 @@
-"""Service for converting structured medical data to FHIR resources."""
-
+"""Service for converting structured medical data to FHIR resources.
+
+Bundles are emitted as plain dicts from templates instead of being built as a
+``fhir.resources`` object graph and dumped; only per-item values are filled in.
+Full ``fhir.resources`` validation is applied according to ``fhir_validation_mode``:
+
+- ``strict`` (default): every bundle is validated and returned exactly as ``fhir.resources``
+  dumps it, and invalid bundles are rejected
+- ``sample``: a ``fhir_validation_sample_rate`` fraction of bundles is validated, and
+  failures or differences from the validated dump are logged; invalid data such as an
+  empty code is otherwise returned unchecked
+- ``off``: bundles are not validated
+"""
+
+import random
+from collections.abc import Callable
 from datetime import date, datetime
-from typing import Any
+from typing import Any, Literal
 from uuid import uuid4
 
-from fhir.resources.bundle import Bundle, BundleEntry
-from fhir.resources.codeableconcept import CodeableConcept
-from fhir.resources.codeablereference import CodeableReference
-from fhir.resources.coding import Coding
-from fhir.resources.condition import Condition
-from fhir.resources.humanname import HumanName
-from fhir.resources.medicationstatement import MedicationStatement
-from fhir.resources.patient import Patient
-from fhir.resources.procedure import Procedure
-from fhir.resources.reference import Reference
+from fhir.resources.bundle import Bundle
+from pydantic import ValidationError
 
+from app.core.config import settings
 from app.schemas.extract_structured import StructuredData
 
+FHIRValidationMode = Literal["strict", "sample", "off"]
 
-class FHIRConversionService:
-    """Service for converting structured medical data to FHIR resources."""
+ICD10_SYSTEM = "http://hl7.org/fhir/sid/icd-10"
+ICD10_PROCEDURES_SYSTEM = "http://hl7.org/fhir/sid/icd-10-procedures"
+RXNORM_SYSTEM = "http://www.nlm.nih.gov/research/umls/rxnorm"
 
-    def __init__(self):
-        """Initialize the FHIR conversion service."""
-        pass
+CONDITION_CLINICAL_SYSTEM = "http://terminology.hl7.org/CodeSystem/condition-clinical"
+CONDITION_VER_STATUS_SYSTEM = "http://terminology.hl7.org/CodeSystem/condition-ver-status"
 
-    def convert_to_fhir(self, structured_data: StructuredData) -> dict[str, Any]:
-        """
-        Convert structured medical data to a FHIR Bundle.
 
-        Args:
-            structured_data: The structured medical data to convert
+def _status_concept(system: str, code: str) -> dict[str, Any]:
+    # Built per resource: returned bundles must not share mutable fragments.
+    return {"coding": [{"system": system, "code": code}]}
 
-        Returns:
-            A dictionary representing a FHIR Bundle with all resources
-        """
-        patient_id = str(uuid4())
 
-        patient = self._create_patient_resource(structured_data, patient_id)
-        conditions = self._create_condition_resources(structured_data, patient_id)
-        procedures = self._create_procedure_resources(structured_data, patient_id)
-        medications = self._create_medication_resources(structured_data, patient_id)
+def _codeable_concept(system: str, code: str, name: str) -> dict[str, Any]:
+    return {"coding": [{"system": system, "code": code, "display": name}], "text": name}
 
-        entries = [BundleEntry(resource=patient)]
-        entries.extend([BundleEntry(resource=condition) for condition in conditions])
-        entries.extend([BundleEntry(resource=procedure) for procedure in procedures])
-        entries.extend([BundleEntry(resource=medication) for medication in medications])
 
-        bundle = Bundle(type="collection", entry=entries)
-        return bundle.model_dump(exclude_none=True)
+class FHIRConversionService:
+    """Service for converting structured medical data to FHIR resources."""
 
-    def _create_patient_resource(self, structured_data: StructuredData, patient_id: str) -> Patient:
-        """
-        Create a FHIR Patient resource from structured data.
+    def __init__(
+        self,
+        validation_mode: FHIRValidationMode = settings.fhir_validation_mode,
+        sample_rate: float = settings.fhir_validation_sample_rate,
+        id_factory: Callable[[], str] | None = None,
+    ):
+        """Initialize the FHIR conversion service.
 
         Args:
-            structured_data: The structured medical data
-            patient_id: The unique patient identifier
-
-        Returns:
-            A FHIR Patient resource
+            validation_mode: How bundles are validated with ``fhir.resources``
+            sample_rate: Fraction of bundles validated in ``sample`` mode
+            id_factory: Returns a new resource id; random UUIDs by default
         """
-        name = HumanName(text=structured_data.name)
-
-        birth_date: date | None = None
-        if structured_data.age:
-            approximate_birth_year = datetime.now().year - structured_data.age
-            birth_date = date(approximate_birth_year, 1, 1)
+        self._validation_mode = validation_mode
+        self._sample_rate = sample_rate
+        self._new_id = id_factory or (lambda: str(uuid4()))
 
-        patient = Patient(
-            id=patient_id,
-            name=[name],
-            birthDate=birth_date,
-        )
-
-        return patient
-
-    def _create_condition_resources(self, structured_data: StructuredData, patient_id: str) -> list[Condition]:
+    def convert_to_fhir(self, structured_data: StructuredData) -> dict[str, Any]:
         """
-        Create FHIR Condition resources from structured data.
-
-        Combines both conditions and diagnoses into FHIR Condition resources
-        as per FHIR specification.
+        Convert structured medical data to a FHIR Bundle.
 
         Args:
-            structured_data: The structured medical data
-            patient_id: The unique patient identifier
+            structured_data: The structured medical data to convert
 
         Returns:
-            A list of FHIR Condition resources
-        """
-        conditions = []
-
-        for cond in structured_data.conditions:
-            condition = Condition(
-                id=str(uuid4()),
-                code=CodeableConcept(
-                    coding=[
-                        Coding(
-                            system="http://hl7.org/fhir/sid/icd-10",
-                            code=cond.icd_code,
-                            display=cond.name,
-                        )
-                    ],
-                    text=cond.name,
-                ),
-                subject=Reference(reference=f"Patient/{patient_id}"),
-                clinicalStatus=CodeableConcept(
-                    coding=[
-                        Coding(
-                            system="http://terminology.hl7.org/CodeSystem/condition-clinical",
-                            code="active",
-                        )
-                    ]
-                ),
-                verificationStatus=CodeableConcept(
-                    coding=[
-                        Coding(
-                            system="http://terminology.hl7.org/CodeSystem/condition-ver-status",
-                            code="confirmed",
-                        )
-                    ]
-                ),
-            )
-            conditions.append(condition)
-
-        for diag in structured_data.diagnoses:
-            condition = Condition(
-                id=str(uuid4()),
-                code=CodeableConcept(
-                    coding=[
-                        Coding(
-                            system="http://hl7.org/fhir/sid/icd-10",
-                            code=diag.icd_code,
-                            display=diag.name,
-                        )
-                    ],
-                    text=diag.name,
-                ),
-                subject=Reference(reference=f"Patient/{patient_id}"),
-                clinicalStatus=CodeableConcept(
-                    coding=[
-                        Coding(
-                            system="http://terminology.hl7.org/CodeSystem/condition-clinical",
-                            code="active",
-                        )
-                    ]
-                ),
-                verificationStatus=CodeableConcept(
-                    coding=[
-                        Coding(
-                            system="http://terminology.hl7.org/CodeSystem/condition-ver-status",
-                            code="confirmed",
-                        )
-                    ]
-                ),
-            )
-            conditions.append(condition)
-
-        return conditions
-
-    def _create_procedure_resources(self, structured_data: StructuredData, patient_id: str) -> list[Procedure]:
-        """
-        Create FHIR Procedure resources from structured data.
-
-        Args:
-            structured_data: The structured medical data
-            patient_id: The unique patient identifier
+            A dictionary representing a FHIR Bundle with all resources
 
-        Returns:
-            A list of FHIR Procedure resources
+        Raises:
+            ValidationError: In ``strict`` mode, if the bundle is not valid FHIR
         """
-        procedures = []
-
-        for treatment in structured_data.treatments:
-            procedure = Procedure(
-                id=str(uuid4()),
-                status="completed",
-                code=CodeableConcept(
-                    coding=[
-                        Coding(
-                            system="http://hl7.org/fhir/sid/icd-10-procedures",
-                            code=treatment.icd_code,
-                            display=treatment.name,
-                        )
-                    ],
-                    text=treatment.name,
-                ),
-                subject=Reference(reference=f"Patient/{patient_id}"),
-            )
-            procedures.append(procedure)
-
-        return procedures
-
-    def _create_medication_resources(
-        self, structured_data: StructuredData, patient_id: str
-    ) -> list[MedicationStatement]:
+        bundle = self._build_bundle(structured_data)
+        if self._validation_mode == "strict":
+            return Bundle.model_validate(bundle).model_dump(exclude_none=True)
+        if self._validation_mode == "sample" and random.random() < self._sample_rate:
+            self._check_sample(bundle)
+        return bundle
+
+    def _build_bundle(self, structured_data: StructuredData) -> dict[str, Any]:
         """
-        Create FHIR MedicationStatement resources from structured data.
+        Emit the Bundle of a Patient and its Condition, Procedure and MedicationStatement resources.
+
+        Conditions and diagnoses both become Condition resources, as per the FHIR specification.
 
         Args:
             structured_data: The structured medical data
-            patient_id: The unique patient identifier
 
         Returns:
-            A list of FHIR MedicationStatement resources
+            The Bundle, in the form ``fhir.resources`` dumps it with ``exclude_none=True``
         """
-        medications = []
-
-        for med in structured_data.medications:
-            medication = MedicationStatement(
-                id=str(uuid4()),
-                status="recorded",
-                medication=CodeableReference(
-                    concept=CodeableConcept(
-                        coding=[
-                            Coding(
-                                system="http://www.nlm.nih.gov/research/umls/rxnorm",
-                                code=med.rx_norm_code,
-                                display=med.name,
-                            )
-                        ],
-                        text=med.name,
-                    )
-                ),
-                subject=Reference(reference=f"Patient/{patient_id}"),
-            )
-            medications.append(medication)
-
-        return medications
+        patient_id = self._new_id()
+        subject = {"reference": f"Patient/{patient_id}"}
+
+        patient: dict[str, Any] = {
+            "resourceType": "Patient",
+            "id": patient_id,
+            "name": [{"text": structured_data.name}],
+        }
+        if structured_data.age:
+            approximate_birth_year = datetime.now().year - structured_data.age
+            patient["birthDate"] = date(approximate_birth_year, 1, 1)
+
+        entries: list[dict[str, Any]] = [{"resource": patient}]
+        for item in [*structured_data.conditions, *structured_data.diagnoses]:
+            condition = {
+                "resourceType": "Condition",
+                "id": self._new_id(),
+                "clinicalStatus": _status_concept(CONDITION_CLINICAL_SYSTEM, "active"),
+                "verificationStatus": _status_concept(CONDITION_VER_STATUS_SYSTEM, "confirmed"),
+                "code": _codeable_concept(ICD10_SYSTEM, item.icd_code, item.name),
+                "subject": dict(subject),
+            }
+            entries.append({"resource": condition})
+        for treatment in structured_data.treatments:
+            procedure = {
+                "resourceType": "Procedure",
+                "id": self._new_id(),
+                "status": "completed",
+                "code": _codeable_concept(ICD10_PROCEDURES_SYSTEM, treatment.icd_code, treatment.name),
+                "subject": dict(subject),
+            }
+            entries.append({"resource": procedure})
+        for medication in structured_data.medications:
+            statement = {
+                "resourceType": "MedicationStatement",
+                "id": self._new_id(),
+                "status": "recorded",
+                "medication": {"concept": _codeable_concept(RXNORM_SYSTEM, medication.rx_norm_code, medication.name)},
+                "subject": dict(subject),
+            }
+            entries.append({"resource": statement})
+
+        return {"resourceType": "Bundle", "type": "collection", "entry": entries}
+
+    def _check_sample(self, bundle: dict[str, Any]) -> None:
+        """Validate a sampled bundle, logging failures and any difference from the validated dump."""
+        try:
+            validated = Bundle.model_validate(bundle).model_dump(exclude_none=True)
+        except ValidationError as exc:
+            print(f"Sampled FHIR bundle failed validation: {exc}")
+            return
+        if validated != bundle:
+            print("Sampled FHIR bundle differs from its validated form")
 
 
 def get_fhir_conversion_service() -> FHIRConversionService:
@@ -0,0 +1,90 @@
+"""On-disk snapshots of the FAISS indexes.
+
+Each snapshot is a ``{name}-{token}.faiss`` file written with
+``faiss.serialize_index`` plus a ``{name}.json`` manifest naming that file and
+recording the highest row id it contains and the embedder it was built with.
+On startup the snapshot is memory-mapped read-only and only rows newer than the
+manifest are replayed, so a cold start costs one mmap instead of embedding the
+whole table.
+"""
+
+import os
+import threading
+from pathlib import Path
+from uuid import uuid4
+
+import faiss
+import numpy as np
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.services.vector_index import IndexKind, VectorIndex
+
+
+class IndexSnapshotManifest(BaseModel):
+    max_id: int
+    embedding_model: str
+    dimension: int
+    kind: IndexKind
+    tombstones: list[int] = []
+    # Unix time the snapshot was taken; rows created later are replayed even if their id is not above max_id.
+    saved_at: float | None = None
+    # Name of the index file in the snapshot directory; set by ``IndexSnapshot.save``.
+    index_file: str | None = None
+
+
+class IndexSnapshot:
+    """Snapshot files for one named index."""
+
+    def __init__(self, name: str, directory: Path = Path(settings.index_snapshot_dir)):
+        self._name = name
+        self._directory = directory
+        self.manifest_path = directory / f"{name}.json"
+        self._save_lock = threading.Lock()
+
+    def load(self, embedding_model: str, dimension: int) -> tuple[VectorIndex, IndexSnapshotManifest] | None:
+        """Memory-map the snapshot if it exists and matches the current embedder.
+
+        Returns:
+            The index and its manifest, or None when there is no usable snapshot
+        """
+        if not self.manifest_path.exists():
+            return None
+        manifest = IndexSnapshotManifest.model_validate_json(self.manifest_path.read_text())
+        if manifest.index_file is None or not (index_path := self._directory / manifest.index_file).exists():
+            print(f"Ignoring snapshot {self.manifest_path}: its index file is missing")
+            return None
+        if manifest.embedding_model != embedding_model or manifest.dimension != dimension:
+            print(f"Ignoring snapshot {index_path}: built with {manifest.embedding_model}")
+            return None
+
+        raw = faiss.read_index(str(index_path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        assert isinstance(raw, faiss.IndexIDMap)
+        index = VectorIndex(raw, manifest.kind, mmap_path=index_path)
+        index.remove(np.array(manifest.tombstones, dtype=np.int64))
+        return index, manifest
+
+    def save(self, data: np.ndarray, manifest: IndexSnapshotManifest) -> None:
+        """Atomically write a serialized index and its manifest.
+
+        ``data`` comes from ``VectorIndex.serialize`` so the caller can take it
+        under its index lock and leave the file write outside of it. The index
+        is written to a new file first, and swapping in the manifest that names
+        it with ``os.replace`` commits the snapshot: a crash before then leaves
+        the previous snapshot in place, and an existing memory map of the old
+        file stays valid after it is removed.
+        """
+        with self._save_lock:
+            self._write(data, manifest)
+
+    def _write(self, data: np.ndarray, manifest: IndexSnapshotManifest) -> None:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        index_file = f"{self._name}-{uuid4().hex}.faiss"
+        (self._directory / index_file).write_bytes(data.tobytes())
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        tmp_path.write_text(manifest.model_copy(update={"index_file": index_file}).model_dump_json())
+        os.replace(tmp_path, self.manifest_path)
+        # Index files of earlier snapshots, or of a save interrupted before its manifest was written.
+        for path in [*self._directory.glob(f"{self._name}-*.faiss"), self._directory / f"{self._name}.faiss"]:
+            if path.name != index_file:
+                path.unlink(missing_ok=True)
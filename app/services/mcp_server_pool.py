@@ -0,0 +1,172 @@
+"""Pool of long-lived MCP server subprocesses.
+
+Starting an MCP stdio server spawns a process (and, for ``npx`` servers,
+resolves the package), which is far too slow to repeat on every request. The
+pool keeps ``size`` servers running from application startup, leases one per
+request, health-checks idle servers periodically and restarts any server that
+fails.
+
+Each server is entered and exited by its own supervisor task, because the MCP
+client's task groups must be closed by the task that opened them.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from functools import cache
+
+from pydantic_ai.mcp import MCPServer, MCPServerStdio
+
+from app.core.config import settings
+
+# Longest wait between attempts to start a server that keeps failing.
+_MAX_RESTART_BACKOFF_SECONDS = 60.0
+
+
+class MCPServerPoolUnavailableError(Exception):
+    """No healthy MCP server became available within the lease timeout."""
+
+
+@dataclass(eq=False)
+class _Slot:
+    """One pooled server position, refilled by its supervisor whenever its server fails."""
+
+    index: int
+    server: MCPServer | None = None
+    failed: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class MCPServerPool:
+    def __init__(
+        self,
+        factory: Callable[[], MCPServer],
+        size: int = settings.mcp_pool_size,
+        *,
+        lease_timeout: float = settings.mcp_pool_lease_timeout_seconds,
+        health_check_interval: float = settings.mcp_pool_health_check_interval_seconds,
+        health_check_timeout: float = settings.mcp_pool_health_check_timeout_seconds,
+        restart_backoff: float = settings.mcp_pool_restart_backoff_seconds,
+    ):
+        """
+        Args:
+            factory: Creates a new, not yet started server
+            size: Number of servers kept running
+            lease_timeout: Seconds ``lease`` waits for a healthy server
+            health_check_interval: Seconds between health checks of idle servers
+            health_check_timeout: Seconds a server has to answer a health check
+            restart_backoff: Initial delay before retrying a server that failed to start;
+                doubled on every consecutive failure
+        """
+        self._factory = factory
+        self._size = size
+        self._lease_timeout = lease_timeout
+        self._health_check_interval = health_check_interval
+        self._health_check_timeout = health_check_timeout
+        self._restart_backoff = restart_backoff
+        # Idle servers, paired with their slot. An entry is stale once its slot has moved on to a new server.
+        self._idle: asyncio.Queue[tuple[_Slot, MCPServer]] = asyncio.Queue()
+        self._tasks: list[asyncio.Task[None]] = []
+        self._checks: set[asyncio.Task[None]] = set()
+
+    @property
+    def idle_count(self) -> int:
+        return self._idle.qsize()
+
+    async def start(self) -> None:
+        """Start the servers and the health checker in the background."""
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._supervise(_Slot(i))) for i in range(self._size)]
+        self._tasks.append(asyncio.create_task(self._health_check_loop()))
+
+    async def close(self) -> None:
+        """Stop every server."""
+        tasks = [*self._tasks, *self._checks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._checks.clear()
+        self._idle = asyncio.Queue()
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[MCPServer]:
+        """Borrow a running server for the duration of the context.
+
+        If the borrower fails, the server is health-checked before it is
+        leased again and restarted if it does not respond.
+
+        Raises:
+            MCPServerPoolUnavailableError: If no server becomes available within the lease timeout
+        """
+        try:
+            async with asyncio.timeout(self._lease_timeout):
+                slot, server = await self._idle.get()
+                while slot.server is not server:
+                    slot, server = await self._idle.get()
+        except TimeoutError:
+            raise MCPServerPoolUnavailableError(
+                f"No MCP server became available within {self._lease_timeout}s"
+            ) from None
+        try:
+            yield server
+        except BaseException:
+            task = asyncio.create_task(self._check(slot, server))
+            self._checks.add(task)
+            task.add_done_callback(self._checks.discard)
+            raise
+        else:
+            self._idle.put_nowait((slot, server))
+
+    async def _supervise(self, slot: _Slot) -> None:
+        """Keep one server running, starting a new one whenever it fails."""
+        failures = 0
+        while True:
+            slot.failed.clear()
+            server = self._factory()
+            try:
+                async with server:
+                    failures = 0
+                    slot.server = server
+                    self._idle.put_nowait((slot, server))
+                    await slot.failed.wait()
+            except Exception as exc:
+                failures += 1
+                print(f"MCP server {slot.index} failed: {exc!r}")
+            finally:
+                slot.server = None
+            if failures:
+                await asyncio.sleep(min(self._restart_backoff * 2 ** (failures - 1), _MAX_RESTART_BACKOFF_SECONDS))
+            print(f"Restarting MCP server {slot.index}")
+
+    async def _health_check_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._health_check_interval)
+            idle: list[tuple[_Slot, MCPServer]] = []
+            while not self._idle.empty():
+                idle.append(self._idle.get_nowait())
+            await asyncio.gather(*(self._check(slot, server) for slot, server in idle))
+
+    async def _check(self, slot: _Slot, server: MCPServer) -> None:
+        """Return a responsive server to the pool, or have its supervisor restart it."""
+        if slot.server is not server:
+            return
+        try:
+            async with asyncio.timeout(self._health_check_timeout):
+                await server.list_tools()
+        except Exception as exc:
+            print(f"MCP server {slot.index} failed its health check: {exc!r}")
+            if slot.server is server:
+                slot.failed.set()
+        else:
+            self._idle.put_nowait((slot, server))
+
+
+def create_healthcare_mcp_server() -> MCPServerStdio:
+    return MCPServerStdio("npx", args=["healthcare-mcp"])
+
+
+@cache
+def get_healthcare_mcp_pool() -> MCPServerPool:
+    return MCPServerPool(create_healthcare_mcp_server)
@@ -0,0 +1,52 @@
+"""In-process pipeline from medical notes to FHIR Bundles.
+
+Runs structured extraction and FHIR conversion back to back for each note, so
+clients need one request per batch instead of two per note and the
+intermediate ``StructuredData`` is never serialized and re-validated.
+"""
+
+import asyncio
+from collections.abc import AsyncIterable, AsyncIterator
+from functools import cache
+from typing import Any
+
+from app.core.config import settings
+from app.schemas.fhir_conversion import NoteToFHIRItem
+from app.services.concurrency import ItemOutcome, map_bounded
+from app.services.extract_structured_service import ExtractStructuredService, get_extract_structured_service
+from app.services.fhir_conversion_service import FHIRConversionService, get_fhir_conversion_service
+
+
+class NoteToFHIRService:
+    def __init__(
+        self,
+        extract_structured_service: ExtractStructuredService | None = None,
+        fhir_conversion_service: FHIRConversionService | None = None,
+    ):
+        self._extract_structured_service = extract_structured_service or get_extract_structured_service()
+        self._fhir_conversion_service = fhir_conversion_service or get_fhir_conversion_service()
+
+    async def convert(self, note: NoteToFHIRItem) -> dict[str, Any]:
+        """Extract structured data from a note and convert it to a FHIR Bundle."""
+        structured_data = await self._extract_structured_service.extract_structured(note.data, refresh=note.refresh)
+        return self._fhir_conversion_service.convert_to_fhir(structured_data)
+
+    def convert_many(
+        self, notes: AsyncIterable[NoteToFHIRItem | Exception]
+    ) -> AsyncIterator[ItemOutcome[NoteToFHIRItem, dict[str, Any]]]:
+        """Convert a batch of notes, yielding each outcome as soon as it completes.
+
+        At most ``note_to_fhir_concurrency`` notes are processed at once across
+        all concurrent batches in the process. A failed note is reported in its
+        outcome and does not stop the rest of the batch.
+        """
+        return map_bounded(notes, self.convert, get_note_to_fhir_semaphore())
+
+
+@cache
+def get_note_to_fhir_semaphore() -> asyncio.Semaphore:
+    return asyncio.Semaphore(settings.note_to_fhir_concurrency)
+
+
+def get_note_to_fhir_service() -> NoteToFHIRService:
+    return NoteToFHIRService()
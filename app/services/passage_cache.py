@@ -0,0 +1,76 @@
+"""Process-wide LRU cache of retrieved passages.
+
+Retrieval resolves chunk ids from the document index into passage text and
+parent document titles. Frequently cited chunks are kept here so they are
+served without touching SQLite; entries are dropped per document whenever a
+document is updated or deleted.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cache
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class RetrievedPassage:
+    """A retrieved chunk of a document, labelled with its parent document title."""
+
+    document_id: int
+    title: str
+    content: str
+
+
+class PassageCache:
+    def __init__(self, max_size: int = settings.passage_cache_size):
+        self._max_size = max_size
+        self._passages: OrderedDict[int, RetrievedPassage] = OrderedDict()
+        # Document id -> ids of its cached chunks, for invalidation.
+        self._chunk_ids: dict[int, set[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._passages)
+
+    def get_many(self, chunk_ids: list[int]) -> dict[int, RetrievedPassage]:
+        """Return the cached passages among ``chunk_ids``, marking them recently used."""
+        found: dict[int, RetrievedPassage] = {}
+        with self._lock:
+            for chunk_id in chunk_ids:
+                passage = self._passages.get(chunk_id)
+                if passage is not None:
+                    self._passages.move_to_end(chunk_id)
+                    found[chunk_id] = passage
+        return found
+
+    def put_many(self, passages: dict[int, RetrievedPassage]) -> None:
+        """Cache passages by chunk id, evicting the least recently used beyond ``max_size``."""
+        with self._lock:
+            for chunk_id, passage in passages.items():
+                self._passages[chunk_id] = passage
+                self._passages.move_to_end(chunk_id)
+                self._chunk_ids.setdefault(passage.document_id, set()).add(chunk_id)
+            while len(self._passages) > self._max_size:
+                chunk_id, passage = self._passages.popitem(last=False)
+                self._discard_chunk_id(passage.document_id, chunk_id)
+
+    def invalidate_document(self, document_id: int) -> None:
+        """Drop every cached passage of a document that was updated or deleted."""
+        with self._lock:
+            for chunk_id in self._chunk_ids.pop(document_id, set()):
+                self._passages.pop(chunk_id, None)
+
+    def _discard_chunk_id(self, document_id: int, chunk_id: int) -> None:
+        chunk_ids = self._chunk_ids.get(document_id)
+        if chunk_ids is None:
+            return
+        chunk_ids.discard(chunk_id)
+        if not chunk_ids:
+            del self._chunk_ids[document_id]
+
+
+@cache
+def get_passage_cache() -> PassageCache:
+    return PassageCache()
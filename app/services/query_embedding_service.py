@@ -0,0 +1,59 @@
+"""Request-scoped question embeddings backed by a bounded LRU memo.
+
+A single ``QueryEmbedding`` is created per question and handed to every
+component that needs the question vector (the answer cache and document
+retrieval), so each question is embedded at most once per request and repeat
+questions are served from the memo without a network call.
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+class QueryEmbedding:
+    """Lazily computed embedding of one question, shared for the duration of a request."""
+
+    def __init__(self, text: str, embed: Callable[[str], Awaitable[np.ndarray]]):
+        self.text = text
+        self._embed = embed
+        self._vector: np.ndarray | None = None
+
+    async def get_vector(self) -> np.ndarray:
+        """Return the question embedding as a float32 array of shape (1, dim)."""
+        if self._vector is None:
+            self._vector = await self._embed(self.text)
+        return self._vector
+
+
+class QueryEmbeddingService:
+    def __init__(self, batcher: EmbeddingBatcher, max_size: int = settings.query_embedding_memo_size):
+        self._batcher = batcher
+        self._max_size = max_size
+        self._memo: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def for_question(self, question: str) -> QueryEmbedding:
+        """Return a request-scoped embedding handle for ``question``."""
+        return QueryEmbedding(question, self._embed)
+
+    async def _embed(self, question: str) -> np.ndarray:
+        with self._lock:
+            vector = self._memo.get(question)
+            if vector is not None:
+                self._memo.move_to_end(question)
+                return vector
+
+        vector = (await self._batcher.embed(question)).reshape(1, -1)
+
+        with self._lock:
+            self._memo[question] = vector
+            self._memo.move_to_end(question)
+            while len(self._memo) > self._max_size:
+                self._memo.popitem(last=False)
+        return vector
@@ -0,0 +1,132 @@
+"""Single-flight coalescing of concurrent identical work.
+
+The first caller for a key runs the work; callers arriving while it is in
+flight await the same result instead of repeating it. A flight can also be
+joined by proximity: once a flight knows its query vector, it may wait on an
+earlier in-flight flight whose vector is similar enough.
+"""
+
+import asyncio
+import itertools
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+class LeaderCancelledError(Exception):
+    """The flight being followed was cancelled before producing a result."""
+
+
+@dataclass(eq=False)
+class Flight[T]:
+    """One in-flight unit of work and the future its followers await."""
+
+    key: str
+    seq: int
+    future: asyncio.Future[T]
+    vector: np.ndarray | None = field(default=None, repr=False)
+
+
+class SingleFlight[T]:
+    def __init__(self, similarity_threshold: float | None = None):
+        """
+        Args:
+            similarity_threshold: Minimum inner product between unit query vectors
+                for ``join_similar`` to coalesce two flights; None disables it
+        """
+        self._similarity_threshold = similarity_threshold
+        self._flights: dict[str, Flight[T]] = {}
+        self._seq = itertools.count()
+        self.coalesced = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def get(self, key: str) -> Flight[T] | None:
+        """Return the flight currently running for ``key``, if any."""
+        return self._flights.get(key)
+
+    async def run(self, key: str, work: Callable[[Flight[T]], Awaitable[T]]) -> T:
+        """Run ``work`` for ``key`` unless a flight for it is already running, then await that one.
+
+        Followers share the leader's result or exception. If the leader is
+        cancelled (e.g. its client disconnected), a waiting follower takes over.
+        """
+        finished = await self.join(key)
+        if finished is not None:
+            return finished.future.result()
+        with self.lead(key) as flight:
+            result = await work(flight)
+            flight.future.set_result(result)
+            return result
+
+    async def join(self, key: str) -> Flight[T] | None:
+        """Await the flight running for ``key`` and return it once finished; None if none is running.
+
+        A cancelled flight is skipped in favour of one started after it. The
+        returned flight's future holds the result, or raises the leader's exception.
+        """
+        while (flight := self._flights.get(key)) is not None:
+            self.coalesced += 1
+            # Unlike awaiting the future, wait() neither raises its exception nor cancels it with this caller.
+            await asyncio.wait([flight.future])
+            if not flight.future.cancelled():
+                return flight
+        return None
+
+    @contextmanager
+    def lead(self, key: str) -> Iterator[Flight[T]]:
+        """Register a flight for ``key`` for the duration of the block; call only when ``join`` returned None.
+
+        The block sets the flight's result, which is shared with followers as
+        soon as it is set. An exception from the block is shared instead; if the
+        block is cancelled or abandoned (e.g. a generator closed by a
+        disconnected client) before setting a result, a waiting follower takes over.
+        """
+        flight = Flight[T](key, next(self._seq), asyncio.get_running_loop().create_future())
+        # Mark exceptions as retrieved so a flight without followers does not log them.
+        flight.future.add_done_callback(lambda future: future.cancelled() or future.exception())
+        self._flights[key] = flight
+        try:
+            yield flight
+        except Exception as exc:
+            if not flight.future.done():
+                flight.future.set_exception(exc)
+            raise
+        finally:
+            # Left without a result, the flight is cancelled and a follower takes over.
+            flight.future.cancel()
+            del self._flights[key]
+
+    async def follow(self, leader: Flight[T]) -> T:
+        """Await another flight's result without cancelling it if this caller is cancelled.
+
+        Raises:
+            LeaderCancelledError: If the leader was cancelled
+        """
+        try:
+            return await asyncio.shield(leader.future)
+        except asyncio.CancelledError:
+            if leader.future.cancelled():
+                raise LeaderCancelledError from None
+            raise
+
+    def join_similar(self, flight: Flight[T], vector: np.ndarray) -> Flight[T] | None:
+        """Record ``flight``'s query vector and return an earlier flight with a similar one, if any.
+
+        Only flights that started earlier are considered, so two flights can
+        never end up waiting on each other.
+        """
+        flight.vector = vector.reshape(-1)
+        if self._similarity_threshold is None:
+            return None
+        for other in self._flights.values():
+            if other.seq >= flight.seq or other.vector is None:
+                continue
+            if float(np.dot(other.vector, flight.vector)) >= self._similarity_threshold:
+                self.coalesced += 1
+                return other
+        return None
@@ -1,8 +1,27 @@
-"""Medical document summarization service using Pydantic AI."""
+"""Medical document summarization service using Pydantic AI.
+
+Notes longer than ``summarize_long_note_words`` words are summarized
+map-reduce style: the note is split into section-aligned chunks (see
+``chunking_service``), every chunk is summarized concurrently, and a final
+pass combines the partial summaries. Latency is then bounded by the slowest
+chunk rather than the length of the whole note. At most
+``summarize_chunk_concurrency`` chunk calls run at once across the process.
+"""
+
+import asyncio
+import hashlib
+import re
+from collections.abc import AsyncIterable, AsyncIterator
+from functools import cache
 
 from pydantic_ai import Agent
 from pydantic_ai.models.fallback import FallbackModel
 
+from app.core.config import settings
+from app.schemas.summarization import BatchSummarizeItem
+from app.services.chunking_service import chunk_text
+from app.services.concurrency import ItemOutcome, map_bounded
+
 SYSTEM_PROMPT = """You are a medical document summarization assistant.
 Your task is to create concise, accurate summaries of medical notes and documents.
 
@@ -17,15 +36,132 @@ Guidelines:
 
 
 class SummarizationService:
+    MODELS = ("gateway/openai:gpt-5.1", "gateway/gemini:gemini-3.0-flash")
+
     def __init__(self):
-        fallback_model = FallbackModel("gateway/openai:gpt-5.1", "gateway/gemini:gemini-3.0-flash")
+        fallback_model = FallbackModel(*self.MODELS)
         self._agent = Agent(fallback_model, instructions=SYSTEM_PROMPT)
 
+    @property
+    def version(self) -> str:
+        """Identify the prompt and models, so stored summaries can be told apart when either changes."""
+        return hashlib.sha256("\0".join((SYSTEM_PROMPT, *self.MODELS)).encode("utf-8")).hexdigest()[:16]
+
     async def summarize(self, content: str) -> str:
-        user_prompt = f"Please summarize the following medical note:\n\n{content}"
-        result = await self._agent.run(user_prompt=user_prompt)
+        result = await self._agent.run(user_prompt=await self._get_prompt(content))
         return result.output
 
+    async def stream_summary(self, content: str) -> AsyncIterator[str]:
+        """Yield the summary as text deltas while the model generates it.
+
+        For a long note the chunk summaries are generated first, and only the
+        final combining pass is streamed.
+        """
+        async with self._agent.run_stream(user_prompt=await self._get_prompt(content)) as result:
+            async for delta in result.stream_text(delta=True, debounce_by=None):
+                yield delta
+
+    def summarize_many(
+        self, notes: AsyncIterable[BatchSummarizeItem | Exception]
+    ) -> AsyncIterator[ItemOutcome[BatchSummarizeItem, str]]:
+        """Summarize a batch of notes, yielding each outcome as soon as it completes.
+
+        At most ``summarize_batch_concurrency`` notes are summarized at once across
+        all concurrent batches in the process. A failed note is reported in its
+        outcome and does not stop the rest of the batch.
+        """
+        return map_bounded(notes, lambda note: self.summarize(note.content), get_summarize_batch_semaphore())
+
+    async def _get_prompt(self, content: str) -> str:
+        """Return the prompt for the final summary, summarizing the chunks of a long note first."""
+        if len(content.split()) <= settings.summarize_long_note_words:
+            return self._get_user_prompt(content)
+        chunks = chunk_text(
+            content, max_words=settings.summarize_chunk_words, overlap_words=settings.summarize_chunk_overlap_words
+        )
+        return await self._get_reduce_prompt(await self._summarize_chunks(chunks))
+
+    async def _summarize_chunks(self, chunks: list[str]) -> list[str]:
+        semaphore = get_summarize_chunk_semaphore()
+
+        async def summarize_chunk(i: int, chunk: str) -> str:
+            async with semaphore:
+                result = await self._agent.run(user_prompt=self._get_chunk_prompt(chunk, i, len(chunks)))
+            return result.output
+
+        return await asyncio.gather(*(summarize_chunk(i, chunk) for i, chunk in enumerate(chunks)))
+
+    async def _get_reduce_prompt(self, partial_summaries: list[str]) -> str:
+        # Very long records can leave too many partial summaries for one prompt; reduce them again,
+        # a bounded number of times, and truncate if that does not bring them under the limit.
+        for _ in range(settings.summarize_max_reduce_passes - 1):
+            if _word_count(self._combine(partial_summaries)) <= settings.summarize_long_note_words:
+                break
+            reduced = await self._summarize_chunks(_pack_words(partial_summaries, settings.summarize_chunk_words))
+            if _word_count(" ".join(reduced)) >= _word_count(" ".join(partial_summaries)):
+                break
+            partial_summaries = reduced
+        combined = self._combine(partial_summaries)
+        return (
+            "The following are summaries of consecutive parts of one long medical note. "
+            "Please combine them into a single summary of the whole note:\n\n"
+            f"{_truncate_words(combined, settings.summarize_long_note_words)}"
+        )
+
+    def _combine(self, partial_summaries: list[str]) -> str:
+        return "\n\n".join(f"Part {i}:\n{summary}" for i, summary in enumerate(partial_summaries, start=1))
+
+    def _get_user_prompt(self, content: str) -> str:
+        return f"Please summarize the following medical note:\n\n{content}"
+
+    def _get_chunk_prompt(self, chunk: str, index: int, total: int) -> str:
+        return (
+            f"Please summarize part {index + 1} of {total} of a long medical note. "
+            f"Other parts are summarized separately:\n\n{chunk}"
+        )
+
+
+def _word_count(text: str) -> int:
+    return len(text.split())
+
+
+def _pack_words(texts: list[str], max_words: int) -> list[str]:
+    """Join consecutive texts into windows of at most ``max_words`` words, chunking longer texts first.
+
+    Partial summaries are packed here rather than re-chunked as one text: their
+    ``Part N:`` labels read as section headings and would split every summary
+    into a chunk of its own.
+    """
+    windows: list[str] = []
+    current: list[str] = []
+    current_words = 0
+    for text in texts:
+        for piece in chunk_text(text, max_words=max_words, overlap_words=0):
+            words = _word_count(piece)
+            if current and current_words + words > max_words:
+                windows.append("\n\n".join(current))
+                current, current_words = [], 0
+            current.append(piece)
+            current_words += words
+    if current:
+        windows.append("\n\n".join(current))
+    return windows
+
+
+def _truncate_words(text: str, max_words: int) -> str:
+    words = list(re.finditer(r"\S+", text))
+    return text if len(words) <= max_words else text[: words[max_words - 1].end()]
+
+
+@cache
+def get_summarize_chunk_semaphore() -> asyncio.Semaphore:
+    return asyncio.Semaphore(settings.summarize_chunk_concurrency)
+
+
+@cache
+def get_summarize_batch_semaphore() -> asyncio.Semaphore:
+    return asyncio.Semaphore(settings.summarize_batch_concurrency)
+
 
 def get_summarization_service() -> SummarizationService:
     return SummarizationService()
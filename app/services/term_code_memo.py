@@ -0,0 +1,254 @@
+"""Process-wide memo of terms resolved to terminology codes.
+
+Notes mention the same conditions and drugs over and over, so whatever a code
+lookup returns for a normalized term is kept in ``term_codes`` and reused by
+later extractions: codes for terms already in the memo are given to the agent
+up front, and repeated calls of the code lookup tools in
+``term_code_memo_tools`` are answered from the memo without running the tool.
+Entries expire after ``term_code_memo_ttl_seconds`` so updated code sets are
+picked up, and at most ``term_code_memo_max_entries`` are held in memory, the
+least recently used being dropped first.
+"""
+
+import asyncio
+import json
+import re
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic_ai import RunContext
+from pydantic_ai.toolsets import ToolsetTool, WrapperToolset
+from pydantic_core import PydanticSerializationError, to_jsonable_python
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.singleton import SingletonMeta
+from app.db.session import AsyncSessionLocal
+from app.models.term_code import TermCode
+from app.schemas.terminology import TermCodeMemoStats
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+MemoKey = tuple[str, str]
+
+
+def normalize_term(term: str) -> str:
+    """Case-fold, replace punctuation with spaces and collapse whitespace."""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", term.casefold())).strip()
+
+
+def tool_call_term(tool_args: dict[str, Any]) -> str:
+    """Return a key for a tool call's arguments that does not depend on their order."""
+    return json.dumps(tool_args, sort_keys=True, default=str)
+
+
+@dataclass(slots=True)
+class MemoEntry:
+    """In-memory state of one memoized term; written through to its ``term_codes`` row."""
+
+    result: Any
+    created_at: float
+    hit_count: int = 0
+    last_hit_at: float | None = None
+
+
+class TermCodeMemo(metaclass=SingletonMeta):
+    def __init__(
+        self,
+        ttl_seconds: float | None = settings.term_code_memo_ttl_seconds,
+        max_entries: int = settings.term_code_memo_max_entries,
+    ):
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        # Loaded from the database on first use; least recently used first.
+        self._entries: OrderedDict[MemoKey, MemoEntry] | None = None
+        # Namespace -> most words in any of its terms, to bound the phrases find_in_text looks up.
+        self._max_term_words: dict[str, int] = {}
+        self._load_lock = asyncio.Lock()
+        # Entries whose hit statistics changed since they were last written to the database.
+        self._dirty: set[MemoKey] = set()
+        # Dirty entries dropped from memory, kept until their statistics are written.
+        self._evicted_dirty: dict[MemoKey, MemoEntry] = {}
+        self._hits = 0
+        self._misses = 0
+        self._expirations = 0
+
+    async def get(self, db: AsyncSession, namespace: str, term: str) -> Any | None:
+        """Return the memoized result for a term, or None if it is unknown or expired."""
+        entries = await self._load(db)
+        key = (namespace, normalize_term(term))
+        entry = entries.get(key)
+        if entry is not None and self._is_expired(entry, time.time()):
+            self._expirations += 1
+            del entries[key]
+            self._dirty.discard(key)
+            entry = None
+        if entry is None:
+            self._misses += 1
+            return None
+        self._record_hit(key, entry)
+        return entry.result
+
+    async def find_in_text(self, db: AsyncSession, text: str, namespaces: Iterable[str]) -> dict[MemoKey, Any]:
+        """Return the memoized results of every term in ``namespaces`` that occurs in ``text``.
+
+        Every phrase of the normalized text up to the longest memoized term of a namespace
+        is looked up, so the cost grows with the text rather than with the memo.
+        """
+        entries = await self._load(db)
+        words = normalize_term(text).split()
+        now = time.time()
+        found: dict[MemoKey, Any] = {}
+        for namespace in namespaces:
+            max_words = self._max_term_words.get(namespace, 0)
+            for start in range(len(words)):
+                for end in range(start + 1, min(start + max_words, len(words)) + 1):
+                    key = (namespace, " ".join(words[start:end]))
+                    entry = entries.get(key)
+                    if entry is not None and key not in found and not self._is_expired(entry, now):
+                        self._record_hit(key, entry)
+                        found[key] = entry.result
+        return found
+
+    async def put_many(self, db: AsyncSession, results: Iterable[tuple[str, str, Any]]) -> None:
+        """Memoize (namespace, term, result) triples, persisting pending hit statistics alongside."""
+        entries = await self._load(db)
+        now = time.time()
+        rows = [
+            {"namespace": namespace, "term": normalize_term(term), "result": json.dumps(result), "created_at": now}
+            for namespace, term, result in results
+        ]
+        if rows:
+            statement = insert(TermCode).values(rows)
+            await db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=["namespace", "term"],
+                    set_={
+                        "result": statement.excluded.result,
+                        "created_at": statement.excluded.created_at,
+                        "hit_count": 0,
+                        "last_hit_at": None,
+                    },
+                )
+            )
+        await self.flush(db)
+        for row in rows:
+            key = (row["namespace"], row["term"])
+            self._add(entries, key, MemoEntry(json.loads(row["result"]), now))
+            self._dirty.discard(key)
+        self._evict_over_capacity(entries)
+
+    async def flush(self, db: AsyncSession) -> None:
+        """Write hit statistics gathered since the last write and commit."""
+        # Other requests can hit or evict entries while this one awaits the database; only
+        # the statistics written here are cleared afterwards, the rest wait for the next write.
+        written: dict[MemoKey, int] = {}
+        if self._entries is not None:
+            dirty = [(key, self._entries.get(key) or self._evicted_dirty[key]) for key in self._dirty]
+            written = {key: e.hit_count for key, e in dirty}
+            if dirty:
+                await db.execute(
+                    update(TermCode),
+                    [
+                        {"namespace": namespace, "term": term, "hit_count": e.hit_count, "last_hit_at": e.last_hit_at}
+                        for (namespace, term), e in dirty
+                    ],
+                )
+        await db.commit()
+        for key, hit_count in written.items():
+            entry = (self._entries or {}).get(key) or self._evicted_dirty.get(key)
+            if entry is None or entry.hit_count == hit_count:
+                self._dirty.discard(key)
+                self._evicted_dirty.pop(key, None)
+
+    def stats(self) -> TermCodeMemoStats:
+        """Report memo size and hit/miss/expiration counters."""
+        lookups = self._hits + self._misses
+        return TermCodeMemoStats(
+            entries=len(self._entries or {}),
+            ttl_seconds=self._ttl_seconds,
+            hits=self._hits,
+            misses=self._misses,
+            hit_rate=self._hits / lookups if lookups else 0.0,
+            expirations=self._expirations,
+        )
+
+    async def _load(self, db: AsyncSession) -> OrderedDict[MemoKey, MemoEntry]:
+        async with self._load_lock:
+            if self._entries is None:
+                # The most recently used rows, oldest first.
+                last_used = func.coalesce(TermCode.last_hit_at, TermCode.created_at)
+                rows = (
+                    (await db.execute(select(TermCode).order_by(last_used.desc()).limit(self._max_entries)))
+                    .scalars()
+                    .all()
+                )
+                entries: OrderedDict[MemoKey, MemoEntry] = OrderedDict()
+                for row in reversed(rows):
+                    entry = MemoEntry(json.loads(row.result), row.created_at, row.hit_count, row.last_hit_at)
+                    self._add(entries, (row.namespace, row.term), entry)
+                self._entries = entries
+        return self._entries
+
+    def _add(self, entries: OrderedDict[MemoKey, MemoEntry], key: MemoKey, entry: MemoEntry) -> None:
+        entries[key] = entry
+        entries.move_to_end(key)
+        namespace, term = key
+        self._max_term_words[namespace] = max(self._max_term_words.get(namespace, 0), len(term.split()))
+
+    def _evict_over_capacity(self, entries: OrderedDict[MemoKey, MemoEntry]) -> None:
+        while len(entries) > self._max_entries:
+            key, entry = entries.popitem(last=False)
+            if key in self._dirty:
+                self._evicted_dirty[key] = entry
+
+    def _record_hit(self, key: MemoKey, entry: MemoEntry) -> None:
+        self._hits += 1
+        entry.hit_count += 1
+        entry.last_hit_at = time.time()
+        self._dirty.add(key)
+        if self._entries is not None:
+            self._entries.move_to_end(key)
+
+    def _is_expired(self, entry: MemoEntry, now: float) -> bool:
+        return self._ttl_seconds is not None and now - entry.created_at > self._ttl_seconds
+
+
+@dataclass
+class MemoizedToolset(WrapperToolset[Any]):
+    """Answers repeated calls of code lookup tools (by tool name and normalized arguments) from the term code memo.
+
+    Calls of other tools, such as literature or drug label searches, always run.
+    """
+
+    memo: TermCodeMemo
+    tool_names: frozenset[str] = frozenset(settings.term_code_memo_tools)
+
+    async def call_tool(
+        self, name: str, tool_args: dict[str, Any], ctx: RunContext[Any], tool: ToolsetTool[Any]
+    ) -> Any:
+        if name not in self.tool_names:
+            return await super().call_tool(name, tool_args, ctx, tool)
+        namespace, term = f"tool:{name}", tool_call_term(tool_args)
+        async with AsyncSessionLocal() as db:
+            cached = await self.memo.get(db, namespace, term)
+        if cached is not None:
+            return cached
+        result = await super().call_tool(name, tool_args, ctx, tool)
+        try:
+            jsonable = to_jsonable_python(result)
+        except PydanticSerializationError:
+            return result
+        async with AsyncSessionLocal() as db:
+            await self.memo.put_many(db, [(namespace, term, jsonable)])
+        return result
+
+
+def get_term_code_memo() -> TermCodeMemo:
+    return TermCodeMemo()
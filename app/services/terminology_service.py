@@ -0,0 +1,203 @@
+"""Local ICD-10-CM, ICD-10-PCS and RxNorm terminology.
+
+Code files published by CMS (``icd10cm_codes_YYYY.txt``,
+``icd10pcs_codes_YYYY.txt``) and the NLM (RxNorm's ``RXNCONSO.RRF``) are loaded
+into ``terminology_concepts`` with ``app.scripts.load_terminology`` and searched
+through SQLite FTS5, so codes can be looked up and validated without tool
+calls to external services.
+"""
+
+import itertools
+import re
+from collections.abc import Iterable, Iterator, Sequence
+
+from pydantic import BaseModel
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.singleton import SingletonMeta
+from app.models.terminology_concept import TERMINOLOGY_FTS_TABLE, TerminologyConcept
+from app.schemas.extract_structured import StructuredData
+from app.schemas.terminology import CodeLookup, CodeSystem, TerminologyMatch
+from app.services.document_service import fts_match_expression
+
+# RxNorm term types worth matching medication names against: ingredients, brand names and drugs.
+RXNORM_TERM_TYPES = frozenset({"IN", "PIN", "MIN", "BN", "SCD", "SBD", "SCDF", "SBDF"})
+
+# Code systems searched for each kind of extracted item, in order of preference.
+SYSTEMS_BY_KIND: dict[str, tuple[CodeSystem, ...]] = {
+    "condition": ("icd10cm",),
+    "diagnosis": ("icd10cm",),
+    "treatment": ("icd10pcs", "icd10cm"),
+    "medication": ("rxnorm",),
+}
+
+_LOAD_BATCH_SIZE = 5000
+
+
+def normalize_code(system: CodeSystem, code: str) -> str:
+    """Return ``code`` in the form it is stored in, e.g. ``e785`` -> ``E78.5`` for ICD-10-CM."""
+    code = code.strip().upper()
+    if system == "icd10cm":
+        code = code.replace(".", "")
+        return f"{code[:3]}.{code[3:]}" if len(code) > 3 else code
+    return code
+
+
+def normalize_display(text: str) -> str:
+    """Case-fold, drop punctuation and collapse whitespace, for comparing names to concept descriptions."""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.casefold()).split())
+
+
+def parse_icd10_codes(lines: Iterable[str]) -> Iterator[tuple[str, str]]:
+    """Parse a CMS ICD-10-CM or ICD-10-PCS code file: one code, whitespace and a description per line."""
+    for line in lines:
+        code, _, display = line.strip().partition(" ")
+        if code and display.strip():
+            yield code, display.strip()
+
+
+def parse_rxnconso(lines: Iterable[str]) -> Iterator[tuple[str, str]]:
+    """Parse RxNorm's RXNCONSO.RRF, keeping one current English name per RxCUI of ``RXNORM_TERM_TYPES``."""
+    seen: set[str] = set()
+    for line in lines:
+        fields = line.split("|")
+        if len(fields) < 17:
+            continue
+        rxcui, language, source, term_type, name, suppress = (fields[i] for i in (0, 1, 11, 12, 14, 16))
+        if language != "ENG" or source != "RXNORM" or term_type not in RXNORM_TERM_TYPES or suppress != "N":
+            continue
+        if rxcui not in seen:
+            seen.add(rxcui)
+            yield rxcui, name
+
+
+def load_concepts(db: Session, system: CodeSystem, concepts: Iterable[tuple[str, str]]) -> int:
+    """Replace every stored concept of ``system`` with ``concepts``. The caller commits.
+
+    Returns:
+        The number of concepts loaded
+    """
+    db.execute(delete(TerminologyConcept).where(TerminologyConcept.system == system))
+    count = 0
+    for batch in itertools.batched(concepts, _LOAD_BATCH_SIZE):
+        db.execute(
+            insert(TerminologyConcept),
+            [{"system": system, "code": normalize_code(system, code), "display": display} for code, display in batch],
+        )
+        count += len(batch)
+    return count
+
+
+class TerminologyService(metaclass=SingletonMeta):
+    async def loaded_systems(self, db: AsyncSession) -> set[CodeSystem]:
+        """Return the code systems that have been loaded."""
+        systems: set[CodeSystem] = set()
+        for system in ("icd10cm", "icd10pcs", "rxnorm"):
+            query = select(TerminologyConcept.id).where(TerminologyConcept.system == system).limit(1)
+            if (await db.execute(query)).first() is not None:
+                systems.add(system)
+        return systems
+
+    async def search(
+        self,
+        db: AsyncSession,
+        term: str,
+        systems: Sequence[CodeSystem],
+        limit: int = settings.terminology_search_limit,
+    ) -> list[TerminologyMatch]:
+        """Rank concepts of ``systems`` whose description matches ``term``, best first."""
+        match = fts_match_expression(term)
+        if match is None or not systems:
+            return []
+        system_filter = " OR ".join(f'"{system}"' for system in systems)
+        # Weight the system column zero so it only filters and does not affect ranking.
+        rank = f"bm25({TERMINOLOGY_FTS_TABLE}, 0.0, 1.0)"
+        result = await db.execute(
+            text(
+                f"SELECT c.system, c.code, c.display FROM {TERMINOLOGY_FTS_TABLE} "
+                f"JOIN terminology_concepts c ON c.id = {TERMINOLOGY_FTS_TABLE}.rowid "
+                f"WHERE {TERMINOLOGY_FTS_TABLE} MATCH :match ORDER BY {rank} LIMIT :limit"
+            ),
+            {"match": f"({match}) AND system : ({system_filter})", "limit": limit},
+        )
+        return [TerminologyMatch(system=system, code=code, display=display) for system, code, display in result.all()]
+
+    async def lookup(self, db: AsyncSession, lookups: list[CodeLookup]) -> list[list[TerminologyMatch]]:
+        """Return candidate codes for each term, searching the code systems for its kind."""
+        return [await self.search(db, lookup.term, SYSTEMS_BY_KIND[lookup.kind]) for lookup in lookups]
+
+    async def get(self, db: AsyncSession, system: CodeSystem, code: str) -> TerminologyMatch | None:
+        concept = (
+            await db.execute(
+                select(TerminologyConcept).where(
+                    TerminologyConcept.system == system, TerminologyConcept.code == normalize_code(system, code)
+                )
+            )
+        ).scalar_one_or_none()
+        if concept is None:
+            return None
+        return TerminologyMatch(system=system, code=concept.code, display=concept.display)
+
+    async def resolve_code(self, db: AsyncSession, name: str, code: str, systems: Sequence[CodeSystem]) -> str | None:
+        """Validate ``code`` against ``systems``, falling back to a concept described exactly as ``name``.
+
+        Names are compared case-insensitively and ignoring punctuation and spacing. A merely
+        similar description is never accepted, so a wrong code is not silently substituted.
+
+        Returns:
+            The code in normalized form if it exists, otherwise the code of the concept
+            whose description is ``name``, otherwise None
+        """
+        if code.strip():
+            for system in systems:
+                if (concept := await self.get(db, system, code)) is not None:
+                    return concept.code
+        normalized_name = normalize_display(name)
+        for match in await self.search(db, name, systems):
+            if normalize_display(match.display) == normalized_name:
+                return match.code
+        return None
+
+    async def resolve_structured_data(self, db: AsyncSession, data: StructuredData) -> StructuredData:
+        """Validate the codes of extracted items against the loaded code systems, correcting unknown ones.
+
+        An unknown code is replaced only by the code of a concept described exactly as the item;
+        otherwise it is kept and logged as unverified. Items whose code systems have not been
+        loaded are left unchanged.
+        """
+        loaded = await self.loaded_systems(db)
+
+        def systems(kind: str) -> tuple[CodeSystem, ...]:
+            return tuple(system for system in SYSTEMS_BY_KIND[kind] if system in loaded)
+
+        return data.model_copy(
+            update={
+                "conditions": await self._resolve_items(db, data.conditions, "icd_code", systems("condition")),
+                "diagnoses": await self._resolve_items(db, data.diagnoses, "icd_code", systems("diagnosis")),
+                "treatments": await self._resolve_items(db, data.treatments, "icd_code", systems("treatment")),
+                "medications": await self._resolve_items(db, data.medications, "rx_norm_code", systems("medication")),
+            }
+        )
+
+    async def _resolve_items[T: BaseModel](
+        self, db: AsyncSession, items: list[T], code_field: str, systems: tuple[CodeSystem, ...]
+    ) -> list[T]:
+        if not systems:
+            return items
+        resolved: list[T] = []
+        for item in items:
+            extracted = getattr(item, code_field)
+            code = await self.resolve_code(db, item.name, extracted, systems)
+            if code is None:
+                # Kept as extracted: better an unverified code than a confidently wrong one.
+                print(f"Unverified code {extracted!r} for {item.name!r}: not found in {', '.join(systems)}")
+                code = extracted
+            resolved.append(item.model_copy(update={code_field: code}))
+        return resolved
+
+
+def get_terminology_service() -> TerminologyService:
+    return TerminologyService()
@@ -0,0 +1,235 @@
+"""Factory and wrapper for the FAISS indexes used by retrieval and the answer cache.
+
+Supported index kinds:
+
+- ``flat``: exact inner-product scan, O(N·d) per query.
+- ``ivf_flat``: inverted lists over a k-means coarse quantizer; probes ``nprobe`` lists.
+- ``ivf_pq``: as ``ivf_flat`` with product-quantized vectors, for corpora too large for RAM.
+- ``hnsw``: graph index searched with ``efSearch`` candidates. FAISS cannot remove
+  vectors from HNSW, so removed ids are tombstoned and filtered out of results, and
+  the graph is rebuilt from the live vectors once tombstones exceed
+  ``vector_index_hnsw_max_tombstone_ratio`` of it, or when a tombstoned id is added again.
+
+``auto`` picks a kind from the corpus size. IVF kinds are trained on a random
+sample of the vectors they are built from.
+"""
+
+import math
+from pathlib import Path
+from typing import Literal
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+
+IndexKind = Literal["auto", "flat", "ivf_flat", "ivf_pq", "hnsw"]
+
+# Corpus sizes at which ``auto`` switches to approximate indexes.
+IVF_FLAT_MIN_VECTORS = 50_000
+IVF_PQ_MIN_VECTORS = 500_000
+# FAISS k-means wants at least this many training points per centroid.
+MIN_TRAINING_POINTS_PER_LIST = 39
+# 8-bit PQ codebooks have 256 centroids per sub-quantizer.
+MIN_PQ_TRAINING_POINTS = 256
+# HNSW searches fetch at most this many times k results to make up for tombstoned ones.
+MAX_TOMBSTONE_OVERFETCH = 4
+
+
+def select_index_kind(n_vectors: int) -> IndexKind:
+    """Pick an index kind for a corpus of ``n_vectors``."""
+    if n_vectors >= IVF_PQ_MIN_VECTORS:
+        return "ivf_pq"
+    if n_vectors >= IVF_FLAT_MIN_VECTORS:
+        return "ivf_flat"
+    return "flat"
+
+
+def default_nlist(n_vectors: int) -> int:
+    """Number of IVF lists for ``n_vectors`` (~4·sqrt(N), capped so every list can be trained)."""
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // MIN_TRAINING_POINTS_PER_LIST))
+
+
+def default_pq_m(dimension: int) -> int:
+    """Largest number of PQ sub-quantizers (at most 64) that divides ``dimension``."""
+    return next(m for m in range(min(64, dimension), 0, -1) if dimension % m == 0)
+
+
+class VectorIndex:
+    """ID-mapped FAISS index with the same add/remove/search API for every index kind."""
+
+    def __init__(
+        self,
+        index: faiss.IndexIDMap,
+        kind: IndexKind,
+        mmap_path: Path | None = None,
+        max_tombstone_ratio: float = settings.vector_index_hnsw_max_tombstone_ratio,
+    ):
+        self.index = index
+        self.kind = kind
+        self._supports_remove = kind != "hnsw"
+        self._tombstones: set[int] = set()
+        self._max_tombstone_ratio = max_tombstone_ratio
+        # Set while the index is a read-only memory map of a snapshot file.
+        self._mmap_path = mmap_path
+
+    @property
+    def ntotal(self) -> int:
+        return int(self.index.ntotal) - len(self._tombstones)
+
+    @property
+    def tombstones(self) -> set[int]:
+        return set(self._tombstones)
+
+    def ids(self) -> np.ndarray:
+        """Return every id stored in the index, including tombstoned ones."""
+        return faiss.vector_to_array(self.index.id_map)
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        if len(ids) == 0:
+            return
+        self._ensure_writable()
+        if not self._tombstones.isdisjoint(int(i) for i in ids):
+            # The stale vector of a re-added id is still in the graph; drop it before adding the new one.
+            self._rebuild_without_tombstones()
+        self.index.add_with_ids(vectors, ids)  # type: ignore[arg-type]
+
+    def remove(self, ids: np.ndarray) -> None:
+        if len(ids) == 0:
+            return
+        if self._supports_remove:
+            self._ensure_writable()
+            self.index.remove_ids(ids)  # type: ignore[arg-type]
+        else:
+            self._tombstones.update(int(i) for i in ids)
+            if len(self._tombstones) > self._max_tombstone_ratio * self.index.ntotal:
+                self._rebuild_without_tombstones()
+
+    def serialize(self) -> np.ndarray:
+        """Serialize the index to a byte array for ``IndexSnapshot.save``."""
+        return faiss.serialize_index(self.index)
+
+    def _ensure_writable(self) -> None:
+        """Load a memory-mapped IVF index into RAM before its first write.
+
+        Flat and HNSW storage is copied on write by FAISS itself, but memory-mapped
+        inverted lists reject every add and remove.
+        """
+        if self._mmap_path is None:
+            return
+        if self.kind in ("ivf_flat", "ivf_pq"):
+            base = faiss.downcast_index(self.index.index)
+            nprobe = base.nprobe if isinstance(base, faiss.IndexIVF) else None
+            loaded = faiss.read_index(str(self._mmap_path))
+            assert isinstance(loaded, faiss.IndexIDMap)
+            self.index = loaded
+            self.set_search_params(nprobe=nprobe)
+        self._mmap_path = None
+
+    def _rebuild_without_tombstones(self) -> None:
+        """Rebuild an HNSW graph from its live vectors, dropping every tombstoned one."""
+        base = faiss.downcast_index(self.index.index)
+        assert isinstance(base, faiss.IndexHNSWFlat)
+        ids = self.ids()
+        live = np.array([int(i) not in self._tombstones for i in ids], dtype=bool)
+        vectors = base.reconstruct_n(0, base.ntotal)[live]
+
+        rebuilt = faiss.IndexHNSWFlat(base.d, base.hnsw.nb_neighbors(1), base.metric_type)
+        rebuilt.hnsw.efConstruction = base.hnsw.efConstruction
+        rebuilt.hnsw.efSearch = base.hnsw.efSearch
+        index = faiss.IndexIDMap(rebuilt)
+        index.add_with_ids(vectors, ids[live])  # type: ignore[arg-type]
+        print(f"Rebuilt HNSW index without {len(self._tombstones)} removed vector(s): {index.ntotal} remain")
+        self.index = index
+        self._tombstones.clear()
+        self._mmap_path = None
+
+    def search(self, query_vectors: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return (similarities, ids) arrays of shape (n_queries, k), padded with id -1."""
+        fetch_k = min(k + len(self._tombstones), k * MAX_TOMBSTONE_OVERFETCH)
+        similarities, ids = self.index.search(query_vectors, k=fetch_k)  # type: ignore[reportUnknownMemberType]
+        if not self._tombstones:
+            return similarities, ids
+
+        out_similarities = np.full((len(ids), k), -np.inf, dtype=np.float32)
+        out_ids = np.full((len(ids), k), -1, dtype=np.int64)
+        for row in range(len(ids)):
+            kept = [col for col in range(fetch_k) if int(ids[row][col]) not in self._tombstones][:k]
+            out_similarities[row, : len(kept)] = similarities[row][kept]
+            out_ids[row, : len(kept)] = ids[row][kept]
+        return out_similarities, out_ids
+
+    def set_search_params(self, nprobe: int | None = None, ef_search: int | None = None) -> None:
+        """Tune the recall/latency trade-off of approximate indexes."""
+        base = faiss.downcast_index(self.index.index)
+        if nprobe is not None and isinstance(base, faiss.IndexIVF):
+            base.nprobe = nprobe
+        if ef_search is not None and isinstance(base, faiss.IndexHNSW):
+            base.hnsw.efSearch = ef_search
+
+
+def create_vector_index(
+    dimension: int,
+    kind: IndexKind = "flat",
+    training_vectors: np.ndarray | None = None,
+    nlist: int | None = None,
+    pq_m: int | None = None,
+    hnsw_m: int = settings.vector_index_hnsw_m,
+    nprobe: int = settings.vector_index_nprobe,
+    ef_search: int = settings.vector_index_ef_search,
+    training_sample_size: int = settings.vector_index_training_sample_size,
+) -> VectorIndex:
+    """Return an empty ID-mapped inner-product index for vectors of ``dimension``.
+
+    Vectors from every ``Embedder`` are unit-normalized, so inner product is
+    cosine similarity.
+
+    Args:
+        dimension: Vector dimension
+        kind: Index kind; ``auto`` selects one from ``len(training_vectors)``
+        training_vectors: Vectors the index will be built from; IVF kinds are
+            trained on a random sample of at most ``training_sample_size`` of them
+        nlist: Number of IVF lists; defaults to ``default_nlist``
+        pq_m: Number of PQ sub-quantizers; defaults to ``default_pq_m``
+        hnsw_m: Graph degree for HNSW
+        nprobe: IVF lists probed per query
+        ef_search: HNSW candidate list size per query
+        training_sample_size: Maximum number of vectors used for IVF training
+
+    Returns:
+        A VectorIndex; IVF kinds fall back to ``flat`` when there are too few
+        vectors to train them
+    """
+    n_vectors = 0 if training_vectors is None else len(training_vectors)
+    if kind == "auto":
+        kind = select_index_kind(n_vectors)
+
+    if kind in ("ivf_flat", "ivf_pq"):
+        nlist = nlist or default_nlist(n_vectors)
+        min_training_points = nlist * MIN_TRAINING_POINTS_PER_LIST
+        if kind == "ivf_pq":
+            min_training_points = max(min_training_points, MIN_PQ_TRAINING_POINTS)
+        if training_vectors is None or n_vectors < min_training_points:
+            print(f"Too few vectors ({n_vectors}) to train a {kind} index with {nlist} lists; using flat")
+            kind = "flat"
+
+    metric = faiss.METRIC_INNER_PRODUCT
+    if kind in ("ivf_flat", "ivf_pq"):
+        assert training_vectors is not None and nlist is not None
+        quantizer = faiss.IndexFlatIP(dimension)
+        if kind == "ivf_flat":
+            base: faiss.Index = faiss.IndexIVFFlat(quantizer, dimension, nlist, metric)
+        else:
+            base = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m or default_pq_m(dimension), 8, metric)
+        rng = np.random.default_rng(0)
+        sample_size = min(n_vectors, training_sample_size)
+        sample = training_vectors[rng.choice(n_vectors, size=sample_size, replace=False)]
+        base.train(sample)  # type: ignore[arg-type]
+    elif kind == "hnsw":
+        base = faiss.IndexHNSWFlat(dimension, hnsw_m, metric)
+    else:
+        base = faiss.IndexFlatIP(dimension)
+
+    index = VectorIndex(faiss.IndexIDMap(base), kind)
+    index.set_search_params(nprobe=nprobe, ef_search=ef_search)
+    return index
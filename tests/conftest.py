@@ -1,19 +1,30 @@
 import os
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Callable, Iterator
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock
 
 import pytest
 import pytest_asyncio
 from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.orm import sessionmaker
 
+from app.core.singleton import SingletonMeta
 from app.db.session import get_db
 from app.main import app
 from app.models.document import Base
+from app.services import document_index_service
+from app.services.document_index_service import DocumentIndexService
+from app.services.document_summary_service import DocumentSummaryService, get_document_summary_service
+from app.services.index_snapshot import IndexSnapshot
+from tests.helpers import FakeEmbedder
 
 TEST_DB_URL = "sqlite+aiosqlite:///./data/test.db"
 
@@ -50,6 +61,8 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
         yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    # Document writes schedule summaries in the background; keep them away from the LLM.
+    app.dependency_overrides[get_document_summary_service] = lambda: AsyncMock(spec=DocumentSummaryService)
 
     transport = ASGITransport(app=app)  # type: ignore
     async with AsyncClient(transport=transport, base_url="http://testserver") as ac:
@@ -58,6 +71,40 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
     app.dependency_overrides.clear()
 
 
+@pytest.fixture
+def new_singleton() -> Iterator[Callable[..., Any]]:
+    """Construct singletons afresh with test arguments; the process-wide instances are restored afterwards.
+
+    The new instance is registered as the singleton, so code under test that calls the
+    service's getter sees it too.
+    """
+    saved = dict(SingletonMeta._instances)
+
+    def construct[T](cls: type[T], *args: Any, **kwargs: Any) -> T:
+        SingletonMeta._instances.pop(cls, None)
+        return cls(*args, **kwargs)
+
+    yield construct
+    SingletonMeta._instances.clear()
+    SingletonMeta._instances.update(saved)
+
+
+@pytest.fixture
+def document_index(
+    test_engine: AsyncEngine, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, new_singleton: Callable[..., Any]
+) -> DocumentIndexService:
+    """A built document index over the test database, with a fake embedder and a temporary snapshot directory."""
+    engine = create_engine(TEST_DB_URL.replace("+aiosqlite", ""))
+    monkeypatch.setattr(document_index_service, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(document_index_service, "get_embedder", lambda: FakeEmbedder())
+    monkeypatch.setattr(
+        document_index_service, "IndexSnapshot", lambda name: IndexSnapshot(name, directory=tmp_path / "snap")
+    )
+    service = new_singleton(DocumentIndexService)
+    service.build()
+    return service
+
+
 @pytest.fixture
 def medical_note() -> str:
     note = """
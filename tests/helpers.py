@@ -0,0 +1,22 @@
+"""Test doubles shared by several test modules."""
+
+import numpy as np
+
+from app.services.embedders import Embedder
+
+
+class FakeEmbedder(Embedder):
+    def __init__(self, model_name: str = "test-model") -> None:
+        self.model_name = model_name
+        self.calls: list[list[str]] = []
+
+    @property
+    def dimension(self) -> int:
+        return 3
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        self.calls.append(texts)
+        return np.array([[float(len(text)), 1.0, 0.0] for text in texts], dtype="float32")
+
+    async def aembed(self, texts: list[str]) -> np.ndarray:
+        return self.embed(texts)
@@ -0,0 +1,144 @@
+import shutil
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pytest
+from sqlalchemy import Engine, create_engine, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.models.document import Base
+from app.models.question_answer import QuestionAnswer
+from app.services import answer_question_cache_service
+from app.services.answer_question_cache_service import (
+    AnswerQuestionCacheService,
+    CacheEntry,
+    normalize_question,
+    question_hash,
+    select_evictions,
+)
+from app.services.index_snapshot import IndexSnapshot
+from app.services.query_embedding_service import QueryEmbedding
+from tests.helpers import FakeEmbedder
+
+
+def test_normalize_question_ignores_case_punctuation_and_whitespace() -> None:
+    assert normalize_question("  What is  CROHN'S disease?\n") == "what is crohns disease"
+
+
+def test_question_hash_matches_trivially_different_phrasings() -> None:
+    assert question_hash("What is Crohn's disease?") == question_hash("what is crohns   disease")
+    assert question_hash("What is Crohn's disease?") != question_hash("What is ulcerative colitis?")
+
+
+def _entries() -> dict[int, CacheEntry]:
+    return {
+        1: CacheEntry("a", "A", created_at=100.0, hit_count=5, last_hit_at=110.0),
+        2: CacheEntry("b", "B", created_at=105.0, hit_count=0),
+        3: CacheEntry("c", "C", created_at=101.0, hit_count=1, last_hit_at=120.0),
+    }
+
+
+def test_lru_evicts_least_recently_used_entries() -> None:
+    assert select_evictions(_entries(), 2, "lru") == [2, 1]
+
+
+def test_lfu_evicts_least_frequently_used_entries() -> None:
+    assert select_evictions(_entries(), 2, "lfu") == [2, 3]
+
+
+def test_select_evictions_is_empty_within_capacity() -> None:
+    assert select_evictions(_entries(), 0, "lru") == []
+    assert select_evictions(_entries(), -3, "lfu") == []
+
+
+@pytest.fixture
+def cache_env(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> tuple[Engine, FakeEmbedder]:
+    """Point the cache service at a temporary database, snapshot directory and fake embedder."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+    Base.metadata.create_all(engine)
+    embedder = FakeEmbedder()
+    monkeypatch.setattr(answer_question_cache_service, "sync_engine", engine)
+    monkeypatch.setattr(answer_question_cache_service, "get_embedder", lambda: embedder)
+    monkeypatch.setattr(
+        answer_question_cache_service, "IndexSnapshot", lambda name: IndexSnapshot(name, directory=tmp_path / "snap")
+    )
+    return engine, embedder
+
+
+def test_cache_warms_from_stored_question_vectors_without_embedding(
+    tmp_path: Path, cache_env: tuple[Engine, FakeEmbedder], new_singleton: Callable[..., Any]
+) -> None:
+    engine, embedder = cache_env
+    with Session(engine) as session:
+        session.execute(
+            insert(QuestionAnswer),
+            [{"question": f"Question {i}?", "answer": f"Answer {i}"} for i in range(5)],
+        )
+        session.commit()
+
+    # Legacy rows without a stored vector are embedded once and their vectors persisted.
+    assert new_singleton(AnswerQuestionCacheService).stats().entries == 5
+    assert len(embedder.calls) == 1
+
+    shutil.rmtree(tmp_path / "snap")
+    service = new_singleton(AnswerQuestionCacheService)
+
+    assert service._index.ntotal == 5
+    assert len(embedder.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_semantic_hit_is_served_from_memory(
+    cache_env: tuple[Engine, FakeEmbedder], monkeypatch: pytest.MonkeyPatch, new_singleton: Callable[..., Any]
+) -> None:
+    engine, embedder = cache_env
+    with Session(engine) as session:
+        session.execute(insert(QuestionAnswer), [{"question": "What is IBS?", "answer": "A functional disorder."}])
+        session.commit()
+    service = new_singleton(AnswerQuestionCacheService)
+    # Any database access on the hit path would now fail.
+    monkeypatch.setattr(answer_question_cache_service, "sync_engine", create_engine("sqlite:////nonexistent/cache.db"))
+
+    async def embed(text: str) -> np.ndarray:
+        return embedder.embed([text])
+
+    # The fake embedder maps texts of equal length to the same vector.
+    answer = await service.get_answer(QueryEmbedding("Define: IBS?", embed))
+
+    assert answer == "A functional disorder."
+    assert service.stats().semantic_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_evictions_and_hits_during_a_write_are_kept_for_the_next_one(
+    tmp_path: Path, cache_env: tuple[Engine, FakeEmbedder], new_singleton: Callable[..., Any]
+) -> None:
+    engine, embedder = cache_env
+    with Session(engine) as session:
+        session.execute(insert(QuestionAnswer), [{"question": "What is IBS?", "answer": "A functional disorder."}])
+        session.commit()
+    service = new_singleton(AnswerQuestionCacheService)
+    hit_id = next(iter(service._entries))
+
+    async def embed(text: str) -> np.ndarray:
+        return embedder.embed([text])
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'cache.db'}")
+    async with AsyncSession(async_engine, expire_on_commit=False) as db:
+        commit = db.commit
+
+        async def commit_while_other_requests_run() -> None:
+            # Another request evicts an entry and hits one while this write is committing.
+            service._pending_deletes.add(999)
+            service._record_hit(hit_id)
+            await commit()
+
+        db.commit = commit_while_other_requests_run  # type: ignore[method-assign]
+        await service.set_answer(QueryEmbedding("What is GERD?", embed), "Acid reflux.", db)
+    await async_engine.dispose()
+
+    assert service._pending_deletes == {999}
+    assert service._dirty_ids == {hit_id}
@@ -1,8 +1,24 @@
+import asyncio
+from collections.abc import AsyncIterator
+from typing import Any
+from unittest.mock import AsyncMock
+
 import pytest
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelMessage, ModelResponse, TextPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.fixtures import load_fixtures
-from app.services.answer_question_service import get_answer_question_service
+from app.schemas.streaming import TextDelta
+from app.services.answer_question_cache_service import AnswerQuestionCacheService
+from app.services.answer_question_service import (
+    AnswerQuestionService,
+    get_answer_question_service,
+    reciprocal_rank_fusion,
+)
+from app.services.query_embedding_service import QueryEmbedding
+from app.services.single_flight import SingleFlight
 
 
 @pytest.mark.asyncio
@@ -32,3 +48,83 @@ async def test_answer_question_cache_hit(db_session: AsyncSession) -> None:
         question="What is the difference between Crohn's disease and ulcerative colitis?", db=db_session
     )
     assert cached_answer == answer
+
+
+def test_reciprocal_rank_fusion_prefers_ids_ranked_by_both_retrievers() -> None:
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 4, 1]], k=60)
+
+    assert fused[:2] == [1, 3]
+    assert set(fused) == {1, 2, 3, 4}
+
+
+def streaming_service(release: asyncio.Event) -> tuple[AnswerQuestionService, list[str]]:
+    """A service without cached answers whose model answers "Crohn's disease", streaming its end once ``release`` is set."""
+    prompts: list[str] = []
+
+    async def stream(messages: list[ModelMessage], info: AgentInfo) -> AsyncIterator[str]:
+        prompts.append(str(messages))
+        yield "Crohn's "
+        await release.wait()
+        yield "disease"
+
+    def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        prompts.append(str(messages))
+        return ModelResponse(parts=[TextPart("Crohn's disease")])
+
+    async def embed(text: str) -> Any:
+        raise AssertionError("no similarity coalescing configured")
+
+    service = object.__new__(AnswerQuestionService)
+    service._flights = SingleFlight[str]()
+    service._agent = Agent(FunctionModel(respond, stream_function=stream))
+    service._query_embeddings = AsyncMock(for_question=lambda question: QueryEmbedding(question, embed))
+    service._cache_service = AsyncMock(spec=AnswerQuestionCacheService)
+    service._cache_service.get_answer.return_value = None
+    service._retrieve_passages = AsyncMock(return_value=[])  # type: ignore[method-assign]
+    return service, prompts
+
+
+@pytest.mark.asyncio
+async def test_requests_arriving_during_a_stream_receive_the_streamed_answer() -> None:
+    release = asyncio.Event()
+    service, prompts = streaming_service(release)
+    stream = service.stream_answer("What is Crohn's disease?", db=AsyncMock())
+
+    assert await anext(stream) == TextDelta(delta="Crohn's ")
+    follower = asyncio.create_task(service.answer_question("what is crohn's disease", db=AsyncMock()))
+    streamed_follower = asyncio.create_task(anext(service.stream_answer("What is Crohn's disease?", db=AsyncMock())))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert [delta async for delta in stream] == [TextDelta(delta="disease")]
+    assert await follower == "Crohn's disease"
+    assert await streamed_follower == TextDelta(delta="Crohn's disease")
+    assert len(prompts) == 1
+    assert service._flights.coalesced == 2
+    service._cache_service.set_answer.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_a_request_waiting_on_a_cancelled_stream_takes_over() -> None:
+    release = asyncio.Event()
+    release.set()
+    service, prompts = streaming_service(release)
+    retrieving = asyncio.Event()
+
+    async def retrieve_passages(query: QueryEmbedding, db: AsyncSession) -> list[Any]:
+        if not retrieving.is_set():
+            retrieving.set()
+            await asyncio.Event().wait()
+        return []
+
+    service._retrieve_passages = retrieve_passages  # type: ignore[method-assign]
+    stream = asyncio.create_task(anext(service.stream_answer("What is Crohn's disease?", db=AsyncMock())))
+    await retrieving.wait()
+    follower = asyncio.create_task(service.answer_question("What is Crohn's disease?", db=AsyncMock()))
+    await asyncio.sleep(0)
+    stream.cancel()
+
+    assert await follower == "Crohn's disease"
+    assert len(prompts) == 1
+    assert service._flights.in_flight == 0
+    service._cache_service.set_answer.assert_awaited_once()
@@ -1,10 +1,24 @@
-from unittest.mock import AsyncMock
+import json
+from collections.abc import AsyncIterator
+from unittest.mock import AsyncMock, Mock
 
 import pytest
 from httpx import AsyncClient
 
 from app.main import app
+from app.schemas.answer_question import AnswerCacheStats
+from app.schemas.extract_structured import StructuredData
+from app.schemas.streaming import TextDelta
+from app.services.answer_question_cache_service import (
+    AnswerQuestionCacheService,
+    get_answer_question_cache_service,
+)
 from app.services.answer_question_service import AnswerQuestionService, get_answer_question_service
+from app.services.document_index_service import DocumentIndexService, get_document_index_service
+from app.services.document_summary_service import DocumentSummaryService, get_document_summary_service
+from app.services.extract_structured_service import ExtractStructuredService, get_extract_structured_service
+from app.services.fhir_conversion_service import FHIRConversionService
+from app.services.note_to_fhir_service import NoteToFHIRService, get_note_to_fhir_service
 from app.services.summarization_service import SummarizationService, get_summarization_service
 
 
@@ -96,3 +110,227 @@ async def test_answer_question_success(client: AsyncClient) -> None:
     )
     assert response.status_code == 200
     assert response.json()["answer"] == mock_answer
+
+
+@pytest.mark.asyncio
+async def test_update_and_delete_document(client: AsyncClient) -> None:
+    create_response = await client.post("/documents", json={"title": "Draft", "content": "Initial content"})
+    document_id = create_response.json()["id"]
+
+    update_response = await client.put(
+        f"/documents/{document_id}", json={"title": "Final", "content": "Revised content"}
+    )
+    assert update_response.status_code == 200
+    assert update_response.json()["title"] == "Final"
+    assert update_response.json()["content"] == "Revised content"
+
+    delete_response = await client.delete(f"/documents/{document_id}")
+    assert delete_response.status_code == 204
+
+    list_response = await client.get("/documents")
+    assert document_id not in list_response.json()
+
+
+@pytest.mark.asyncio
+async def test_update_and_delete_missing_document(client: AsyncClient) -> None:
+    update_response = await client.put("/documents/999999", json={"title": "title", "content": "content"})
+    assert update_response.status_code == 404
+
+    delete_response = await client.delete("/documents/999999")
+    assert delete_response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_written_document_is_indexed_with_no_pending_ingests(
+    client: AsyncClient, document_index: DocumentIndexService
+) -> None:
+    app.dependency_overrides[get_document_index_service] = lambda: document_index
+    indexed_before = document_index.status().indexed_count
+
+    created = await client.post("/documents", json={"title": "Indexed", "content": "Indexed content"})
+
+    response = await client.get("/index_status")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["built"]
+    assert body["indexed_count"] == indexed_before + 1
+    assert created.json()["id"] in document_index._chunk_ids
+    assert body["pending_count"] == 0
+    assert body["lag_seconds"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_embedding_stats(client: AsyncClient) -> None:
+    response = await client.get("/embedding_stats")
+    assert response.status_code == 200
+    assert response.json()["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_answer_cache_stats(client: AsyncClient) -> None:
+    stats = AnswerCacheStats(
+        entries=2,
+        max_entries=10,
+        eviction_policy="lfu",
+        ttl_seconds=None,
+        exact_hits=3,
+        semantic_hits=1,
+        misses=4,
+        hit_rate=0.5,
+        evictions=1,
+        expirations=0,
+    )
+    mock_cache_service = Mock(spec=AnswerQuestionCacheService)
+    mock_cache_service.stats.return_value = stats
+    app.dependency_overrides[get_answer_question_cache_service] = lambda: mock_cache_service
+
+    response = await client.get("/answer_cache_stats")
+
+    assert response.status_code == 200
+    assert response.json() == stats.model_dump()
+
+
+@pytest.mark.asyncio
+async def test_summarize_note_stream(client: AsyncClient) -> None:
+    async def stream_summary(content: str) -> AsyncIterator[str]:
+        for delta in ["Acute ", "bronchitis."]:
+            yield delta
+
+    mock_summarization_service = Mock(spec=SummarizationService)
+    mock_summarization_service.stream_summary = stream_summary
+    app.dependency_overrides[get_summarization_service] = lambda: mock_summarization_service
+
+    response = await client.post("/summarize_note/stream", json={"content": "Patient presents with cough."})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [{"delta": "Acute ", "cached": False}, {"delta": "bronchitis.", "cached": False}]
+
+
+@pytest.mark.asyncio
+async def test_answer_question_stream_reports_errors_in_band(client: AsyncClient) -> None:
+    async def stream_answer(question: str, db: object) -> AsyncIterator[TextDelta]:
+        yield TextDelta(delta="Crohn's disease ")
+        raise RuntimeError("model unavailable")
+
+    mock_answer_question_service = Mock(spec=AnswerQuestionService)
+    mock_answer_question_service.stream_answer = stream_answer
+    app.dependency_overrides[get_answer_question_service] = lambda: mock_answer_question_service
+
+    response = await client.post("/answer_question/stream", json={"question": "What is Crohn's disease?"})
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [{"delta": "Crohn's disease ", "cached": False}, {"error": "model unavailable"}]
+
+
+def _batch_summarization_service() -> SummarizationService:
+    service = SummarizationService()
+
+    async def summarize(content: str) -> str:
+        if not content.strip(". "):
+            raise ValueError("nothing to summarize")
+        return f"Summary of {content}"
+
+    service.summarize = summarize  # type: ignore[method-assign]
+    return service
+
+
+@pytest.mark.asyncio
+async def test_summarize_notes_json_batch_streams_per_item_results(client: AsyncClient) -> None:
+    app.dependency_overrides[get_summarization_service] = _batch_summarization_service
+
+    response = await client.post(
+        "/summarize_notes",
+        json={"notes": [{"id": "a", "content": "Cough."}, {"id": "b", "content": "..."}, {"content": "Fever."}]},
+    )
+
+    assert response.status_code == 200
+    results = sorted((json.loads(line) for line in response.text.splitlines()), key=lambda r: r["index"])
+    assert results == [
+        {"index": 0, "id": "a", "summary": "Summary of Cough.", "error": None},
+        {"index": 1, "id": "b", "summary": None, "error": "nothing to summarize"},
+        {"index": 2, "id": None, "summary": "Summary of Fever.", "error": None},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_summarize_notes_accepts_ndjson_upload(client: AsyncClient) -> None:
+    app.dependency_overrides[get_summarization_service] = _batch_summarization_service
+    body = '{"id": "a", "content": "Cough."}\n\nnot json\n{"id": "c", "content": "Fever."}'
+
+    response = await client.post("/summarize_notes", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    results = {r["index"]: r for r in (json.loads(line) for line in response.text.splitlines())}
+    assert results[0]["summary"] == "Summary of Cough."
+    assert results[1]["error"] is not None
+    assert results[2]["id"] == "c"
+
+
+@pytest.mark.asyncio
+async def test_summarize_notes_rejects_an_invalid_json_batch(client: AsyncClient) -> None:
+    response = await client.post("/summarize_notes", json={"notes": []})
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_get_document_summary(client: AsyncClient) -> None:
+    mock_summary_service = AsyncMock(spec=DocumentSummaryService)
+    mock_summary_service.get_summary.side_effect = lambda db, document_id: "Summary." if document_id == 1 else None
+    app.dependency_overrides[get_document_summary_service] = lambda: mock_summary_service
+
+    response = await client.get("/documents/1/summary")
+    assert response.status_code == 200
+    assert response.json() == {"document_id": 1, "summary": "Summary."}
+
+    response = await client.get("/documents/2/summary")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_extract_structured_passes_refresh_flag(client: AsyncClient) -> None:
+    mock_service = AsyncMock(spec=ExtractStructuredService)
+    mock_service.extract_structured.return_value = StructuredData(
+        name="John Doe", age=45, conditions=[], diagnoses=[], treatments=[], medications=[]
+    )
+    app.dependency_overrides[get_extract_structured_service] = lambda: mock_service
+
+    response = await client.post("/extract_structured", json={"data": "Patient: John Doe", "refresh": True})
+
+    assert response.status_code == 200
+    assert response.json()["structured_data"]["name"] == "John Doe"
+    mock_service.extract_structured.assert_awaited_once_with("Patient: John Doe", refresh=True)
+
+
+@pytest.mark.asyncio
+async def test_notes_to_fhir_streams_one_bundle_per_note(client: AsyncClient) -> None:
+    async def extract_structured(data: str, refresh: bool = False) -> StructuredData:
+        if not data.strip():
+            raise ValueError("empty note")
+        return StructuredData(name=data, age=45, conditions=[], diagnoses=[], treatments=[], medications=[])
+
+    mock_extract_service = AsyncMock(spec=ExtractStructuredService)
+    mock_extract_service.extract_structured.side_effect = extract_structured
+    app.dependency_overrides[get_note_to_fhir_service] = lambda: NoteToFHIRService(
+        mock_extract_service, FHIRConversionService()
+    )
+
+    response = await client.post(
+        "/notes/to_fhir", json={"notes": [{"id": "a", "data": "John Doe"}, {"id": "b", "data": " "}]}
+    )
+
+    assert response.status_code == 200
+    results = {r["index"]: r for r in (json.loads(line) for line in response.text.splitlines())}
+    bundle = results[0]["fhir_bundle"]
+    assert results[0]["id"] == "a"
+    assert bundle["resourceType"] == "Bundle"
+    assert bundle["entry"][0]["resource"]["name"][0]["text"] == "John Doe"
+    assert results[1] == {"index": 1, "id": "b", "fhir_bundle": None, "error": "empty note"}
+
+
+@pytest.mark.asyncio
+async def test_notes_to_fhir_rejects_an_invalid_json_batch(client: AsyncClient) -> None:
+    response = await client.post("/notes/to_fhir", json={"notes": [{"id": "a"}]})
+    assert response.status_code == 422
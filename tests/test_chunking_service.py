@@ -0,0 +1,47 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.document_chunk import DocumentChunk
+from app.services.chunking_service import chunk_text, split_sections, split_windows
+from app.services.document_service import create_document, delete_document, update_document
+
+
+def test_short_note_is_a_single_chunk() -> None:
+    assert chunk_text("Patient presents with fever and cough.") == ["Patient presents with fever and cough."]
+
+
+def test_sections_start_at_heading_lines(medical_note: str) -> None:
+    sections = split_sections(medical_note)
+
+    assert any(section.startswith("O:") for section in sections)
+    assert any(section.startswith("A:") for section in sections)
+    assert any(section.startswith("P:") for section in sections)
+
+
+def test_paragraphs_are_packed_up_to_the_word_limit() -> None:
+    text = "one two three\n\nfour five\n\nsix seven eight nine"
+
+    assert chunk_text(text, max_words=5, overlap_words=1) == ["one two three\n\nfour five", "six seven eight nine"]
+
+
+def test_oversized_paragraphs_are_split_into_overlapping_windows() -> None:
+    words = [str(i) for i in range(10)]
+
+    assert split_windows(words, max_words=4, overlap_words=1) == ["0 1 2 3", "3 4 5 6", "6 7 8 9"]
+    assert chunk_text(" ".join(words), max_words=4, overlap_words=1) == ["0 1 2 3", "3 4 5 6", "6 7 8 9"]
+
+
+@pytest.mark.asyncio
+async def test_document_writes_keep_chunks_in_sync(db_session: AsyncSession, medical_note: str) -> None:
+    doc = await create_document(db_session, title="SOAP Note", content=medical_note)
+    chunks = (await db_session.execute(select(DocumentChunk).where(DocumentChunk.document_id == doc.id))).scalars()
+    assert [chunk.content for chunk in chunks] == chunk_text(medical_note)
+
+    await update_document(db_session, doc.id, title="SOAP Note", content="Revised note.")
+    chunks = (await db_session.execute(select(DocumentChunk).where(DocumentChunk.document_id == doc.id))).scalars()
+    assert [chunk.content for chunk in chunks] == ["Revised note."]
+
+    await delete_document(db_session, doc.id)
+    chunks = (await db_session.execute(select(DocumentChunk).where(DocumentChunk.document_id == doc.id))).scalars()
+    assert list(chunks) == []
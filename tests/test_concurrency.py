@@ -0,0 +1,53 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+
+from app.services.concurrency import map_bounded
+
+
+async def _items(*items: int | Exception) -> AsyncIterator[int | Exception]:
+    for item in items:
+        yield item
+
+
+@pytest.mark.asyncio
+async def test_map_bounded_limits_concurrency_and_reports_errors_per_item() -> None:
+    running = 0
+    peak = 0
+
+    async def square(value: int) -> int:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001 * (5 - value))
+        running -= 1
+        if value == 3:
+            raise ValueError("bad note")
+        return value * value
+
+    outcomes = [
+        outcome
+        async for outcome in map_bounded(_items(0, 1, ValueError("unparseable"), 3, 4), square, asyncio.Semaphore(2))
+    ]
+
+    assert peak == 2
+    assert {o.index: o.result for o in outcomes if o.error is None} == {0: 0, 1: 1, 4: 16}
+    assert {o.index: str(o.error) for o in outcomes if o.error is not None} == {2: "unparseable", 3: "bad note"}
+
+
+@pytest.mark.asyncio
+async def test_closing_map_bounded_early_cancels_calls_and_frees_slots() -> None:
+    semaphore = asyncio.Semaphore(2)
+
+    async def slow(value: int) -> int:
+        if value:
+            await asyncio.sleep(10)
+        return value
+
+    outcomes = map_bounded(_items(0, 1, 2), slow, semaphore)
+    assert (await anext(outcomes)).result == 0
+    await outcomes.aclose()
+    await asyncio.sleep(0.01)
+
+    assert semaphore._value == 2
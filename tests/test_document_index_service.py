@@ -0,0 +1,111 @@
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy import delete
+
+from app.models.document import Document
+from app.models.document_chunk import DocumentChunk
+from app.services import document_index_service
+from app.services.chunking_service import build_chunks
+from app.services.document_index_service import DocumentIndexService
+
+
+def _write_document(content: str, document_id: int | None = None) -> int:
+    """Create a document, or replace its content, and re-chunk it as the document endpoints do."""
+    with document_index_service.SessionLocal() as db:
+        if document_id is None:
+            document = Document(title="Index test", content=content)
+            db.add(document)
+            db.flush()
+            document_id = document.id
+        else:
+            db.get_one(Document, document_id).content = content
+            db.execute(delete(DocumentChunk).where(DocumentChunk.document_id == document_id))
+        db.add_all(build_chunks(document_id, content))
+        db.commit()
+        return document_id
+
+
+def _delete_document(document_id: int) -> None:
+    with document_index_service.SessionLocal() as db:
+        db.execute(delete(DocumentChunk).where(DocumentChunk.document_id == document_id))
+        db.execute(delete(Document).where(Document.id == document_id))
+        db.commit()
+
+
+def _current_chunk_ids(document_id: int) -> list[int]:
+    with document_index_service.SessionLocal() as db:
+        return [chunk.id for chunk in db.query(DocumentChunk).filter_by(document_id=document_id)]
+
+
+def _indexed_ids(service: DocumentIndexService) -> set[int]:
+    assert service._index is not None
+    return set(service._index.ids().tolist()) - service._index.tombstones
+
+
+def test_build_indexes_every_stored_chunk(
+    document_index: DocumentIndexService, new_singleton: Callable[..., Any]
+) -> None:
+    document_id = _write_document("Written before the index is rebuilt.")
+    rebuilt = new_singleton(DocumentIndexService)
+    rebuilt.build()
+
+    assert set(_current_chunk_ids(document_id)) <= _indexed_ids(rebuilt)
+    assert rebuilt.status().built
+
+
+def test_index_document_swaps_in_updated_chunks(document_index: DocumentIndexService) -> None:
+    document_id = _write_document("Original content.")
+    document_index.index_document(document_id, document_index.mark_pending())
+    old_ids = set(_current_chunk_ids(document_id))
+
+    _write_document("Updated content.", document_id)
+    write_id = document_index.mark_pending()
+    assert document_index.status().pending_count == 1
+    document_index.index_document(document_id, write_id)
+
+    new_ids = set(_current_chunk_ids(document_id))
+    assert new_ids <= _indexed_ids(document_index)
+    assert not (old_ids - new_ids) & _indexed_ids(document_index)
+    assert document_index.status().pending_count == 0
+
+
+def test_stale_ingest_finishing_last_does_not_replace_newer_chunks(document_index: DocumentIndexService) -> None:
+    document_id = _write_document("Version 1.")
+    document_index.index_document(document_id, document_index.mark_pending())
+    _write_document("Version 2, written first.", document_id)
+    first_write = document_index.mark_pending()
+    get_embeddings = document_index._embedding_store.get_embeddings
+    second_write: list[int] = []
+
+    def get_embeddings_then_write_again(db, texts):  # type: ignore[no-untyped-def]
+        vectors = get_embeddings(db, texts)
+        if not second_write:
+            # A second update lands, and is fully ingested, while the first ingest is embedding.
+            _write_document("Version 3, written second and ingested first.", document_id)
+            second_write.append(document_index.mark_pending())
+            assert document_index.status().pending_count == 2
+            document_index.index_document(document_id, second_write[0])
+            assert document_index.status().pending_count == 1
+        return vectors
+
+    document_index._embedding_store.get_embeddings = get_embeddings_then_write_again  # type: ignore[method-assign]
+    document_index.index_document(document_id, first_write)
+
+    assert document_index._chunk_ids[document_id] == _current_chunk_ids(document_id)
+    assert set(_current_chunk_ids(document_id)) <= _indexed_ids(document_index)
+    assert document_index.status().pending_count == 0
+
+
+def test_remove_document_drops_its_chunks(document_index: DocumentIndexService) -> None:
+    document_id = _write_document("Soon deleted.")
+    document_index.index_document(document_id, document_index.mark_pending())
+    chunk_ids = set(_current_chunk_ids(document_id))
+    assert chunk_ids <= _indexed_ids(document_index)
+
+    _delete_document(document_id)
+    document_index.remove_document(document_id, document_index.mark_pending())
+
+    assert not chunk_ids & _indexed_ids(document_index)
+    assert document_id not in document_index._chunk_ids
+    assert document_index.status().pending_count == 0
@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.document_service import (
+    create_document,
+    fts_match_expression,
+    get_chunks_by_ids,
+    get_documents_by_ids,
+    search_chunks_bm25,
+    update_document,
+)
+from app.services.passage_cache import RetrievedPassage, get_passage_cache
+
+
+@pytest.mark.asyncio
+async def test_get_documents_by_ids_preserves_order_and_skips_unknown_ids(db_session: AsyncSession) -> None:
+    first = await create_document(db_session, title="First", content="Alpha")
+    second = await create_document(db_session, title="Second", content="Beta")
+
+    documents = await get_documents_by_ids(db_session, [second.id, -1, first.id, 999_999])
+
+    assert [doc.id for doc in documents] == [second.id, first.id]
+
+
+@pytest.mark.asyncio
+async def test_update_document_invalidates_cached_passages(db_session: AsyncSession) -> None:
+    doc = await create_document(db_session, title="Note", content="Old content")
+    cache = get_passage_cache()
+    cache.put_many({-doc.id: RetrievedPassage(document_id=doc.id, title="Note", content="Old content")})
+
+    await update_document(db_session, doc.id, title="Note", content="New content")
+
+    assert cache.get_many([-doc.id]) == {}
+
+
+@pytest.mark.asyncio
+async def test_bm25_search_finds_exact_drug_names_and_follows_updates(db_session: AsyncSession) -> None:
+    doc = await create_document(db_session, title="Zorbafloxacin note", content="Started zorbafloxacin 250mg daily.")
+
+    hits = await search_chunks_bm25(db_session, "Is the patient on zorbafloxacin?", k=5)
+    assert hits and hits[0][1] > 0
+    chunks = await get_chunks_by_ids(db_session, [chunk_id for chunk_id, _ in hits])
+    assert {chunk.document_id for chunk in chunks} == {doc.id}
+
+    await update_document(db_session, doc.id, title="Renamed note", content="Switched to plain saline.")
+    assert await search_chunks_bm25(db_session, "zorbafloxacin", k=5) == []
+    assert await search_chunks_bm25(db_session, "renamed saline", k=5)
+
+
+def test_fts_match_expression_quotes_terms_and_drops_stopwords() -> None:
+    assert fts_match_expression('What is "K50.90" NOT Crohn\'s?') == '"k50" OR "90" OR "not" OR "crohn"'
+    assert fts_match_expression("what is it?") is None
@@ -0,0 +1,100 @@
+import asyncio
+from collections.abc import Callable
+from typing import Any
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.services import document_summary_service
+from app.services.document_service import create_document
+from app.services.document_summary_service import DocumentSummaryService, get_summary_precompute_semaphore
+from app.services.summarization_service import SummarizationService
+
+
+@pytest.mark.asyncio
+async def test_summaries_are_stored_by_content_hash(
+    db_session: AsyncSession, new_singleton: Callable[..., Any]
+) -> None:
+    summarization_service = AsyncMock(spec=SummarizationService)
+    summarization_service.summarize.return_value = "Stored summary."
+    summarization_service.version = "v1"
+    service = new_singleton(DocumentSummaryService, summarization_service)
+    first = await create_document(db_session, title="First", content="Identical summary-service content.")
+    second = await create_document(db_session, title="Second", content="Identical summary-service content.")
+
+    assert await service.get_summary(db_session, first.id) == "Stored summary."
+    assert await service.get_summary(db_session, first.id) == "Stored summary."
+    assert await service.get_summary(db_session, second.id) == "Stored summary."
+    assert summarization_service.summarize.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_summary_of_missing_document_is_none(
+    db_session: AsyncSession, new_singleton: Callable[..., Any]
+) -> None:
+    service = new_singleton(DocumentSummaryService, AsyncMock(spec=SummarizationService, version="v1"))
+    assert await service.get_summary(db_session, 999_999) is None
+
+
+@pytest.mark.asyncio
+async def test_summaries_are_regenerated_when_the_summarizer_changes(
+    db_session: AsyncSession, new_singleton: Callable[..., Any]
+) -> None:
+    summarization_service = AsyncMock(spec=SummarizationService, version="v1")
+    summarization_service.summarize.side_effect = ["Old prompt summary.", "New prompt summary."]
+    service = new_singleton(DocumentSummaryService, summarization_service)
+    document = await create_document(db_session, title="Versioned", content="Summarizer version content.")
+
+    assert await service.get_summary(db_session, document.id) == "Old prompt summary."
+    summarization_service.version = "v2"
+    assert await service.get_summary(db_session, document.id) == "New prompt summary."
+
+
+@pytest.mark.asyncio
+async def test_precompute_runs_under_its_own_concurrency_limit(
+    db_session: AsyncSession,
+    test_engine: AsyncEngine,
+    monkeypatch: pytest.MonkeyPatch,
+    new_singleton: Callable[..., Any],
+) -> None:
+    monkeypatch.setattr(document_summary_service, "AsyncSessionLocal", async_sessionmaker(bind=test_engine))
+    monkeypatch.setattr(settings, "summary_precompute_concurrency", 1)
+    get_summary_precompute_semaphore.cache_clear()
+    running = peak = 0
+
+    async def summarize(content: str) -> str:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "Precomputed."
+
+    summarization_service = AsyncMock(spec=SummarizationService, version="precompute-test")
+    summarization_service.summarize.side_effect = summarize
+    service = new_singleton(DocumentSummaryService, summarization_service)
+    for i in range(3):
+        await create_document(db_session, title=f"Precomputed {i}", content=f"Precompute content {i}.")
+
+    summarize_document = service.summarize_document
+    started = peak_started = 0
+
+    async def count_started(document_id: int) -> None:
+        nonlocal started, peak_started
+        started += 1
+        peak_started = max(peak_started, started)
+        await summarize_document(document_id)
+        started -= 1
+
+    monkeypatch.setattr(service, "summarize_document", count_started)
+    try:
+        await service.precompute_missing()
+    finally:
+        get_summary_precompute_semaphore.cache_clear()
+
+    assert summarization_service.summarize.await_count >= 3
+    assert peak == 1
+    # One worker, rather than one task per document waiting on the semaphore.
+    assert peak_started == 1
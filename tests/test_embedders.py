@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services.embedders import OpenAIEmbedder, SentenceTransformerEmbedder
+
+
+def _fake_embeddings_create(model: str, input: list[str]) -> Any:
+    return SimpleNamespace(data=[SimpleNamespace(embedding=[0.0] * 1536) for _ in input])
+
+
+def test_openai_embedder_splits_large_inputs_into_batches() -> None:
+    embedder = OpenAIEmbedder(model_name="text-embedding-3-small", api_key="test")
+    client = MagicMock()
+    client.embeddings.create.side_effect = _fake_embeddings_create
+    embedder._client = client  # type: ignore[reportPrivateUsage]
+
+    vectors = embedder.embed([f"text {i}" for i in range(OpenAIEmbedder.MAX_BATCH_SIZE + 1)])
+
+    assert client.embeddings.create.call_count == 2
+    assert vectors.shape == (OpenAIEmbedder.MAX_BATCH_SIZE + 1, embedder.dimension)
+
+
+def test_openai_embedder_rejects_unknown_model() -> None:
+    with pytest.raises(ValueError):
+        OpenAIEmbedder(model_name="not-a-model", api_key="test")
+
+
+@pytest.mark.asyncio
+async def test_sentence_transformer_embedder_runs_offline() -> None:
+    pytest.importorskip("sentence_transformers")
+    embedder = SentenceTransformerEmbedder()
+
+    vectors = await embedder.aembed(["Metformin 500mg twice daily", "Type 2 diabetes"])
+
+    assert vectors.shape == (2, embedder.dimension)
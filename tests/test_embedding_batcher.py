@@ -0,0 +1,46 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+class FakeEmbeddingApi:
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    async def embed_batch(self, texts: list[str]) -> np.ndarray:
+        self.calls.append(texts)
+        await asyncio.sleep(0)
+        return np.array([[float(len(text)), 1.0] for text in texts], dtype="float32")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_coalesced_into_batches() -> None:
+    api = FakeEmbeddingApi()
+    batcher = EmbeddingBatcher(api.embed_batch, max_batch_size=4, window_ms=10, max_concurrency=2)
+    texts = [f"question {'x' * i}" for i in range(10)]
+
+    vectors = await asyncio.gather(*(batcher.embed(text) for text in texts))
+
+    assert [len(call) for call in api.calls] == [4, 4, 2]
+    assert [vector[0] for vector in vectors] == [float(len(text)) for text in texts]
+
+    stats = batcher.stats()
+    assert stats.total_requests == 10
+    assert stats.total_batches == 3
+    assert stats.queue_depth == 0
+    assert stats.in_flight_batches == 0
+
+
+@pytest.mark.asyncio
+async def test_batch_failure_is_propagated_to_every_caller() -> None:
+    async def failing_embed_batch(texts: list[str]) -> np.ndarray:
+        raise RuntimeError("embedding API unavailable")
+
+    batcher = EmbeddingBatcher(failing_embed_batch, max_batch_size=8, window_ms=1, max_concurrency=1)
+
+    results = await asyncio.gather(batcher.embed("a"), batcher.embed("b"), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,89 @@
+import sqlite3
+from collections.abc import Generator
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.models.document import Base
+from app.services.embedding_store_service import EmbeddingStoreService
+from tests.helpers import FakeEmbedder
+
+
+@pytest.fixture
+def sync_session() -> Generator[Session, None, None]:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def test_get_embeddings_reuses_stored_vectors(sync_session: Session) -> None:
+    embedder = FakeEmbedder()
+    store = EmbeddingStoreService(embedder)
+
+    first = store.get_embeddings(sync_session, ["alpha", "beta"])
+    second = store.get_embeddings(sync_session, ["alpha", "beta"])
+
+    assert len(embedder.calls) == 1
+    np.testing.assert_array_equal(first, second)
+    assert first.shape == (2, 3)
+
+
+def test_get_embeddings_only_embeds_changed_texts(sync_session: Session) -> None:
+    embedder = FakeEmbedder()
+    store = EmbeddingStoreService(embedder)
+    store.get_embeddings(sync_session, ["alpha", "beta"])
+
+    vectors = store.get_embeddings(sync_session, ["alpha", "beta changed"])
+
+    assert embedder.calls[-1] == ["beta changed"]
+    assert vectors[1][0] == len("beta changed")
+
+
+def test_get_embeddings_is_keyed_by_model(sync_session: Session) -> None:
+    embedder_a = FakeEmbedder("model-a")
+    embedder_b = FakeEmbedder("model-b")
+    EmbeddingStoreService(embedder_a).get_embeddings(sync_session, ["alpha"])
+    EmbeddingStoreService(embedder_b).get_embeddings(sync_session, ["alpha"])
+
+    assert len(embedder_a.calls) == 1
+    assert len(embedder_b.calls) == 1
+
+
+def test_get_embeddings_of_empty_corpus_has_embedder_dimension(sync_session: Session) -> None:
+    vectors = EmbeddingStoreService(FakeEmbedder()).get_embeddings(sync_session, [])
+
+    assert vectors.shape == (0, 3)
+
+
+def test_get_embeddings_tolerates_a_concurrent_write_of_the_same_text(
+    sync_session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    EmbeddingStoreService(FakeEmbedder()).get_embeddings(sync_session, ["alpha"])
+    racing = EmbeddingStoreService(FakeEmbedder())
+    # As if another ingest stored "alpha" between this one's lookup and its write.
+    monkeypatch.setattr(racing, "_load_vectors", lambda db, hashes: {})
+
+    vectors = racing.get_embeddings(sync_session, ["alpha"])
+
+    assert vectors[0][0] == len("alpha")
+
+
+def test_get_embeddings_stores_more_rows_than_one_statement_can_bind() -> None:
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def limit_variables(dbapi_connection: sqlite3.Connection, connection_record: object) -> None:
+        dbapi_connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+
+    Base.metadata.create_all(engine)
+    texts = [f"text {i}" for i in range(1000)]
+    with Session(engine) as session:
+        EmbeddingStoreService(FakeEmbedder()).get_embeddings(session, texts)
+        embedder = FakeEmbedder()
+        vectors = EmbeddingStoreService(embedder).get_embeddings(session, texts)
+
+    assert vectors.shape == (1000, 3)
+    assert embedder.calls == []
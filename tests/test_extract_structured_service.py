@@ -1,6 +1,6 @@
 import pytest
 
-from app.services.extract_structured_service import get_extract_structured_service
+from app.services.extract_structured_service import ExtractStructuredService, get_extract_structured_service
 
 
 @pytest.mark.asyncio
@@ -9,3 +9,11 @@ async def test_extract_structured(medical_note: str) -> None:
     extract_structured_service = get_extract_structured_service()
     structured_data = await extract_structured_service.extract_structured(medical_note)
     assert structured_data is not None
+
+
+def test_kinds_without_a_loaded_code_system_are_coded_through_the_mcp_server() -> None:
+    kinds = ["condition", "diagnosis", "treatment", "medication"]
+
+    assert ExtractStructuredService._split_kinds({"rxnorm"}) == (["medication"], kinds[:3])
+    assert ExtractStructuredService._split_kinds({"icd10cm", "rxnorm"}) == (kinds, [])
+    assert ExtractStructuredService._split_kinds(set()) == ([], kinds)
@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.extract_structured import Condition, StructuredData
+from app.services.extraction_cache import extraction_cache_key, get_cached_extraction, store_extraction
+
+
+def _structured_data(icd_code: str) -> StructuredData:
+    return StructuredData(
+        name="Alan Turning",
+        age=50,
+        conditions=[Condition(name="Hyperlipidemia", icd_code=icd_code)],
+        diagnoses=[],
+        treatments=[],
+        medications=[],
+    )
+
+
+def test_cache_key_ignores_whitespace_but_not_prompt_or_model() -> None:
+    key = extraction_cache_key("Pt: Alan Turning\nAge: 50", "prompt", "model")
+
+    assert extraction_cache_key("  Pt: Alan Turning \r\n Age: 50\n", "prompt", "model") == key
+    assert extraction_cache_key("Pt: Alan Turning\nAge: 51", "prompt", "model") != key
+    assert extraction_cache_key("Pt: Alan Turning\nAge: 50", "other prompt", "model") != key
+    assert extraction_cache_key("Pt: Alan Turning\nAge: 50", "prompt", "other model") != key
+
+
+@pytest.mark.asyncio
+async def test_store_and_replace_cached_extraction(db_session: AsyncSession) -> None:
+    key = extraction_cache_key("Hyperlipidemia, cache test", "prompt", "model")
+    assert await get_cached_extraction(db_session, key) is None
+
+    await store_extraction(db_session, key, _structured_data("E78.9"))
+    assert await get_cached_extraction(db_session, key) == _structured_data("E78.9")
+
+    await store_extraction(db_session, key, _structured_data("E78.5"))
+    assert await get_cached_extraction(db_session, key) == _structured_data("E78.5")
@@ -1,6 +1,10 @@
 """Tests for FHIR conversion service."""
 
+import itertools
+from collections.abc import Callable
+
 import pytest
+from pydantic import ValidationError
 
 from app.schemas.extract_structured import (
     Condition,
@@ -9,7 +13,7 @@ from app.schemas.extract_structured import (
     StructuredData,
     Treatment,
 )
-from app.services.fhir_conversion_service import FHIRConversionService
+from app.services.fhir_conversion_service import FHIRConversionService, FHIRValidationMode
 
 
 @pytest.fixture
@@ -201,3 +205,63 @@ def test_convert_to_fhir_with_no_age() -> None:
 
     # Birth date should not be present
     assert "birthDate" not in patient or patient["birthDate"] is None
+
+
+def numbered_ids() -> Callable[[], str]:
+    counter = itertools.count()
+    return lambda: f"id-{next(counter)}"
+
+
+def convert(structured_data: StructuredData, mode: FHIRValidationMode) -> dict:
+    return FHIRConversionService(validation_mode=mode, id_factory=numbered_ids()).convert_to_fhir(structured_data)
+
+
+@pytest.mark.parametrize("n_items", [0, 1, 200])
+def test_template_bundle_matches_validated_bundle(sample_structured_data: StructuredData, n_items: int) -> None:
+    """Test that unvalidated template output is identical to what fhir.resources validates and dumps."""
+    structured_data = sample_structured_data.model_copy(
+        update={
+            "conditions": [
+                *sample_structured_data.conditions,
+                *(Condition(name=f"C {i}", icd_code=f"E{i}") for i in range(n_items)),
+            ],
+            "treatments": [Treatment(name=f"Treatment {i}", icd_code=f"0DT{i}") for i in range(n_items)],
+            "medications": [Medication(name=f"Medication {i}", rx_norm_code=str(i)) for i in range(n_items)],
+        }
+    )
+
+    assert convert(structured_data, "off") == convert(structured_data, "strict")
+
+
+def test_strict_validation_rejects_invalid_codes(sample_structured_data: StructuredData) -> None:
+    """Test that strict mode raises on a bundle fhir.resources rejects, while off mode does not validate."""
+    structured_data = sample_structured_data.model_copy(update={"medications": [Medication(name="X", rx_norm_code="")]})
+
+    with pytest.raises(ValidationError):
+        convert(structured_data, "strict")
+    assert convert(structured_data, "off")["entry"][-1]["resource"]["medication"]["concept"]["coding"][0]["code"] == ""
+
+
+def test_sampled_validation_logs_failures(
+    sample_structured_data: StructuredData, capsys: pytest.CaptureFixture
+) -> None:
+    """Test that a sampled bundle that fails validation is logged and still returned."""
+    structured_data = sample_structured_data.model_copy(update={"medications": [Medication(name="X", rx_norm_code="")]})
+    service = FHIRConversionService(validation_mode="sample", sample_rate=1.0)
+
+    result = service.convert_to_fhir(structured_data)
+
+    assert len(result["entry"]) == 6
+    assert "Sampled FHIR bundle failed validation" in capsys.readouterr().out
+
+
+def test_returned_bundles_do_not_share_fragments(sample_structured_data: StructuredData) -> None:
+    """Test that changing one returned bundle does not change later ones."""
+    service = FHIRConversionService(validation_mode="off")
+    first = service.convert_to_fhir(sample_structured_data)
+    first["entry"][1]["resource"]["clinicalStatus"]["coding"][0]["code"] = "resolved"
+
+    second = service.convert_to_fhir(sample_structured_data)
+
+    assert second["entry"][1]["resource"]["clinicalStatus"]["coding"][0]["code"] == "active"
+    assert second["entry"][2]["resource"]["clinicalStatus"]["coding"][0]["code"] == "active"
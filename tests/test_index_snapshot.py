@@ -0,0 +1,70 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.scripts.index_report import synthetic_vectors
+from app.services.index_snapshot import IndexSnapshot, IndexSnapshotManifest
+from app.services.vector_index import IndexKind, create_vector_index
+
+
+def _save(snapshot: IndexSnapshot, kind: IndexKind, vectors: np.ndarray) -> None:
+    index = create_vector_index(vectors.shape[1], kind=kind, training_vectors=vectors)
+    index.add(vectors, np.arange(len(vectors), dtype=np.int64))
+    index.remove(np.array([0], dtype=np.int64))
+    manifest = IndexSnapshotManifest(
+        max_id=len(vectors) - 1,
+        embedding_model="test-model",
+        dimension=vectors.shape[1],
+        kind=index.kind,
+        tombstones=sorted(index.tombstones),
+    )
+    snapshot.save(index.serialize(), manifest)
+
+
+@pytest.mark.parametrize("kind", ["flat", "ivf_flat", "hnsw"])
+def test_snapshot_round_trip_accepts_replayed_rows(tmp_path: Path, kind: IndexKind) -> None:
+    vectors = synthetic_vectors(2_000, 16, n_clusters=10)
+    snapshot = IndexSnapshot("test", directory=tmp_path)
+    _save(snapshot, kind, vectors)
+
+    loaded = snapshot.load("test-model", 16)
+    assert loaded is not None
+    index, manifest = loaded
+    assert manifest.max_id == 1_999
+    assert index.kind == kind
+    assert index.ntotal == 1_999
+
+    index.add(vectors[:1], np.array([5_000], dtype=np.int64))
+    _, ids = index.search(vectors[:1], k=1)
+    assert ids[0][0] == 5_000
+
+
+def test_snapshot_is_ignored_when_embedder_changed(tmp_path: Path) -> None:
+    snapshot = IndexSnapshot("test", directory=tmp_path)
+    _save(snapshot, "flat", synthetic_vectors(10, 16))
+
+    assert snapshot.load("other-model", 16) is None
+    assert IndexSnapshot("missing", directory=tmp_path).load("test-model", 16) is None
+
+
+def test_interrupted_save_leaves_the_previous_snapshot(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    snapshot = IndexSnapshot("test", directory=tmp_path)
+    _save(snapshot, "flat", synthetic_vectors(10, 16))
+
+    def crash(src: str, dst: str) -> None:
+        raise OSError("killed before the manifest was swapped in")
+
+    monkeypatch.setattr(os, "replace", crash)
+    with pytest.raises(OSError):
+        _save(snapshot, "flat", synthetic_vectors(20, 16))
+    monkeypatch.undo()
+
+    loaded = snapshot.load("test-model", 16)
+    assert loaded is not None
+    index, manifest = loaded
+    assert (manifest.max_id, index.ntotal) == (9, 9)
+
+    _save(snapshot, "flat", synthetic_vectors(20, 16))
+    assert len(list(tmp_path.glob("test-*.faiss"))) == 1
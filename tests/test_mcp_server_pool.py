@@ -0,0 +1,127 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from app.services.mcp_server_pool import MCPServerPool, MCPServerPoolUnavailableError
+
+
+class FakeServer:
+    """Stands in for an MCP server process; counts starts and stops."""
+
+    started: list["FakeServer"] = []
+
+    def __init__(self) -> None:
+        self.running = False
+        self.healthy = True
+        self.stopped = False
+
+    async def __aenter__(self) -> "FakeServer":
+        self.running = True
+        FakeServer.started.append(self)
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        self.running = False
+        self.stopped = True
+
+    async def list_tools(self) -> list[Any]:
+        if not self.healthy:
+            raise ConnectionError("server process exited")
+        return []
+
+
+def _pool(size: int = 1, **kwargs: Any) -> MCPServerPool:
+    FakeServer.started = []
+    options = {"lease_timeout": 1.0, "health_check_interval": 3600.0, "restart_backoff": 0.01} | kwargs
+    return MCPServerPool(FakeServer, size, **options)  # type: ignore[arg-type]
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_servers_are_started_once_and_reused_across_leases() -> None:
+    pool = _pool(size=2)
+    await pool.start()
+    try:
+        for _ in range(5):
+            async with pool.lease() as server:
+                assert server.running  # type: ignore[attr-defined]
+        assert len(FakeServer.started) == 2
+    finally:
+        await pool.close()
+    assert all(server.stopped for server in FakeServer.started)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_leases_get_distinct_servers() -> None:
+    pool = _pool(size=2)
+    await pool.start()
+    try:
+        async with pool.lease() as first, pool.lease() as second:
+            assert first is not second
+            assert pool.idle_count == 0
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_server_failing_during_a_lease_is_restarted() -> None:
+    pool = _pool()
+    await pool.start()
+    try:
+        with pytest.raises(ConnectionError):
+            async with pool.lease() as server:
+                server.healthy = False  # type: ignore[attr-defined]
+                raise ConnectionError("tool call failed")
+        await asyncio.sleep(0.05)
+
+        async with pool.lease() as replacement:
+            assert replacement is not server
+            assert replacement.running  # type: ignore[attr-defined]
+        assert server.stopped  # type: ignore[attr-defined]
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_healthy_server_is_kept_after_a_failed_lease() -> None:
+    pool = _pool()
+    await pool.start()
+    try:
+        with pytest.raises(ValueError):
+            async with pool.lease() as server:
+                raise ValueError("model output did not validate")
+        await _settle()
+
+        async with pool.lease() as same:
+            assert same is server
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_health_check_restarts_idle_server_that_stopped_responding() -> None:
+    pool = _pool(health_check_interval=0.01)
+    await pool.start()
+    try:
+        await _settle()
+        FakeServer.started[0].healthy = False
+        await asyncio.sleep(0.1)
+
+        assert len(FakeServer.started) >= 2
+        async with pool.lease() as server:
+            assert server is not FakeServer.started[0]
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_lease_times_out_when_no_server_is_available() -> None:
+    pool = _pool(lease_timeout=0.01)
+    with pytest.raises(MCPServerPoolUnavailableError):
+        async with pool.lease():
+            pass
@@ -0,0 +1,23 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app.db.migrations import add_missing_columns
+from app.models.document import Base
+
+
+def test_add_missing_columns_upgrades_an_existing_table() -> None:
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.execute(
+            text("CREATE TABLE question_answers (id INTEGER PRIMARY KEY, question VARCHAR NOT NULL, answer VARCHAR)")
+        )
+        connection.execute(text("INSERT INTO question_answers (question, answer) VALUES ('q', 'a')"))
+        Base.metadata.create_all(connection)
+        add_missing_columns(connection)
+        add_missing_columns(connection)
+
+        inspector = inspect(connection)
+        assert "question_hash" in {column["name"] for column in inspector.get_columns("question_answers")}
+        assert "ix_question_answers_question_hash" in {
+            index["name"] for index in inspector.get_indexes("question_answers")
+        }
+        assert connection.execute(text("SELECT question_hash FROM question_answers")).scalar_one() is None
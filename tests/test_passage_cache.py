@@ -0,0 +1,25 @@
+from app.services.passage_cache import PassageCache, RetrievedPassage
+
+
+def _passage(document_id: int, content: str) -> RetrievedPassage:
+    return RetrievedPassage(document_id=document_id, title=f"Doc {document_id}", content=content)
+
+
+def test_least_recently_used_passage_is_evicted() -> None:
+    cache = PassageCache(max_size=2)
+    cache.put_many({1: _passage(1, "a"), 2: _passage(1, "b")})
+
+    assert cache.get_many([1]) == {1: _passage(1, "a")}
+    cache.put_many({3: _passage(2, "c")})
+
+    assert set(cache.get_many([1, 2, 3])) == {1, 3}
+
+
+def test_invalidate_document_drops_only_its_passages() -> None:
+    cache = PassageCache()
+    cache.put_many({1: _passage(1, "a"), 2: _passage(1, "b"), 3: _passage(2, "c")})
+
+    cache.invalidate_document(1)
+
+    assert cache.get_many([1, 2, 3]) == {3: _passage(2, "c")}
+    assert len(cache) == 1
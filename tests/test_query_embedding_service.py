@@ -0,0 +1,50 @@
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+
+from app.services.query_embedding_service import QueryEmbeddingService
+
+
+async def _fake_embed(text: str) -> np.ndarray:
+    return np.array([float(len(text)), 1.0], dtype="float32")
+
+
+@pytest.fixture
+def batcher() -> AsyncMock:
+    batcher = AsyncMock()
+    batcher.embed.side_effect = _fake_embed
+    return batcher
+
+
+@pytest.mark.asyncio
+async def test_query_embedding_is_computed_once_per_request(batcher: AsyncMock) -> None:
+    service = QueryEmbeddingService(batcher)
+    query = service.for_question("What is Crohn's disease?")
+
+    first = await query.get_vector()
+    second = await query.get_vector()
+
+    assert batcher.embed.await_count == 1
+    assert first is second
+    assert first.shape == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_repeat_questions_are_served_from_memo(batcher: AsyncMock) -> None:
+    service = QueryEmbeddingService(batcher)
+
+    await service.for_question("What is Crohn's disease?").get_vector()
+    await service.for_question("What is Crohn's disease?").get_vector()
+
+    assert batcher.embed.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_memo_evicts_least_recently_used_question(batcher: AsyncMock) -> None:
+    service = QueryEmbeddingService(batcher, max_size=2)
+
+    for question in ["a", "b", "a", "c", "a", "b"]:  # "c" evicts "b"
+        await service.for_question(question).get_vector()
+
+    assert [call.args[0] for call in batcher.embed.await_args_list] == ["a", "b", "c", "b"]
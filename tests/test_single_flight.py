@@ -0,0 +1,81 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services.single_flight import Flight, SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_run() -> None:
+    flights = SingleFlight[str]()
+    calls = 0
+    release = asyncio.Event()
+
+    async def work(flight: Flight[str]) -> str:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "answer"
+
+    tasks = [asyncio.create_task(flights.run("key", work)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*tasks) == ["answer"] * 5
+    assert calls == 1
+    assert flights.coalesced == 4
+    assert flights.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_followers_share_the_leaders_exception() -> None:
+    flights = SingleFlight[str]()
+
+    async def work(flight: Flight[str]) -> str:
+        await asyncio.sleep(0)
+        raise RuntimeError("LLM unavailable")
+
+    results = await asyncio.gather(*(flights.run("key", work) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_follower_takes_over_when_leader_is_cancelled() -> None:
+    flights = SingleFlight[str]()
+    calls = 0
+
+    async def work(flight: Flight[str]) -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    leader = asyncio.create_task(flights.run("key", work))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.run("key", work))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == "answer"
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_join_similar_only_follows_earlier_flights() -> None:
+    flights = SingleFlight[str](similarity_threshold=0.9)
+    joined: dict[str, Flight[str] | None] = {}
+    both_joined = asyncio.Event()
+
+    async def work(flight: Flight[str]) -> str:
+        joined[flight.key] = flights.join_similar(flight, np.array([[1.0, 0.0]], dtype="float32"))
+        if len(joined) == 2:
+            both_joined.set()
+        await both_joined.wait()
+        return flight.key
+
+    await asyncio.gather(flights.run("first", work), flights.run("second", work))
+
+    assert joined["first"] is None
+    assert joined["second"] is not None and joined["second"].key == "first"
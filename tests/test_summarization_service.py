@@ -1,6 +1,12 @@
+import asyncio
+
 import pytest
+from pydantic_ai.messages import ModelMessage, ModelResponse, TextPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+from pydantic_ai.models.test import TestModel
 
-from app.services.summarization_service import get_summarization_service
+from app.core.config import settings
+from app.services.summarization_service import get_summarization_service, get_summarize_chunk_semaphore
 
 
 @pytest.mark.asyncio
@@ -11,3 +17,123 @@ async def test_summarize_note() -> None:
         "Patient presents with persistent cough, fever, and chest discomfort. Physical examination reveals wheezing and crackling sounds in lungs. Diagnosed with acute bronchitis. Prescribed azithromycin 500mg daily for 5 days and advised bed rest."
     )
     assert summary is not None
+
+
+@pytest.mark.asyncio
+async def test_stream_summary_yields_the_full_summary_in_deltas() -> None:
+    summarization_service = get_summarization_service()
+    with summarization_service._agent.override(
+        model=TestModel(custom_output_text="Acute bronchitis, on azithromycin.")
+    ):
+        deltas = [delta async for delta in summarization_service.stream_summary("Patient presents with cough.")]
+
+    assert len(deltas) > 1
+    assert "".join(deltas) == "Acute bronchitis, on azithromycin."
+
+
+@pytest.mark.asyncio
+async def test_long_note_is_summarized_by_chunk_then_combined(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "summarize_long_note_words", 50)
+    monkeypatch.setattr(settings, "summarize_chunk_words", 30)
+    monkeypatch.setattr(settings, "summarize_chunk_overlap_words", 0)
+    prompts: list[str] = []
+
+    def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        prompt = messages[-1].parts[-1].content
+        prompts.append(prompt)
+        output = "Combined summary." if prompt.startswith("The following are summaries") else f"Partial {len(prompts)}."
+        return ModelResponse(parts=[TextPart(output)])
+
+    note = "\n".join(f"Encounter {i}:\n" + " ".join(["finding"] * 25) for i in range(3))
+    summarization_service = get_summarization_service()
+    with summarization_service._agent.override(model=FunctionModel(respond)):
+        summary = await summarization_service.summarize(note)
+
+    assert summary == "Combined summary."
+    assert len(prompts) == 4
+    assert all("of 3 of a long medical note" in prompt for prompt in prompts[:3])
+    assert "Part 3:" in prompts[3]
+
+
+@pytest.mark.asyncio
+async def test_short_note_is_summarized_in_one_call() -> None:
+    summarization_service = get_summarization_service()
+    with summarization_service._agent.override(model=TestModel(custom_output_text="Short.")):
+        assert await summarization_service.summarize("Patient presents with cough.") == "Short."
+
+
+@pytest.mark.asyncio
+async def test_chunk_calls_are_bounded_by_the_chunk_semaphore(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "summarize_long_note_words", 50)
+    monkeypatch.setattr(settings, "summarize_chunk_words", 10)
+    monkeypatch.setattr(settings, "summarize_chunk_overlap_words", 0)
+    monkeypatch.setattr(settings, "summarize_chunk_concurrency", 2)
+    get_summarize_chunk_semaphore.cache_clear()
+    running = peak = 0
+
+    async def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return ModelResponse(parts=[TextPart("Partial.")])
+
+    note = "\n".join(f"Encounter {i}:\n" + " ".join(["finding"] * 8) for i in range(10))
+    summarization_service = get_summarization_service()
+    try:
+        with summarization_service._agent.override(model=FunctionModel(respond)):
+            await summarization_service.summarize(note)
+    finally:
+        get_summarize_chunk_semaphore.cache_clear()
+
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_reduce_passes_stop_when_summaries_do_not_shrink(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "summarize_long_note_words", 50)
+    monkeypatch.setattr(settings, "summarize_chunk_words", 30)
+    monkeypatch.setattr(settings, "summarize_chunk_overlap_words", 0)
+    prompts: list[str] = []
+
+    def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        prompt = messages[-1].parts[-1].content
+        prompts.append(prompt)
+        # A model that never shortens its input.
+        return ModelResponse(parts=[TextPart(" ".join(["verbose"] * 40))])
+
+    note = "\n".join(f"Encounter {i}:\n" + " ".join(["finding"] * 25) for i in range(3))
+    summarization_service = get_summarization_service()
+    with summarization_service._agent.override(model=FunctionModel(respond)):
+        await summarization_service.summarize(note)
+
+    final_prompt = prompts[-1]
+    assert final_prompt.startswith("The following are summaries")
+    # 3 chunk calls, one reduce pass that did not shrink the text (each 40-word summary split into
+    # windows of 30 and 10 words), and the final call on the truncated text.
+    assert len(prompts) == 3 + 6 + 1
+    assert len(final_prompt.split("\n\n", 1)[1].split()) == 50
+
+
+@pytest.mark.asyncio
+async def test_reduce_pass_packs_short_partial_summaries_together(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "summarize_long_note_words", 50)
+    monkeypatch.setattr(settings, "summarize_chunk_words", 30)
+    monkeypatch.setattr(settings, "summarize_chunk_overlap_words", 0)
+    prompts: list[str] = []
+
+    def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        prompt = messages[-1].parts[-1].content
+        prompts.append(prompt)
+        return ModelResponse(parts=[TextPart(" ".join(["summary"] * 8))])
+
+    note = "\n".join(f"Encounter {i}:\n" + " ".join(["finding"] * 25) for i in range(12))
+    summarization_service = get_summarization_service()
+    with summarization_service._agent.override(model=FunctionModel(respond)):
+        await summarization_service.summarize(note)
+
+    # 12 chunk calls, one reduce pass over windows of three 8-word summaries, and the final call.
+    assert len(prompts) == 12 + 4 + 1
+    assert all("of 4 of a long medical note" in prompt for prompt in prompts[12:16])
+    assert "Part 4:" in prompts[-1] and "Part 5:" not in prompts[-1]
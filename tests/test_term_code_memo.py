@@ -0,0 +1,173 @@
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.models.test import TestModel
+from pydantic_ai.toolsets import FunctionToolset
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.services import term_code_memo
+from app.services.term_code_memo import MemoizedToolset, TermCodeMemo, normalize_term
+
+HYPERLIPIDEMIA = [{"system": "icd10cm", "code": "E78.5", "display": "Hyperlipidemia, unspecified"}]
+
+
+def test_normalize_term() -> None:
+    assert normalize_term("  Type-2   Diabetes, ") == "type 2 diabetes"
+
+
+@pytest.mark.asyncio
+async def test_memoized_terms_are_reused_and_persisted(
+    db_session: AsyncSession, new_singleton: Callable[..., Any]
+) -> None:
+    memo = new_singleton(TermCodeMemo)
+    assert await memo.get(db_session, "lookup:condition", "hyperlipidemia") is None
+    await memo.put_many(db_session, [("lookup:condition", "Hyperlipidemia", HYPERLIPIDEMIA)])
+
+    assert await memo.get(db_session, "lookup:condition", "HYPERLIPIDEMIA.") == HYPERLIPIDEMIA
+    assert await memo.get(db_session, "lookup:medication", "hyperlipidemia") is None
+    stats = memo.stats()
+    assert (stats.entries, stats.hits, stats.misses) == (1, 1, 2)
+
+    await memo.flush(db_session)
+    reloaded = new_singleton(TermCodeMemo)
+    assert await reloaded.get(db_session, "lookup:condition", "hyperlipidemia") == HYPERLIPIDEMIA
+    assert reloaded._entries is not None
+    assert reloaded._entries[("lookup:condition", "hyperlipidemia")].hit_count == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_terms_are_misses(db_session: AsyncSession, new_singleton: Callable[..., Any]) -> None:
+    memo = new_singleton(TermCodeMemo, ttl_seconds=-1)
+    await memo.put_many(db_session, [("lookup:condition", "hyperlipidemia", HYPERLIPIDEMIA)])
+
+    assert await memo.get(db_session, "lookup:condition", "hyperlipidemia") is None
+    assert memo.stats().expirations == 1
+
+
+@pytest.mark.asyncio
+async def test_find_in_text_matches_whole_terms(db_session: AsyncSession, new_singleton: Callable[..., Any]) -> None:
+    memo = new_singleton(TermCodeMemo)
+    await memo.put_many(
+        db_session,
+        [
+            ("lookup:condition", "hyperlipidemia", HYPERLIPIDEMIA),
+            ("lookup:medication", "statin", []),
+            ("tool:lookup_icd_code", '{"query": "hyperlipidemia"}', "E78.5"),
+        ],
+    )
+
+    found = await memo.find_in_text(
+        db_session, "Hx of Hyperlipidemia, on simvastatin 20mg.", ["lookup:condition", "lookup:medication"]
+    )
+
+    assert found == {("lookup:condition", "hyperlipidemia"): HYPERLIPIDEMIA}
+
+
+@pytest.mark.asyncio
+async def test_memoized_toolset_answers_repeated_calls_without_running_the_tool(
+    test_engine: AsyncEngine, monkeypatch: pytest.MonkeyPatch, new_singleton: Callable[..., Any]
+) -> None:
+    monkeypatch.setattr(term_code_memo, "AsyncSessionLocal", async_sessionmaker(bind=test_engine))
+    calls: list[str] = []
+
+    def lookup_icd_code(term: str) -> str:
+        calls.append(term)
+        return "E78.5"
+
+    agent = Agent(
+        TestModel(), toolsets=[MemoizedToolset(FunctionToolset([lookup_icd_code]), new_singleton(TermCodeMemo))]
+    )
+    await agent.run("Hyperlipidemia")
+    await agent.run("Hyperlipidemia")
+
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_memoized_toolset_always_runs_other_tools(
+    test_engine: AsyncEngine, monkeypatch: pytest.MonkeyPatch, new_singleton: Callable[..., Any]
+) -> None:
+    monkeypatch.setattr(term_code_memo, "AsyncSessionLocal", async_sessionmaker(bind=test_engine))
+    calls: list[str] = []
+
+    def pubmed_search(query: str) -> str:
+        calls.append(query)
+        return "PMID 1"
+
+    memo = new_singleton(TermCodeMemo)
+    agent = Agent(TestModel(), toolsets=[MemoizedToolset(FunctionToolset([pubmed_search]), memo)])
+    await agent.run("Hyperlipidemia")
+    await agent.run("Hyperlipidemia")
+
+    assert len(calls) == 2
+    assert memo.stats().entries == 0
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_terms_are_evicted(
+    db_session: AsyncSession, new_singleton: Callable[..., Any]
+) -> None:
+    memo = new_singleton(TermCodeMemo, max_entries=2)
+    await memo.put_many(db_session, [("lookup:condition", "hyperlipidemia", HYPERLIPIDEMIA)])
+    await memo.put_many(db_session, [("lookup:condition", "hypertension", [])])
+    assert await memo.get(db_session, "lookup:condition", "hyperlipidemia") == HYPERLIPIDEMIA
+    await memo.put_many(db_session, [("lookup:condition", "asthma", [])])
+
+    assert memo.stats().entries == 2
+    assert await memo.get(db_session, "lookup:condition", "hypertension") is None
+    assert await memo.get(db_session, "lookup:condition", "hyperlipidemia") == HYPERLIPIDEMIA
+
+    await memo.flush(db_session)
+    reloaded = new_singleton(TermCodeMemo, max_entries=2)
+    found = await reloaded.find_in_text(db_session, "asthma, hypertension, hyperlipidemia", ["lookup:condition"])
+    assert set(found) == {("lookup:condition", "asthma"), ("lookup:condition", "hyperlipidemia")}
+
+
+@pytest.mark.asyncio
+async def test_find_in_text_matches_multi_word_terms(
+    db_session: AsyncSession, new_singleton: Callable[..., Any]
+) -> None:
+    memo = new_singleton(TermCodeMemo)
+    await memo.put_many(
+        db_session,
+        [("lookup:condition", "type 2 diabetes", []), ("lookup:condition", "diabetes insipidus", [])],
+    )
+
+    found = await memo.find_in_text(db_session, "Known Type-2 diabetes mellitus.", ["lookup:condition"])
+
+    assert found == {("lookup:condition", "type 2 diabetes"): []}
+
+
+@pytest.mark.asyncio
+async def test_hits_and_evictions_during_a_flush_are_kept_for_the_next_one(
+    db_session: AsyncSession, new_singleton: Callable[..., Any]
+) -> None:
+    memo = new_singleton(TermCodeMemo)
+    await memo.put_many(db_session, [("lookup:condition", "hyperlipidemia", HYPERLIPIDEMIA)])
+    await memo.put_many(db_session, [("lookup:condition", "asthma", [])])
+    await memo.get(db_session, "lookup:condition", "hyperlipidemia")
+    hyperlipidemia, asthma = ("lookup:condition", "hyperlipidemia"), ("lookup:condition", "asthma")
+    commit = db_session.commit
+
+    async def commit_while_other_requests_run() -> None:
+        # Another request hits both terms and evicts one while this flush is committing.
+        await memo.get(db_session, *hyperlipidemia)
+        await memo.get(db_session, *asthma)
+        memo._max_entries = 1
+        assert memo._entries is not None
+        memo._evict_over_capacity(memo._entries)
+        await commit()
+
+    db_session.commit = commit_while_other_requests_run  # type: ignore[method-assign]
+    await memo.flush(db_session)
+    db_session.commit = commit  # type: ignore[method-assign]
+
+    assert memo._dirty == {hyperlipidemia, asthma}
+    assert set(memo._evicted_dirty) == {hyperlipidemia}
+    await memo.flush(db_session)
+    reloaded = new_singleton(TermCodeMemo)
+    await reloaded.get(db_session, *hyperlipidemia)
+    assert reloaded._entries is not None
+    assert reloaded._entries[hyperlipidemia].hit_count == 3
@@ -0,0 +1,108 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.schemas.extract_structured import Condition, Medication, StructuredData, Treatment
+from app.schemas.terminology import CodeLookup
+from app.services.terminology_service import (
+    TerminologyService,
+    load_concepts,
+    normalize_code,
+    parse_icd10_codes,
+    parse_rxnconso,
+)
+
+ICD10CM_CODES = """\
+E785    Hyperlipidemia, unspecified
+E1165   Type 2 diabetes mellitus with hyperglycemia
+I10     Essential (primary) hypertension
+"""
+
+RXNCONSO = """\
+36567|ENG||||||8000000|8000000|||RXNORM|IN|36567|simvastatin||N|4096|
+36567|ENG||||||8000001|8000001|||RXNORM|SY|36567|simvastatine||N|4096|
+6809|ENG||||||8000002|8000002|||RXNORM|IN|6809|metformin||N|4096|
+6809|ENG||||||8000003|8000003|||MTHSPL|SU|6809|METFORMIN||N|4096|
+99999|ENG||||||8000004|8000004|||RXNORM|IN|99999|withdrawn drug||O|4096|
+"""
+
+
+@pytest_asyncio.fixture
+async def terminology(db_session: AsyncSession) -> TerminologyService:
+    def load(session: Session) -> None:
+        load_concepts(session, "icd10cm", parse_icd10_codes(ICD10CM_CODES.splitlines()))
+        load_concepts(session, "rxnorm", parse_rxnconso(RXNCONSO.splitlines()))
+
+    await db_session.run_sync(load)
+    return TerminologyService()
+
+
+def test_normalize_code() -> None:
+    assert normalize_code("icd10cm", " e785 ") == "E78.5"
+    assert normalize_code("icd10cm", "E78.5") == "E78.5"
+    assert normalize_code("icd10cm", "I10") == "I10"
+    assert normalize_code("rxnorm", " 36567") == "36567"
+
+
+def test_parse_rxnconso_keeps_one_current_rxnorm_name_per_concept() -> None:
+    assert list(parse_rxnconso(RXNCONSO.splitlines())) == [("36567", "simvastatin"), ("6809", "metformin")]
+
+
+@pytest.mark.asyncio
+async def test_lookup_searches_the_code_system_for_each_kind(
+    db_session: AsyncSession, terminology: TerminologyService
+) -> None:
+    matches = await terminology.lookup(
+        db_session,
+        [CodeLookup(term="hyperlipidemia", kind="condition"), CodeLookup(term="Simvastatin 20 mg", kind="medication")],
+    )
+
+    assert [(match.system, match.code) for match in matches[0]] == [("icd10cm", "E78.5")]
+    assert [(match.system, match.code) for match in matches[1]] == [("rxnorm", "36567")]
+    assert await terminology.loaded_systems(db_session) == {"icd10cm", "rxnorm"}
+
+
+@pytest.mark.asyncio
+async def test_resolve_structured_data_validates_and_corrects_codes(
+    db_session: AsyncSession, terminology: TerminologyService
+) -> None:
+    data = StructuredData(
+        name="Alan Turning",
+        age=50,
+        conditions=[
+            Condition(name="Hypertension", icd_code="i10"),
+            Condition(name="essential (primary) hypertension", icd_code="I10.9"),
+        ],
+        diagnoses=[],
+        treatments=[Treatment(name="Lifestyle counseling", icd_code="Z71.3")],
+        medications=[Medication(name="Metformin", rx_norm_code="860975-invalid")],
+    )
+
+    resolved = await terminology.resolve_structured_data(db_session, data)
+
+    assert [condition.icd_code for condition in resolved.conditions] == ["I10", "I10"]
+    assert resolved.medications[0].rx_norm_code == "6809"
+    # Not a known ICD-10-CM description and ICD-10-PCS is not loaded: left as extracted.
+    assert resolved.treatments[0].icd_code == "Z71.3"
+
+
+@pytest.mark.asyncio
+async def test_unknown_code_is_kept_when_no_concept_is_named_exactly_like_the_item(
+    db_session: AsyncSession, terminology: TerminologyService, capsys: pytest.CaptureFixture
+) -> None:
+    # "Hyperlipidemia" is only similar to "Hyperlipidemia, unspecified" (E78.5), so E78.9 must not be replaced by it.
+    assert await terminology.resolve_code(db_session, "Hyperlipidemia", "E78.9", ["icd10cm"]) is None
+
+    data = StructuredData(
+        name="Alan Turning",
+        age=50,
+        conditions=[Condition(name="Hyperlipidemia", icd_code="E78.9")],
+        diagnoses=[],
+        treatments=[],
+        medications=[],
+    )
+    resolved = await terminology.resolve_structured_data(db_session, data)
+
+    assert resolved.conditions[0].icd_code == "E78.9"
+    assert "Unverified code 'E78.9' for 'Hyperlipidemia'" in capsys.readouterr().out
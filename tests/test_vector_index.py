@@ -0,0 +1,90 @@
+import numpy as np
+
+from app.scripts.index_report import build_report, synthetic_vectors
+from app.services.vector_index import create_vector_index, default_pq_m, select_index_kind
+
+
+def test_auto_selects_index_kind_by_corpus_size() -> None:
+    assert select_index_kind(1_000) == "flat"
+    assert select_index_kind(100_000) == "ivf_flat"
+    assert select_index_kind(1_000_000) == "ivf_pq"
+
+
+def test_default_pq_m_divides_dimension() -> None:
+    assert default_pq_m(1536) == 64
+    assert default_pq_m(384) == 64
+    assert 384 % default_pq_m(384) == 0
+
+
+def test_ivf_falls_back_to_flat_without_enough_training_vectors() -> None:
+    vectors = synthetic_vectors(100, 16)
+
+    index = create_vector_index(16, kind="ivf_flat", training_vectors=vectors, nlist=64)
+
+    assert index.kind == "flat"
+
+
+def test_ivf_flat_finds_nearest_neighbours() -> None:
+    vectors = synthetic_vectors(4_000, 32, n_clusters=10)
+    index = create_vector_index(32, kind="ivf_flat", training_vectors=vectors, nprobe=8)
+    index.add(vectors, np.arange(len(vectors), dtype=np.int64))
+
+    _, ids = index.search(vectors[:5], k=1)
+
+    assert index.kind == "ivf_flat"
+    assert ids[:, 0].tolist() == [0, 1, 2, 3, 4]
+
+
+def test_hnsw_filters_removed_ids() -> None:
+    vectors = synthetic_vectors(200, 16)
+    index = create_vector_index(16, kind="hnsw")
+    index.add(vectors, np.arange(len(vectors), dtype=np.int64))
+
+    index.remove(np.array([0], dtype=np.int64))
+    _, ids = index.search(vectors[:1], k=3)
+
+    assert 0 not in ids[0].tolist()
+    assert index.ntotal == 199
+
+
+def test_report_measures_recall_against_exact_index() -> None:
+    vectors = synthetic_vectors(2_000, 16, n_clusters=10)
+
+    rows = build_report(vectors, n_queries=20, k=5)
+
+    assert rows[0].label == "flat (exact)"
+    assert rows[0].recall_at_k == 1.0
+    assert all(0.0 <= row.recall_at_k <= 1.0 for row in rows)
+    assert any(row.label.startswith("hnsw") for row in rows)
+
+
+def test_hnsw_is_rebuilt_without_tombstones_past_the_threshold() -> None:
+    vectors = synthetic_vectors(200, 16)
+    index = create_vector_index(16, kind="hnsw")
+    index.add(vectors, np.arange(len(vectors), dtype=np.int64))
+
+    index.remove(np.arange(40, dtype=np.int64))
+    assert len(index.tombstones) == 40
+
+    index.remove(np.array([40], dtype=np.int64))
+    _, ids = index.search(vectors[41:42], k=3)
+
+    assert index.tombstones == set()
+    assert index.ntotal == 159
+    assert set(index.ids().tolist()) == set(range(41, 200))
+    assert ids[0][0] == 41
+
+
+def test_hnsw_re_added_id_drops_its_removed_vector() -> None:
+    vectors = synthetic_vectors(200, 16)
+    index = create_vector_index(16, kind="hnsw")
+    index.add(vectors, np.arange(len(vectors), dtype=np.int64))
+
+    index.remove(np.array([0], dtype=np.int64))
+    index.add(vectors[1:2], np.array([0], dtype=np.int64))
+    similarities, _ = index.search(vectors[:1], k=3)
+
+    assert index.ids().tolist().count(0) == 1
+    assert index.ntotal == 200
+    # The removed vector itself, a perfect match, is no longer found.
+    assert similarities[0][0] < 0.999